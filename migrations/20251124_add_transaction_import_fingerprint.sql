@@ -0,0 +1,21 @@
+-- =====================================================
+-- IMPORTAÇÕES IDEMPOTENTES DO EXTRATO BANCÁRIO
+-- =====================================================
+-- Cada linha do extrato BPI passa a ter uma impressão digital estável
+-- (conta, data, hora, valor, descrição, memória), calculada pelos scripts
+-- de importação em migrations/bpi_import/fingerprint.py.
+--
+-- Reimportar um extrato atualizado deixa de duplicar transações:
+-- os INSERT usam ON CONFLICT (import_fingerprint) DO NOTHING.
+-- Transações criadas manualmente ficam com import_fingerprint = NULL.
+-- =====================================================
+
+ALTER TABLE transactions
+    ADD COLUMN IF NOT EXISTS import_fingerprint VARCHAR(64);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_transactions_import_fingerprint
+    ON transactions (import_fingerprint)
+    WHERE import_fingerprint IS NOT NULL;
+
+COMMENT ON COLUMN transactions.import_fingerprint IS
+    'Impressão digital da linha do extrato bancário de origem (NULL se criada manualmente)';
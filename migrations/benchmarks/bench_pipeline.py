@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark por etapa dos importadores sobre extractos BPI sintéticos
+
+Para cada tamanho gera um extracto (synthetic.py) e mede, em
+bpi_import/process.py e bpi_import/summary.py, o tempo e o pico de
+memória (tracemalloc) de cada etapa. As etapas são cumulativas: 'classify'
+inclui a leitura e o parse, 'emit' inclui tudo. summary não emite SQL, por
+isso a sua última etapa é o resumo por membro do main().
+
+Os resultados são gravados em JSON; com --compare mostra a variação face a
+uma execução anterior e assinala regressões.
+
+Uso: python3 migrations/benchmarks/bench_pipeline.py [--rows 10000,100000,1000000]
+                                                     [--output res.json] [--compare antigo.json]
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bpi_import.process as pbs
+import bpi_import.summary as ibs
+from bpi_import.balances import aggregate_payments
+from bpi_import.fingerprint import fingerprint_transactions
+from bpi_import.reader import iter_rows
+from synthetic import write_extract
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+
+def drain(iterable):
+    count = 0
+    for _ in iterable:
+        count += 1
+    return count
+
+
+# -------------------------------------------------------------
+# Etapas de bpi_import/process.py
+# -------------------------------------------------------------
+
+def pbs_read(path):
+    return drain(iter_rows([path]))
+
+
+def pbs_parse(path):
+    return drain(pbs.parse_rows(iter_rows([path])))
+
+
+def pbs_parse_columnar(path):
+    return drain(pbs.parse_rows_columnar(iter_rows([path])))
+
+
+def pbs_classify(path):
+    return drain(pbs.classify_transactions(pbs.parse_rows(iter_rows([path]))))
+
+
+def pbs_aggregate(path):
+    transactions = fingerprint_transactions(pbs.parse_rows(iter_rows([path])))
+    transactions = aggregate_payments(pbs.classify_transactions(transactions), {})
+    return drain(pbs.track_stats(transactions, pbs.new_stats()))
+
+
+def pbs_emit(path):
+    with open(os.devnull, 'w', encoding='utf-8') as out:
+        stats = pbs.process_stream(iter_rows([path]), pbs.BUILDING_ID, out)
+    return stats['total']
+
+
+# -------------------------------------------------------------
+# Etapas de bpi_import/summary.py
+# -------------------------------------------------------------
+
+def read_text(path):
+    with open(path, encoding='utf-8') as handle:
+        return handle.read()
+
+
+def ibs_parse(path):
+    count = 0
+    for row in iter_rows([path]):
+        if ibs.parse_date(row['Fecha']) and ibs.parse_amount(row['Importe']) != 0:
+            count += 1
+    return count
+
+
+def ibs_classify(path):
+    income, expenses = ibs.generate_sql_from_csv(read_text(path))
+    return len(income) + len(expenses)
+
+
+def ibs_aggregate(path):
+    income, expenses = ibs.generate_sql_from_csv(read_text(path))
+    member_stats = {}
+    for t in income:
+        if t['member_key']:
+            stats = member_stats.setdefault(t['member_key'], {'count': 0, 'total': Decimal('0')})
+            stats['count'] += 1
+            stats['total'] += t['amount']
+    return len(income) + len(expenses)
+
+
+STAGES = [
+    ('process_bank_statement', 'read', pbs_read),
+    ('process_bank_statement', 'parse', pbs_parse),
+    ('process_bank_statement', 'parse_columnar', pbs_parse_columnar),
+    ('process_bank_statement', 'classify', pbs_classify),
+    ('process_bank_statement', 'aggregate', pbs_aggregate),
+    ('process_bank_statement', 'emit', pbs_emit),
+    ('import_bank_statement', 'parse', ibs_parse),
+    ('import_bank_statement', 'classify', ibs_classify),
+    ('import_bank_statement', 'aggregate', ibs_aggregate),
+]
+
+
+def has_numpy():
+    return importlib.util.find_spec('numpy') is not None
+
+
+def measure(fn, path, repeat, memory):
+    """(melhor tempo, linhas de saída, pico de memória em MB ou None)"""
+    best = None
+    rows_out = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rows_out = fn(path)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    peak = None
+    if memory:
+        # Passagem separada: o tracemalloc abranda a execução
+        tracemalloc.start()
+        fn(path)
+        peak = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        tracemalloc.stop()
+    return best, rows_out, peak
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def result_key(r):
+    return (r['script'], r['stage'], r['rows'])
+
+
+def compare(results, previous_path, tolerance):
+    with open(previous_path, encoding='utf-8') as handle:
+        previous = {result_key(r): r for r in json.load(handle)['results']}
+
+    print()
+    print(f"Comparação com {previous_path} (tolerância {tolerance:.0%})")
+    regressions = 0
+    for r in results:
+        old = previous.get(result_key(r))
+        if not old:
+            continue
+        ratio = r['rows_per_s'] / old['rows_per_s']
+        flag = ''
+        if ratio < 1 - tolerance:
+            flag = '  << REGRESSÃO'
+            regressions += 1
+        print(f"  {r['script']:<24}{r['stage']:<16}{r['rows']:>9} {old['rows_per_s']:>12,.0f} -> "
+              f"{r['rows_per_s']:>12,.0f} linhas/s ({ratio:.2f}x){flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', default='10000,100000', help="tamanhos separados por vírgulas")
+    parser.add_argument('--accounts', type=int, default=1, help="nº de contas no extracto")
+    parser.add_argument('--repeat', type=int, default=3, help="repetições por etapa (conta a melhor)")
+    parser.add_argument('--stages', help="só estas etapas (ex.: parse,classify)")
+    parser.add_argument('--no-memory', action='store_true', help="não mede o pico de memória")
+    parser.add_argument('--output', metavar='FICHEIRO',
+                        help="JSON de resultados (por omissão benchmarks/results/pipeline-<data>.json)")
+    parser.add_argument('--compare', metavar='FICHEIRO', help="resultados anteriores para comparar")
+    parser.add_argument('--tolerance', type=float, default=0.10,
+                        help="quebra de linhas/s a partir da qual é regressão (0.10 = 10%%)")
+    args = parser.parse_args(argv)
+
+    sizes = [int(s) for s in args.rows.split(',')]
+    wanted = set(args.stages.split(',')) if args.stages else None
+    stages = [
+        s for s in STAGES
+        if (wanted is None or s[1] in wanted) and (s[1] != 'parse_columnar' or has_numpy())
+    ]
+
+    print(f"{'script':<24}{'etapa':<16}{'linhas':>9}{'saída':>9}{'segundos':>10}{'linhas/s':>12}{'pico MB':>9}")
+    results = []
+    with tempfile.TemporaryDirectory(prefix='bpi_bench_') as tmp:
+        for size in sizes:
+            path = write_extract(os.path.join(tmp, f'extract_{size}.csv'), size, args.accounts)
+            for script, stage, fn in stages:
+                seconds, rows_out, peak = measure(fn, path, args.repeat, not args.no_memory)
+                r = {
+                    'script': script,
+                    'stage': stage,
+                    'rows': size,
+                    'rows_out': rows_out,
+                    'seconds': round(seconds, 6),
+                    'rows_per_s': round(size / seconds, 1),
+                    'peak_mb': round(peak, 2) if peak is not None else None,
+                }
+                results.append(r)
+                peak_text = f"{peak:.1f}" if peak is not None else '-'
+                print(f"{script:<24}{stage:<16}{size:>9}{rows_out:>9}{seconds:>10.3f}"
+                      f"{r['rows_per_s']:>12,.0f}{peak_text:>9}", flush=True)
+            os.remove(path)
+
+    output = args.output
+    if not output:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"pipeline-{datetime.now():%Y%m%d-%H%M%S}.json")
+    with open(output, 'w', encoding='utf-8') as handle:
+        json.dump({
+            'meta': {
+                'date': datetime.now().isoformat(timespec='seconds'),
+                'revision': git_revision(),
+                'python': platform.python_version(),
+                'machine': platform.machine(),
+                'cpus': os.cpu_count(),
+                'accounts': args.accounts,
+                'repeat': args.repeat,
+            },
+            'results': results,
+        }, handle, indent=2)
+    print(f"\nResultados gravados em {output}")
+
+    if args.compare and compare(results, args.compare, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Gerador de extractos BPI sintéticos (mesmas 12 colunas do extracto de exemplo)
+
+Mistura quotas por transferência intrabancária e SEPA dos membros conhecidos,
+pagadores desconhecidos, débitos directos recorrentes (luz, seguro), comissões
+bancárias, limpeza e compras sem categoria. As linhas saem ordenadas por
+Fecha descendente, como nas exportações reais, e são determinísticas para a
+mesma semente.
+
+Uso: python3 migrations/benchmarks/synthetic.py 100000 extracto.csv.gz [--accounts 3]
+"""
+
+import argparse
+import csv
+import gzip
+import os
+import random
+import sys
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bpi_import.reader import BPI_COLUMNS
+
+# (nome completo no banco, beneficiário, categoria BPI, quota mensal)
+MEMBERS = [
+    ('VITOR MANUEL SEBASTIAN RODRIGUES', 'VITOR RODRIGUES', 'Quota > Fraçao A - RC/DTO', '26,13'),
+    ('MARIA ALDINA SEQUEIRA', 'Aldina Sequeira', 'Quota > Fraçao B - RC/ESQ', '26,13'),
+    ('ANTONIO MANUEL CARACA BAIAO', 'Antonio Beirao', 'Quota > Fraçao C - 1º DTO', '40,64'),
+    ('CRISTINA MARIA BERTOLO GOUVEIA', 'Cristina Gouveia', 'Quota > Fraçao D - 1º ESQ', '57,02'),
+    ('JOAO MANUEL FERNANDES LONGO', 'Joao Longo', 'Quota > Fraçao E - 2º DTO', '43,54'),
+    ('JOSE MANUEL COSTA RICARDO', 'Jose Ricardo', 'Quota > Fraçao F - 2º ESQ', '135,77'),
+]
+
+UNKNOWN_PAYERS = [
+    'ALEXANDRE MARTINS DA SILVA',
+    'ANA PAULA FERREIRA NUNES',
+    'RUI PEDRO MOREIRA LOPES',
+    'HELENA CRISTINA SOUSA',
+]
+
+# (descrição, beneficiário, categoria BPI, memória igual à descrição, cêntimos mín/máx)
+EXPENSES = [
+    ('DD SU ELETRICIDADE, S.A. 100000862991', 'SU Eletricidade', 'Despesas de condomínio > LUZ', True, 450, 1100),
+    ('COBR SEPA SU ELETRICIDADE S.A.', 'SU Eletricidade', 'Despesas de condomínio > LUZ', False, 450, 1100),
+    ('MANUTENCAO DE CONTA VALOR NEGOCIOS', 'Manutenção Conta', 'Despesas de condomínio > BANCO', True, 799, 799),
+    ('IMPOSTO DE SELO', 'Inposto Selo Conta', 'Despesas de condomínio > BANCO', False, 32, 32),
+    ('COBR SEPA FIDELIDADE COMPANHIA DE SEGUROS', 'FIDELIDADE', 'Despesas de condomínio > SEGUROS', False, 60000, 90000),
+    ('TRF CRED SEPA+ TRANSFERENCIA ATM', 'Vicencia', 'Limpeza', False, 5000, 80000),
+    ('COMPRA COPIMATICA LDA', 'Copimatica', 'Administração', False, 500, 3000),
+    ('COMPRA LEROY MERLIN LISBOA', 'Leroy Merlin', '', False, 1000, 25000),
+    ('PAGAMENTO DE SERVICOS 696752477', 'Servicos', '', False, 100, 5000),
+]
+
+ACCOUNT_NAME = 'BPI COND. BURACA'
+
+# Pesos de cada tipo de linha: quota intrabancária, quota SEPA, numerário,
+# pagador desconhecido, despesa
+KINDS = ['intrab', 'sepa', 'cash', 'unknown', 'expense']
+WEIGHTS = [20, 20, 5, 5, 50]
+
+
+def format_cents(cents):
+    sign = '-' if cents < 0 else ''
+    cents = abs(cents)
+    return f"{sign}{cents // 100},{cents % 100:02d}"
+
+
+def account_names(count):
+    if count == 1:
+        return [ACCOUNT_NAME]
+    return [f'{ACCOUNT_NAME} {i + 1:02d}' for i in range(count)]
+
+
+def make_row(rng, kind, account, day, seq):
+    fecha = day.strftime('%d/%m/%Y')
+    if kind == 'expense':
+        desc, beneficiario, categoria, same_memoria, low, high = rng.choice(EXPENSES)
+        if desc.startswith(('MANUTENCAO', 'IMPOSTO')):
+            desc = f"{desc} {day.strftime('%m')} {day.year}"
+        memoria = desc if same_memoria else ''
+        importe = format_cents(-rng.randint(low, high))
+    elif kind == 'unknown':
+        payer = rng.choice(UNKNOWN_PAYERS)
+        desc = f"TRF CR SEPA+ {seq % 10 ** 7:07d} DE {payer}"
+        beneficiario, categoria, memoria = 'Trf Cr Sepa+', '', desc
+        importe = format_cents(rng.randint(2000, 20000))
+    else:
+        name, beneficiario, categoria, quota = rng.choice(MEMBERS)
+        if kind == 'intrab':
+            desc = f"TRF CR INTRAB {rng.randint(100, 999)} DE {name}"
+        elif kind == 'sepa':
+            desc = f"TRF CR SEPA+ {seq % 10 ** 7:07d} DE {name}"
+        else:
+            desc = 'DEPOSITO EM NUMERARIO'
+        memoria = desc if kind != 'cash' else ''
+        # Por vezes paga vários meses de uma vez
+        months = 1 if rng.random() < 0.85 else rng.choice((3, 6, 12))
+        importe = format_cents(int(quota.replace(',', '')) * months)
+
+    return {
+        'Cuentas': account,
+        'Transferencias': '',
+        'Descripción': desc,
+        'Beneficiario': beneficiario,
+        'Categoría': categoria,
+        'Fecha': fecha,
+        'Hora': '12:00',
+        'Memoria': memoria,
+        'Importe': importe,
+        'Moneda': 'EUR',
+        'Número de cheque': '',
+        'Etiquetas': '',
+    }
+
+
+def generate_rows(count, accounts=1, years=10, end=date(2025, 11, 13), seed=0):
+    """Gera `count` linhas de `accounts` contas ao longo de `years` anos (Fecha descendente)"""
+    rng = random.Random(seed)
+    names = account_names(accounts)
+    span = years * 365
+    for i in range(count):
+        day = end - timedelta(days=i * span // count)
+        kind = rng.choices(KINDS, WEIGHTS)[0]
+        yield make_row(rng, kind, rng.choice(names), day, count - i)
+
+
+def write_extract(path, count, accounts=1, years=10, seed=0):
+    """Escreve o extracto (CSV ou CSV.gz) com as aspas da exportação BPI"""
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'wt', encoding='utf-8', newline='') as handle:
+        writer = csv.DictWriter(handle, fieldnames=BPI_COLUMNS, quoting=csv.QUOTE_ALL)
+        writer.writeheader()
+        writer.writerows(generate_rows(count, accounts, years, seed=seed))
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('rows', type=int)
+    parser.add_argument('path', help="ficheiro de saída (.csv ou .csv.gz)")
+    parser.add_argument('--accounts', type=int, default=1, help="nº de contas/edifícios")
+    parser.add_argument('--years', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    write_extract(args.path, args.rows, args.accounts, args.years, args.seed)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,3 @@
+"""
+Utilitários partilhados pelos scripts de importação do extracto bancário BPI
+"""
@@ -0,0 +1,5 @@
+import sys
+
+from bpi_import.cli import main
+
+sys.exit(main())
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Motor de análise do extracto: saldos por ano/mês, categorias e membros
+
+Os índices (conta, ano, mês), (conta, ano, categoria) e (conta, ano, membro)
+são construídos numa única passagem pelas transações, em cêntimos inteiros.
+Cada relatório é depois uma consulta a esses índices (dezenas ou centenas de
+chaves), nunca uma nova passagem pela lista de transações.
+"""
+
+from decimal import Decimal
+
+from bpi_import.rules import to_cents
+from bpi_import.snapshot import FLAG_FEE, FLAG_INCOME
+
+INCOME = 0
+EXPENSE = 1
+
+
+def format_eur(cents):
+    return f"€{Decimal(cents).scaleb(-2):,.2f}"
+
+
+class StatementAnalytics:
+    """Índices agregados de um ou mais extractos (várias contas/edifícios)"""
+
+    def __init__(self, opening_balances=None, category_labels=None):
+        # Saldo (cêntimos) de cada conta antes da primeira transação do extracto
+        self.opening_balances = dict(opening_balances or {})
+        self.category_labels = category_labels or {}
+        self.count = 0
+        self._months = {}
+        self._categories = {}
+        self._members = {}
+
+    def add(self, t):
+        """Acrescenta uma transação classificada (dict do pipeline de importação)"""
+        self._add(t['account'], t['year'], int(t['date'][5:7]), to_cents(t['amount']),
+                  INCOME if t['type'] == 'income' else EXPENSE, t['is_fee'], t['member_key'], t['category_id'])
+
+    def _add(self, account, year, month, cents, kind, is_fee, member_key, category_id, count=1):
+        month_totals = self._months.get((account, year, month))
+        if month_totals is None:
+            month_totals = self._months[(account, year, month)] = [0, 0]
+        month_totals[kind] += cents
+
+        if kind == INCOME:
+            category = 'Quotas' if is_fee else 'Outras receitas'
+            member_key = (account, year, member_key or '(desconhecido)')
+            member_totals = self._members.get(member_key)
+            if member_totals is None:
+                member_totals = self._members[member_key] = [0, 0]
+            member_totals[0] += count
+            member_totals[1] += cents
+        else:
+            category = self.category_labels.get(category_id, category_id or '(sem categoria)')
+
+        category_key = (account, year, category)
+        category_totals = self._categories.get(category_key)
+        if category_totals is None:
+            category_totals = self._categories[category_key] = [0, 0]
+        category_totals[kind] += cents
+
+        self.count += count
+
+    def consume(self, transactions):
+        for t in transactions:
+            self.add(t)
+        return self
+
+    def consume_snapshot(self, snapshot):
+        """Como consume, directamente das colunas de um Snapshot (sem dicts nem Decimal).
+
+        As linhas são primeiro somadas por (conta, mês, tipo, membro, categoria),
+        ainda com os índices das strings; os índices só recebem os grupos.
+        """
+        names = ('date', 'cents', 'flags', 'account', 'member_key', 'category_id')
+        groups = {}
+        for day, cents, flags, account, member_key, category_id in zip(*(snapshot.column(n) for n in names)):
+            key = (account, day // 100, flags, member_key, category_id)
+            totals = groups.get(key)
+            if totals is None:
+                groups[key] = [cents, 1]
+            else:
+                totals[0] += cents
+                totals[1] += 1
+
+        string = snapshot.string
+        for (account, month, flags, member_key, category_id), (cents, count) in groups.items():
+            self._add(string(account), month // 100, month % 100, cents,
+                      INCOME if flags & FLAG_INCOME else EXPENSE, flags & FLAG_FEE,
+                      string(member_key), string(category_id), count)
+        return self
+
+    def consume_checkpoints(self, checkpoints, accounts=None):
+        """Totais mensais e saldos iniciais a partir de BalanceCheckpoints (sem transações).
+
+        Só alimenta os saldos (monthly_balances/yearly_balances); categorias e
+        membros ficam vazios.
+        """
+        for account in (checkpoints.accounts if accounts is None else accounts):
+            self.opening_balances[account] = checkpoints.opening(account)
+            for year, month, income, expense, _ in checkpoints.monthly(account):
+                self._months[(account, year, month)] = [income, expense]
+        return self
+
+    # -------------------------------------------------------------
+    # Consultas
+    # -------------------------------------------------------------
+
+    def accounts(self):
+        return sorted({key[0] for key in self._months} | set(self.opening_balances))
+
+    def years(self):
+        return sorted({key[1] for key in self._months})
+
+    def _selected(self, account):
+        return self.accounts() if account is None else [account]
+
+    def monthly_balances(self, account=None):
+        """[(ano, mês, receitas, despesas, saldo_final)] por ordem cronológica"""
+        accounts = self._selected(account)
+        balance = sum(self.opening_balances.get(a, 0) for a in accounts)
+
+        months = {}
+        for (acc, year, month), (income, expense) in self._months.items():
+            if account is None or acc == account:
+                totals = months.setdefault((year, month), [0, 0])
+                totals[INCOME] += income
+                totals[EXPENSE] += expense
+
+        result = []
+        for (year, month), (income, expense) in sorted(months.items()):
+            balance += income - expense
+            result.append((year, month, income, expense, balance))
+        return result
+
+    def yearly_balances(self, account=None):
+        """[(ano, saldo_inicial, receitas, despesas, saldo_final)]"""
+        accounts = self._selected(account)
+        opening = sum(self.opening_balances.get(a, 0) for a in accounts)
+
+        years = {}
+        for year, _, income, expense, _ in self.monthly_balances(account):
+            totals = years.setdefault(year, [0, 0])
+            totals[INCOME] += income
+            totals[EXPENSE] += expense
+
+        result = []
+        for year in sorted(years):
+            income, expense = years[year]
+            closing = opening + income - expense
+            result.append((year, opening, income, expense, closing))
+            opening = closing
+        return result
+
+    def by_category(self, year=None, account=None):
+        """{categoria: (receitas, despesas)}"""
+        result = {}
+        for (acc, y, category), (income, expense) in self._categories.items():
+            if (account is None or acc == account) and (year is None or y == year):
+                totals = result.setdefault(category, [0, 0])
+                totals[INCOME] += income
+                totals[EXPENSE] += expense
+        return {k: tuple(v) for k, v in result.items()}
+
+    def by_member(self, year=None, account=None):
+        """{membro: (nº pagamentos, total)}"""
+        result = {}
+        for (acc, y, member), (count, cents) in self._members.items():
+            if (account is None or acc == account) and (year is None or y == year):
+                totals = result.setdefault(member, [0, 0])
+                totals[0] += count
+                totals[1] += cents
+        return {k: tuple(v) for k, v in result.items()}
@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Análise COMPLETA do extracto bancário BPI 2021-2025
+Calcula saldos reais ano a ano com dados 100% do extracto
+
+As transações passam uma única vez pelo parse/classificação do importador
+(bpi_import/process.py) e alimentam os índices de StatementAnalytics;
+todos os relatórios são consultas a esses índices.
+"""
+
+import argparse
+import sys
+import time
+from decimal import Decimal, InvalidOperation
+
+from bpi_import.analytics import StatementAnalytics, format_eur, to_cents
+from bpi_import.process import classify_transactions, open_classification_cache, parse_rows, parse_rows_columnar
+from bpi_import.reader import iter_rows, iter_text_rows
+from bpi_import.rules import CATEGORY_MAP, sample_text
+
+# snapshot.py, checkpoints.py e mmap_reader.py só são importados com --snapshot / --checkpoints
+
+# Nomes das categorias de despesa (category_id -> nome)
+CATEGORY_LABELS = {
+    CATEGORY_MAP['luz']: 'Electricidade',
+    CATEGORY_MAP['limpeza']: 'Limpeza',
+    CATEGORY_MAP['seguros']: 'Seguros',
+    CATEGORY_MAP['banco']: 'Despesas Bancárias',
+    CATEGORY_MAP['admin']: 'Administração',
+}
+
+MONTHS = ['Jan', 'Fev', 'Mar', 'Abr', 'Mai', 'Jun', 'Jul', 'Ago', 'Set', 'Out', 'Nov', 'Dez']
+
+
+def parse_opening_balances(values):
+    """['1200,50', 'BPI COND. BURACA=300'] -> {conta ou None: cêntimos}"""
+    balances = {}
+    for value in values or []:
+        account, _, amount = value.rpartition('=')
+        try:
+            cents = to_cents(Decimal(amount.strip().replace(',', '.')))
+        except InvalidOperation:
+            raise ValueError(f"Saldo inicial inválido: {value!r}")
+        balances[account.strip() or None] = cents
+    return balances
+
+
+def load_snapshots(paths, columnar=False):
+    """Snapshot de cada exportação (<ficheiro>.snap), feito na 1ª vez ou quando a exportação ou as regras mudam"""
+    from bpi_import.snapshot import open_snapshot, write_snapshot
+
+    parse = parse_rows_columnar if columnar else parse_rows
+    cache = open_classification_cache()
+    snapshots = []
+    for path in paths:
+        snapshot = open_snapshot(path, cache.digest)
+        if snapshot is None:
+            write_snapshot(path, classify_transactions(parse(iter_rows([path])), cache), cache.digest)
+            snapshot = open_snapshot(path, cache.digest)
+        snapshots.append(snapshot)
+    return snapshots
+
+
+def build_analytics(rows, opening_balances, columnar=False, snapshots=None):
+    """Uma passagem: parse -> classificação -> índices (ou só índices, a partir dos snapshots)"""
+    analytics = StatementAnalytics(category_labels=CATEGORY_LABELS)
+    if snapshots is not None:
+        for snapshot in snapshots:
+            with snapshot:
+                analytics.consume_snapshot(snapshot)
+    else:
+        parse = parse_rows_columnar if columnar else parse_rows
+        analytics.consume(classify_transactions(parse(rows), open_classification_cache()))
+
+    # Um saldo sem conta só é inequívoco com uma única conta no extracto
+    default = opening_balances.pop(None, None)
+    if default is not None:
+        accounts = analytics.accounts()
+        if len(accounts) > 1:
+            raise ValueError("Várias contas no extracto: indique o saldo inicial como CONTA=VALOR")
+        for account in accounts:
+            opening_balances.setdefault(account, default)
+    analytics.opening_balances.update(opening_balances)
+    return analytics
+
+
+def scan_months(rows):
+    """Totais mensais (track_months) de linhas do extracto; a classificação não é precisa"""
+    from bpi_import.checkpoints import track_months
+    from bpi_import.fingerprint import fingerprint_transactions
+
+    months = {}
+    for _ in track_months(fingerprint_transactions(parse_rows(rows)), months):
+        pass
+    return months
+
+
+def refresh_checkpoints(checkpoints, read, opening_balances, recheck=None):
+    """Actualiza os checkpoints relendo só a partir do último mês guardado.
+
+    read(de, até) devolve as linhas do período (None = sem limite). Com recheck
+    (de, até) esses meses também são relidos: se algum mudou, só os fechos
+    dele em diante são refeitos. Devolve {conta: 1º mês alterado}.
+    """
+    resume = checkpoints.resume_from() if checkpoints.accounts else None
+    months = scan_months(read(resume, None))
+    if resume and {account for account, _ in months} - set(checkpoints.accounts):
+        # Conta nova no extracto: precisa da sua história toda
+        months = scan_months(read(None, None))
+    if recheck:
+        months.update(scan_months(read(*recheck)))
+    changed = checkpoints.record(months)
+
+    default = opening_balances.pop(None, None)
+    if default is not None:
+        if len(checkpoints.accounts) > 1:
+            raise ValueError("Várias contas no extracto: indique o saldo inicial como CONTA=VALOR")
+        for account in checkpoints.accounts:
+            opening_balances.setdefault(account, default)
+    for account, cents in opening_balances.items():
+        checkpoints.set_opening(account, cents)
+    return changed
+
+
+def balance_at(checkpoints, read, date, accounts):
+    """(saldo no fim do dia date, nº de linhas lidas): último checkpoint anterior + as linhas desde então"""
+    from bpi_import.checkpoints import month_start_after
+
+    starts = {}
+    balance = 0
+    for account in accounts:
+        month, closing = checkpoints.closing_before(account, date)
+        starts[account] = month_start_after(month) if month else None
+        balance += closing
+
+    first = None if None in starts.values() else min(starts.values())
+    scanned = 0
+    for t in parse_rows(read(first, date)):
+        start = starts.get(t['account'], False)
+        if start is False or (start is not None and t['date'] < start):
+            continue
+        scanned += 1
+        cents = to_cents(t['amount'])
+        balance += cents if t['type'] == 'income' else -cents
+    return balance, scanned
+
+
+def print_yearly(analytics, account):
+    print("📅 SALDOS POR ANO")
+    print("-" * 80)
+    print(f"{'Ano':<6}{'Saldo inicial':>18}{'Receitas':>16}{'Despesas':>16}{'Saldo final':>18}")
+    for year, opening, income, expense, closing in analytics.yearly_balances(account):
+        print(f"{year:<6}{format_eur(opening):>18}{format_eur(income):>16}"
+              f"{format_eur(expense):>16}{format_eur(closing):>18}")
+    print()
+
+
+def print_monthly(analytics, account, year):
+    print("📈 SALDO CORRENTE POR MÊS")
+    print("-" * 80)
+    print(f"{'Mês':<10}{'Receitas':>16}{'Despesas':>16}{'Saldo':>18}")
+    for y, month, income, expense, balance in analytics.monthly_balances(account):
+        if year is None or y == year:
+            print(f"{MONTHS[month - 1]} {y:<6}{format_eur(income):>16}"
+                  f"{format_eur(expense):>16}{format_eur(balance):>18}")
+    print()
+
+
+def print_categories(analytics, account, year):
+    print("🏷️  RECEITAS E DESPESAS POR CATEGORIA")
+    print("-" * 80)
+    categories = analytics.by_category(year, account)
+    for category, (income, expense) in sorted(categories.items(), key=lambda kv: kv[1][1] - kv[1][0], reverse=True):
+        amount = format_eur(income) if income else f"-{format_eur(expense)}"
+        print(f"  {category:<30}{amount:>18}")
+    print()
+
+
+def print_members(analytics, account, year):
+    print("👥 PAGAMENTOS POR MEMBRO")
+    print("-" * 80)
+    members = analytics.by_member(year, account)
+    for member, (count, cents) in sorted(members.items(), key=lambda kv: kv[1][1], reverse=True):
+        print(f"  {member:<30}{count:>4} pagamentos {format_eur(cents):>16}")
+    print()
+
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description='Análise ano a ano de exportações BPI (CSV ou CSV.gz)')
+    parser.add_argument(
+        'files', nargs='*',
+        help="ficheiros a analisar ('-' para stdin); sem argumentos usa o extracto de exemplo"
+    )
+    parser.add_argument(
+        '--opening-balance', action='append', metavar='[CONTA=]VALOR',
+        help="saldo da conta antes da primeira transação do extracto (repetível, por omissão 0)"
+    )
+    parser.add_argument('--year', type=int, help="limita os relatórios mensais, por categoria e por membro a um ano")
+    parser.add_argument('--account', metavar='CONTA', help="analisa só uma conta ('Cuentas')")
+    parser.add_argument(
+        '--columnar', action='store_true',
+        help="converte datas e valores em lotes com NumPy (requer numpy)"
+    )
+    parser.add_argument(
+        '--snapshot', action='store_true',
+        help="guarda as transações classificadas ao lado de cada exportação (<ficheiro>.snap) e, nas "
+             "execuções seguintes, lê-as daí sem parse nem classificação"
+    )
+    parser.add_argument(
+        '--checkpoints', metavar='FICHEIRO',
+        help="saldos de fecho por conta e mês (JSON): só são lidas as linhas a partir do último mês "
+             "guardado e os saldos vêm dos checkpoints (sem os relatórios por categoria e membro)"
+    )
+    parser.add_argument(
+        '--recheck', metavar='DE..ATÉ',
+        help="com --checkpoints, relê também estes meses (ex.: uma exportação corrigida); se mudaram, "
+             "só os saldos desse mês em diante são refeitos"
+    )
+    parser.add_argument(
+        '--balance-at', metavar='AAAA-MM-DD',
+        help="com --checkpoints, saldo no fim deste dia (último checkpoint anterior + as linhas até ao dia)"
+    )
+    args = parser.parse_args(argv)
+    if args.snapshot and (not args.files or '-' in args.files):
+        parser.error("--snapshot precisa de ficheiros (não stdin nem o extracto de exemplo)")
+    if (args.recheck or args.balance_at) and not args.checkpoints:
+        parser.error("--recheck e --balance-at precisam de --checkpoints")
+    if args.checkpoints and (args.snapshot or '-' in args.files):
+        parser.error("--checkpoints relê partes do extracto e não se combina com --snapshot nem stdin")
+
+    if args.checkpoints:
+        main_checkpoints(parser, args)
+        return
+
+    rows = iter_rows(args.files) if args.files else iter_text_rows(sample_text())
+
+    started = time.perf_counter()
+    try:
+        snapshots = load_snapshots(args.files, args.columnar) if args.snapshot else None
+        analytics = build_analytics(rows, parse_opening_balances(args.opening_balance), args.columnar, snapshots)
+    except ValueError as e:
+        parser.error(str(e))
+    indexed = time.perf_counter()
+
+    print("🔍 ANÁLISE COMPLETA DO EXTRACTO BPI")
+    print("=" * 80)
+    print()
+
+    accounts = [args.account] if args.account else analytics.accounts()
+    # Com várias contas, cada uma e depois o consolidado
+    sections = [(a, a) for a in accounts]
+    if len(accounts) > 1:
+        sections.append(('TODAS AS CONTAS', None))
+
+    for title, account in sections:
+        print(f"🏦 {title}")
+        print("=" * 80)
+        print_yearly(analytics, account)
+        print_monthly(analytics, account, args.year)
+        print_categories(analytics, account, args.year)
+        print_members(analytics, account, args.year)
+
+    finished = time.perf_counter()
+    print(f"-- {analytics.count} transações | índices: {(indexed - started) * 1000:.0f} ms | "
+          f"relatórios: {(finished - indexed) * 1000:.0f} ms", file=sys.stderr)
+
+
+def read_period(files, date_from, date_to):
+    """Linhas das exportações (ou do extracto de exemplo) entre date_from e date_to (None = sem limite)"""
+    from bpi_import.mmap_reader import filter_period, iter_rows_period
+
+    if date_from is None and date_to is None:
+        return iter_rows(files) if files else iter_text_rows(sample_text())
+    date_from = date_from or '0000-01-01'
+    date_to = date_to or '9999-12-31'
+    if files:
+        return iter_rows_period(files, date_from, date_to)
+    return filter_period(iter_text_rows(sample_text()), date_from, date_to)
+
+
+def main_checkpoints(parser, args):
+    """--checkpoints: saldos a partir dos checkpoints, relendo só o fim do extracto"""
+    from bpi_import.checkpoints import BalanceCheckpoints
+    from bpi_import.mmap_reader import parse_period
+
+    checkpoints = BalanceCheckpoints(args.checkpoints)
+    read = lambda date_from, date_to: read_period(args.files, date_from, date_to)
+
+    started = time.perf_counter()
+    try:
+        recheck = parse_period(args.recheck) if args.recheck else None
+        changed = refresh_checkpoints(checkpoints, read, parse_opening_balances(args.opening_balance), recheck)
+    except ValueError as e:
+        parser.error(str(e))
+    checkpoints.save()
+    accounts = [args.account] if args.account else sorted(checkpoints.accounts)
+    analytics = StatementAnalytics().consume_checkpoints(checkpoints, accounts)
+    indexed = time.perf_counter()
+
+    print("🔍 SALDOS DO EXTRACTO BPI (CHECKPOINTS)")
+    print("=" * 80)
+    print()
+    for account, month in sorted(changed.items()):
+        print(f"  {account}: saldos refeitos desde {month}")
+    if changed:
+        print()
+
+    sections = [(a, a) for a in accounts]
+    if len(accounts) > 1:
+        sections.append(('TODAS AS CONTAS', None))
+    for title, account in sections:
+        print(f"🏦 {title}")
+        print("=" * 80)
+        print_yearly(analytics, account)
+        print_monthly(analytics, account, args.year)
+
+    if args.balance_at:
+        balance, scanned = balance_at(checkpoints, read, args.balance_at, accounts)
+        print(f"💶 SALDO EM {args.balance_at}: {format_eur(balance)} ({scanned} linhas lidas após o checkpoint)")
+        print()
+
+    finished = time.perf_counter()
+    print(f"-- checkpoints: {(indexed - started) * 1000:.0f} ms | "
+          f"relatórios: {(finished - indexed) * 1000:.0f} ms", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main(prog='python -m bpi_import analyze')
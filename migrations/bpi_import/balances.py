@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Saldos dos membros calculados no importador, em vez de triggers por linha
+
+O pipeline agrega os pagamentos de quota por (membro, ano) à passagem e no
+fim emite um único upsert em member_period_balance e outro em member_account.
+Durante a carga o trigger trg_update_period_balance_on_payment_insert fica
+desligado (dentro da mesma transação), por isso o custo é O(membros × períodos)
+e não uma execução do trigger por transação.
+
+A lógica de quota esperada, balance e status é a de
+create_payment_triggers.sql (balance = esperado - pago). O total pago de cada
+(membro, ano) tocado é refeito com o SUM sobre transactions do trigger, e não
+com os totais do extracto: os pagamentos gravados antes (outras exportações,
+lançamentos à mão) contam e repetir a carga não conta nada duas vezes.
+"""
+
+from decimal import Decimal
+
+PAYMENT_TRIGGER = 'trg_update_period_balance_on_payment_insert'
+
+
+def aggregate_payments(transactions, aggregates):
+    """Etapa do pipeline: soma as quotas pagas por (member_key, ano)"""
+    for t in transactions:
+        if t['type'] == 'income' and t['is_fee'] and t['member_key']:
+            key = (t['member_key'], t['year'])
+            agg = aggregates.get(key)
+            if agg is None:
+                agg = aggregates[key] = {
+                    'paid': Decimal('0'),
+                    'count': 0,
+                    'first': t['date'],
+                    'last': t['date'],
+                }
+            agg['paid'] += t['amount']
+            agg['count'] += 1
+            if t['date'] < agg['first']:
+                agg['first'] = t['date']
+            if t['date'] > agg['last']:
+                agg['last'] = t['date']
+        yield t
+
+
+def write_trigger_toggle(out, enable, triggers=(PAYMENT_TRIGGER,)):
+    action = 'ENABLE' if enable else 'DISABLE'
+    for trigger in triggers:
+        print(f"ALTER TABLE transactions {action} TRIGGER {trigger};", file=out)
+
+
+def write_balance_upsert(out, building_id, aggregates):
+    """Escreve os upserts de member_period_balance e member_account.
+
+    Precisa da tabela temporária import_members (member_key -> member_id).
+    Os (membro, ano) do extracto são refeitos a partir das transações
+    gravadas (incluindo as desta carga).
+    """
+    def emit(line=''):
+        print(line, file=out)
+
+    building = f"'{building_id}'::uuid"
+
+    emit("-- =====================================================")
+    emit("-- SALDOS DOS MEMBROS (agregados no importador)")
+    emit("-- =====================================================")
+    if not aggregates:
+        emit("-- Sem pagamentos de quota nesta importação")
+        emit()
+        return
+
+    emit("CREATE TEMP TABLE import_member_periods (")
+    emit("    member_key TEXT,")
+    emit("    year INTEGER,")
+    emit("    quota_paid NUMERIC(10,2),")
+    emit("    num_payments INTEGER,")
+    emit("    first_payment_date DATE,")
+    emit("    last_payment_date DATE")
+    emit(") ON COMMIT DROP;")
+    emit("INSERT INTO import_member_periods VALUES")
+    items = sorted(aggregates.items())
+    for i, ((member_key, year), agg) in enumerate(items):
+        comma = ',' if i < len(items) - 1 else ';'
+        emit(f"    ('{member_key}', {year}, {agg['paid']}, {agg['count']}, '{agg['first']}', '{agg['last']}'){comma}")
+    emit()
+
+    paid = "EXCLUDED.quota_paid_total"
+    count = "EXCLUDED.num_payments"
+    first = "EXCLUDED.first_payment_date"
+    last = "EXCLUDED.last_payment_date"
+
+    emit("INSERT INTO member_period_balance (")
+    emit("    member_id, period_id, building_id,")
+    emit("    quota_expected_monthly, quota_expected_annual,")
+    emit("    quota_paid_total, num_payments, balance, status,")
+    emit("    first_payment_date, last_payment_date, notes")
+    emit(")")
+    emit("SELECT")
+    emit("    im.member_id, fp.id, fp.building_id,")
+    emit("    q.monthly, q.monthly * 12,")
+    emit("    s.quota_paid, s.num_payments, q.monthly * 12 - s.quota_paid,")
+    emit("    CASE")
+    emit("        WHEN s.quota_paid >= q.monthly * 12 THEN 'paid'")
+    emit("        WHEN s.quota_paid > 0 THEN 'partial'")
+    emit("        ELSE 'unpaid'")
+    emit("    END,")
+    emit("    s.first_payment_date, s.last_payment_date,")
+    emit("    'Criado pela importação do extrato bancário'")
+    emit("FROM import_member_periods a")
+    emit("JOIN import_members im ON im.member_key = a.member_key")
+    emit("JOIN members m ON m.id = im.member_id")
+    emit(f"JOIN financial_periods fp ON fp.building_id = {building} AND fp.year = a.year")
+    emit("CROSS JOIN LATERAL (")
+    emit("    SELECT CASE")
+    emit("        WHEN m.permilage = 200 THEN fp.monthly_quota_200")
+    emit("        ELSE fp.monthly_quota_150")
+    emit("    END AS monthly")
+    emit(") q")
+    emit("CROSS JOIN LATERAL (")
+    emit("    SELECT")
+    emit("        COALESCE(SUM(t.amount), 0) AS quota_paid,")
+    emit("        COUNT(*) AS num_payments,")
+    emit("        MIN(t.transaction_date) AS first_payment_date,")
+    emit("        MAX(t.transaction_date) AS last_payment_date")
+    emit("    FROM transactions t")
+    emit("    WHERE t.member_id = im.member_id")
+    emit("      AND t.period_id = fp.id")
+    emit("      AND t.transaction_type = 'income'")
+    emit("      AND t.is_fee_payment = true")
+    emit("      AND t.deleted_at IS NULL")
+    emit(") s")
+    emit("ON CONFLICT (member_id, period_id) DO UPDATE SET")
+    emit(f"    quota_paid_total = {paid},")
+    emit(f"    num_payments = {count},")
+    emit(f"    balance = member_period_balance.quota_expected_annual - ({paid}),")
+    emit("    status = CASE")
+    emit(f"        WHEN {paid} >= member_period_balance.quota_expected_annual THEN 'paid'")
+    emit(f"        WHEN {paid} > 0 THEN 'partial'")
+    emit("        ELSE 'unpaid'")
+    emit("    END,")
+    emit(f"    first_payment_date = {first},")
+    emit(f"    last_payment_date = {last},")
+    emit("    updated_at = NOW();")
+    emit()
+
+    # Conta corrente: recalculada a partir dos períodos, só para os membros tocados
+    emit("INSERT INTO member_account (")
+    emit("    member_id, building_id, current_balance, total_charged_all_time,")
+    emit("    total_paid_all_time, has_overdue_debt, overdue_amount")
+    emit(")")
+    emit("SELECT")
+    emit(f"    mpb.member_id, {building},")
+    emit("    COALESCE(SUM(mpb.balance), 0),")
+    emit("    COALESCE(SUM(mpb.quota_expected_annual), 0),")
+    emit("    COALESCE(SUM(mpb.quota_paid_total), 0),")
+    emit("    COALESCE(BOOL_OR(mpb.balance < 0 AND fp.year < EXTRACT(YEAR FROM CURRENT_DATE)), false),")
+    emit("    COALESCE(ABS(SUM(mpb.balance) FILTER (")
+    emit("        WHERE mpb.balance < 0 AND fp.year < EXTRACT(YEAR FROM CURRENT_DATE)")
+    emit("    )), 0)")
+    emit("FROM member_period_balance mpb")
+    emit("JOIN financial_periods fp ON fp.id = mpb.period_id")
+    emit("WHERE mpb.member_id IN (")
+    emit("    SELECT im.member_id")
+    emit("    FROM import_members im")
+    emit("    JOIN import_member_periods a ON a.member_key = im.member_key")
+    emit(")")
+    emit("GROUP BY mpb.member_id")
+    emit("ON CONFLICT (member_id) DO UPDATE SET")
+    emit("    current_balance = EXCLUDED.current_balance,")
+    emit("    total_paid_all_time = EXCLUDED.total_paid_all_time,")
+    emit("    has_overdue_debt = EXCLUDED.has_overdue_debt,")
+    emit("    overdue_amount = EXCLUDED.overdue_amount,")
+    emit("    updated_at = NOW();")
+    emit()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Emissão do SQL em lotes de tamanho fixo, cada lote na sua transação
+
+Para cargas grandes, em vez de um único bloco DO com VALUES do tamanho de
+cada ano, as transações são escritas em lotes de `batch_size` linhas: cada
+lote é um BEGIN / INSERT ... SELECT FROM (VALUES ...) / COMMIT próprio,
+escrito e enviado (flush) assim que fica completo. A memória do gerador, a
+do parser no servidor e a duração dos locks ficam limitadas ao lote.
+
+Os membros e os períodos são resolvidos uma vez em tabelas temporárias da
+sessão e os triggers são desligados uma só vez antes do primeiro lote (cada
+ALTER TABLE pede um lock ACCESS EXCLUSIVE); a última transação actualiza os
+saldos (balances.py) e volta a ligá-los. Se a carga falhar a meio, os
+triggers ficam desligados até o script voltar a correr até ao fim. Repetir
+a carga é seguro: as linhas já gravadas são ignoradas pela impressão digital
+(ON CONFLICT DO NOTHING) e os saldos são refeitos a partir das transações
+gravadas.
+"""
+
+import gzip
+import sys
+
+from bpi_import.balances import write_balance_upsert, write_trigger_toggle
+from bpi_import.budgets import load_triggers, write_budget_rollup
+from bpi_import.copy_loader import (
+    COPY_COLUMNS, PAYMENT_METHODS, sql_literal, write_member_lookup, write_transactions_insert
+)
+
+DEFAULT_BATCH_SIZE = 5000
+
+
+def open_output(path):
+    """Saída em texto: '-' é stdout, '.gz' é comprimido à medida que é escrito"""
+    if path in (None, '-'):
+        return sys.stdout
+    if path.endswith('.gz'):
+        return gzip.open(path, 'wt', encoding='utf-8')
+    return open(path, 'w', encoding='utf-8')
+
+
+def batch_values(t):
+    """Linha VALUES com as COPY_COLUMNS (literais tipados para o SELECT)"""
+    member_key = sql_literal(t['member_key']) if t['member_key'] else 'NULL'
+    category_id = f"{sql_literal(t['category_id'])}::uuid" if t['category_id'] else 'NULL::uuid'
+    is_fee = 'true' if t['is_fee'] else 'false'
+    return (
+        f"({t['idx']}, DATE '{t['date']}', {t['year']}, '{t['type']}', {sql_literal(t['description'])}, "
+        f"{t['amount']}, {member_key}, {is_fee}, {category_id}, {sql_literal(PAYMENT_METHODS[t['type']])}, "
+        f"'{t['fingerprint']}')"
+    )
+
+
+def write_batch(out, building_id, number, values):
+    def emit(line=''):
+        print(line, file=out)
+
+    emit(f"-- Lote {number}: {len(values)} transações")
+    emit("BEGIN;")
+    source = ["FROM (VALUES"]
+    source.extend(f"    {v}," for v in values[:-1])
+    source.append(f"    {values[-1]}")
+    source.append(f") AS s ({', '.join(COPY_COLUMNS)})")
+    write_transactions_insert(out, building_id, source)
+    emit("COMMIT;")
+    emit()
+    out.flush()
+
+
+def write_batched_sql(out, transactions, building_id, member_patterns, aggregates,
+                      batch_size=DEFAULT_BATCH_SIZE, member_ids=None, budgets=None):
+    """Consome as transações e escreve-as em lotes; devolve o nº de lotes.
+
+    `aggregates` (de aggregate_payments) e `budgets` (de aggregate_expenses)
+    só ficam completos quando as transações acabam, por isso os saldos e a
+    execução dos orçamentos são escritos no fim, numa única transação.
+    """
+    def emit(line=''):
+        print(line, file=out)
+
+    building = f"{sql_literal(building_id)}::uuid"
+
+    emit("-- =====================================================")
+    emit(f"-- IMPORTAÇÃO DO EXTRATO BPI EM LOTES DE {batch_size} LINHAS")
+    emit("-- Cada lote é uma transação; os saldos são escritos no fim")
+    emit("-- =====================================================")
+    emit("\\set ON_ERROR_STOP on")
+    emit()
+
+    # Tabelas de apoio da sessão (sobrevivem aos COMMIT dos lotes)
+    write_member_lookup(out, building_id, member_patterns, on_commit='PRESERVE ROWS', member_ids=member_ids)
+    emit("CREATE TEMP TABLE import_periods (year INTEGER PRIMARY KEY, period_id UUID) ON COMMIT PRESERVE ROWS;")
+    emit("INSERT INTO import_periods (year, period_id)")
+    emit("SELECT fp.year, fp.id")
+    emit("FROM financial_periods fp")
+    emit(f"WHERE fp.building_id = {building};")
+    emit()
+    triggers = load_triggers(budgets)
+    write_trigger_toggle(out, enable=False, triggers=triggers)
+    emit()
+    out.flush()
+
+    batches = 0
+    values = []
+    for t in transactions:
+        values.append(batch_values(t))
+        if len(values) >= batch_size:
+            batches += 1
+            write_batch(out, building_id, batches, values)
+            values = []
+    if values:
+        batches += 1
+        write_batch(out, building_id, batches, values)
+
+    emit("BEGIN;")
+    write_balance_upsert(out, building_id, aggregates)
+    if budgets is not None:
+        write_budget_rollup(out, building_id, budgets)
+    write_trigger_toggle(out, enable=True, triggers=triggers)
+    emit("COMMIT;")
+    emit()
+    emit("DROP TABLE import_members, import_periods;")
+    emit()
+    out.flush()
+    return batches
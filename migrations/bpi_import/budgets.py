@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Execução dos orçamentos calculada no importador, em vez do trigger por linha
+
+O trigger trigger_update_budget_item_spent (20251123_create_budgets_system.sql)
+refaz amount_spent do item com um SUM sobre transactions a cada despesa
+inserida. Aqui as despesas importadas são somadas por (ano, category_id) à
+passagem e, no fim da carga, um único UPDATE ... FROM refaz o gasto só dos
+(ano, categoria) tocados, nos budget_items dos orçamentos activos. Durante a
+carga o trigger fica desligado (dentro da mesma transação), como o dos saldos
+(balances.py).
+
+As regras são as do trigger: orçamento 'active' do período do edifício, item
+da mesma categoria, gasto = SUM de todas as despesas gravadas (também as
+lançadas à mão ou por importações anteriores), diferença = previsto - gasto.
+Repetir a carga dá o mesmo resultado. Os agregados do extracto dão o
+relatório orçamento vs. executado.
+"""
+
+from decimal import Decimal
+
+from bpi_import.balances import PAYMENT_TRIGGER
+
+BUDGET_TRIGGER = 'trigger_update_budget_item_spent'
+
+
+def aggregate_expenses(transactions, aggregates):
+    """Etapa do pipeline: soma as despesas com categoria por (ano, category_id)"""
+    for t in transactions:
+        if t['type'] == 'expense' and t['category_id']:
+            key = (t['year'], t['category_id'])
+            agg = aggregates.get(key)
+            if agg is None:
+                agg = aggregates[key] = {'spent': Decimal('0'), 'count': 0}
+            agg['spent'] += t['amount']
+            agg['count'] += 1
+        yield t
+
+
+def load_triggers(budgets):
+    """Triggers desligados durante a carga (o dos orçamentos só com budgets)"""
+    if budgets is None:
+        return (PAYMENT_TRIGGER,)
+    return (PAYMENT_TRIGGER, BUDGET_TRIGGER)
+
+
+def _values(aggregates):
+    items = sorted(aggregates.items())
+    return [
+        f"    ({year}, '{category_id}'::uuid, {agg['spent']}, {agg['count']}){',' if i < len(items) - 1 else ''}"
+        for i, ((year, category_id), agg) in enumerate(items)
+    ]
+
+
+def write_budget_rollup(out, building_id, aggregates):
+    """Escreve o UPDATE de budget_items dos (ano, categoria) do extracto.
+
+    O gasto é refeito a partir das transações gravadas (incluindo as desta
+    carga), como em update_budget_item_spent.
+    """
+    def emit(line=''):
+        print(line, file=out)
+
+    building = f"'{building_id}'::uuid"
+
+    emit("-- =====================================================")
+    emit("-- EXECUÇÃO DOS ORÇAMENTOS (agregada no importador)")
+    emit("-- =====================================================")
+    if not aggregates:
+        emit("-- Sem despesas com categoria nesta importação")
+        emit()
+        return
+
+    emit("CREATE TEMP TABLE import_budget_actuals (")
+    emit("    year INTEGER,")
+    emit("    category_id UUID,")
+    emit("    spent NUMERIC(12,2),")
+    emit("    num_expenses INTEGER")
+    emit(") ON COMMIT DROP;")
+    emit("INSERT INTO import_budget_actuals VALUES")
+    values = _values(aggregates)
+    for line in values[:-1]:
+        emit(line)
+    emit(f"{values[-1]};")
+    emit()
+
+    emit("UPDATE budget_items bi")
+    emit("SET")
+    emit("    amount_spent = s.spent,")
+    emit("    amount_variance = bi.amount_budgeted - s.spent,")
+    emit("    variance_percentage = CASE")
+    emit("        WHEN bi.amount_budgeted > 0 THEN")
+    emit("            ((bi.amount_budgeted - s.spent) / bi.amount_budgeted) * 100")
+    emit("        ELSE 0")
+    emit("    END,")
+    emit("    updated_at = NOW()")
+    emit("FROM import_budget_actuals a")
+    emit(f"JOIN financial_periods fp ON fp.building_id = {building} AND fp.year = a.year")
+    emit("JOIN budgets b ON b.period_id = fp.id AND b.status = 'active' AND b.deleted_at IS NULL")
+    emit("CROSS JOIN LATERAL (")
+    emit("    SELECT COALESCE(SUM(t.amount), 0) AS spent")
+    emit("    FROM transactions t")
+    emit("    WHERE t.category_id = a.category_id")
+    emit("      AND t.period_id = fp.id")
+    emit("      AND t.transaction_type = 'expense'")
+    emit("      AND t.deleted_at IS NULL")
+    emit(") s")
+    emit("WHERE bi.budget_id = b.id")
+    emit("  AND bi.category_id = a.category_id")
+    emit("  AND bi.deleted_at IS NULL;")
+    emit()
+    write_budget_report(out, building_id, aggregates)
+
+
+def write_budget_report(out, building_id, aggregates):
+    """Consulta orçamento vs. executado, com os totais desta importação ao lado do gasto registado"""
+    def emit(line=''):
+        print(line, file=out)
+
+    if not aggregates:
+        return
+    emit("-- Orçamento vs. executado por ano e categoria")
+    emit("SELECT")
+    emit('    a.year AS "Ano",')
+    emit('    COALESCE(bi.item_name, tc.name, a.category_id::text) AS "Item",')
+    emit('    bi.amount_budgeted AS "Previsto (€)",')
+    emit('    a.spent AS "Importado (€)",')
+    emit('    bi.amount_spent AS "Gasto (€)",')
+    emit('    bi.amount_variance AS "Diferença (€)",')
+    emit('    CONCAT(bi.variance_percentage, \'%\') AS "Variação (%)"')
+    emit("FROM (VALUES")
+    for line in _values(aggregates):
+        emit(line)
+    emit(") AS a (year, category_id, spent, num_expenses)")
+    emit("LEFT JOIN transaction_categories tc ON tc.id = a.category_id")
+    emit(f"LEFT JOIN financial_periods fp ON fp.building_id = '{building_id}'::uuid AND fp.year = a.year")
+    emit("LEFT JOIN budgets b ON b.period_id = fp.id AND b.status = 'active' AND b.deleted_at IS NULL")
+    emit("LEFT JOIN budget_items bi ON bi.budget_id = b.id AND bi.category_id = a.category_id")
+    emit("    AND bi.deleted_at IS NULL")
+    emit('ORDER BY "Ano", "Item";')
+    emit()
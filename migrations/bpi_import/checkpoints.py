@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Checkpoints de saldo por conta e mês (saldo inicial + saldos de fecho)
+
+Em vez de refazer os saldos a partir de todas as transações desde 2021, o
+pipeline guarda, por conta, o saldo antes da primeira transação ('opening')
+e, por mês, as receitas, as despesas, o nº de linhas, um digest das linhas
+e o saldo de fecho, em cêntimos, num ficheiro JSON (como o watermark).
+
+- Uma nova importação só lê as linhas a partir do último mês com checkpoint
+  (resume_from; esse mês pode ter ficado incompleto e é relido).
+- O saldo numa data é o fecho do último checkpoint anterior mais as linhas
+  entre esse mês e a data (closing_before + uma leitura curta por mmap).
+- O digest de um mês é a soma (mod 2^64) das impressões digitais das suas
+  linhas, independente da ordem. Se uma releitura de um mês antigo der outro
+  digest (uma correcção), só os fechos desse mês em diante são refeitos, a
+  partir dos totais mensais já guardados, sem reler transações.
+"""
+
+import json
+import os
+
+from bpi_import.rules import to_cents
+
+_MASK = (1 << 64) - 1
+
+
+def month_key(date):
+    """'2024-03-15' -> '2024-03'"""
+    return date[:7]
+
+
+def month_start_after(month):
+    """'2024-12' -> '2025-01-01'"""
+    year, number = int(month[:4]), int(month[5:7])
+    return f"{year + number // 12:04d}-{number % 12 + 1:02d}-01"
+
+
+def track_months(transactions, months):
+    """Etapa do pipeline: soma as transações em months[(conta, 'AAAA-MM')].
+
+    Cada valor é [receitas, despesas, linhas, digest], em cêntimos; as
+    transações precisam da impressão digital (fingerprint_transactions).
+    """
+    for t in transactions:
+        key = (t['account'], month_key(t['date']))
+        totals = months.get(key)
+        if totals is None:
+            totals = months[key] = [0, 0, 0, 0]
+        totals[0 if t['type'] == 'income' else 1] += to_cents(t['amount'])
+        totals[2] += 1
+        totals[3] = (totals[3] + int(t['fingerprint'][:16], 16)) & _MASK
+        yield t
+
+
+class BalanceCheckpoints:
+    """Checkpoints de saldo persistidos num ficheiro JSON (ou só em memória, sem path)"""
+
+    def __init__(self, path=None):
+        self.path = path
+        self.accounts = {}
+        if path and os.path.exists(path):
+            with open(path, encoding='utf-8') as handle:
+                self.accounts = json.load(handle)
+
+    def _account(self, account):
+        entry = self.accounts.get(account)
+        if entry is None:
+            entry = self.accounts[account] = {'opening': 0, 'months': {}}
+        return entry
+
+    def opening(self, account):
+        entry = self.accounts.get(account)
+        return entry['opening'] if entry else 0
+
+    def set_opening(self, account, cents):
+        """Saldo antes da primeira transação; se mudar, refaz todos os fechos da conta"""
+        entry = self._account(account)
+        if entry['opening'] != cents:
+            entry['opening'] = cents
+            self._recompute(account, None)
+
+    def record(self, months, incremental=False):
+        """Junta os totais de track_months; devolve {conta: 1º mês alterado}.
+
+        Sem incremental cada mês lido é completo e substitui o guardado (se o
+        digest for o mesmo nada muda); com incremental (linhas filtradas pelo
+        watermark) os totais somam-se aos do mês.
+        """
+        changed = {}
+        for (account, month), (income, expense, rows, digest) in sorted(months.items()):
+            stored = self._account(account)['months']
+            current = stored.get(month)
+            if current is not None:
+                if incremental:
+                    income += current['income']
+                    expense += current['expense']
+                    rows += current['rows']
+                    digest = (digest + int(current['digest'], 16)) & _MASK
+                elif current['rows'] == rows and current['digest'] == f'{digest:016x}':
+                    continue
+            stored[month] = {'income': income, 'expense': expense, 'rows': rows,
+                             'digest': f'{digest:016x}', 'closing': None}
+            if account not in changed or month < changed[account]:
+                changed[account] = month
+
+        for account, month in changed.items():
+            self._recompute(account, month)
+        return changed
+
+    def _recompute(self, account, since):
+        """Refaz os fechos a partir do mês since (os anteriores ficam como estão)"""
+        entry = self.accounts[account]
+        balance = entry['opening']
+        for month in sorted(entry['months']):
+            totals = entry['months'][month]
+            if since is None or month >= since:
+                totals['closing'] = balance + totals['income'] - totals['expense']
+            balance = totals['closing']
+
+    def last_month(self, account):
+        entry = self.accounts.get(account)
+        if not entry or not entry['months']:
+            return None
+        return max(entry['months'])
+
+    def resume_from(self, accounts=None):
+        """1º dia a reler (o do último mês com checkpoint, o mais antigo entre as contas); None = tudo"""
+        months = [self.last_month(a) for a in (self.accounts if accounts is None else accounts)]
+        if not months or None in months:
+            return None
+        return f'{min(months)}-01'
+
+    def closing_before(self, account, date):
+        """(mês, saldo) do último checkpoint anterior ao mês de date; sem nenhum, (None, saldo inicial)"""
+        entry = self.accounts.get(account)
+        if not entry:
+            return None, 0
+        earlier = [m for m in entry['months'] if m < month_key(date)]
+        if not earlier:
+            return None, entry['opening']
+        month = max(earlier)
+        return month, entry['months'][month]['closing']
+
+    def monthly(self, account):
+        """[(ano, mês, receitas, despesas, saldo de fecho)] por ordem cronológica"""
+        entry = self.accounts.get(account)
+        if not entry:
+            return []
+        return [(int(month[:4]), int(month[5:7]), m['income'], m['expense'], m['closing'])
+                for month, m in sorted(entry['months'].items())]
+
+    def save(self):
+        """Grava os checkpoints (chamar só depois de o SQL ter sido escrito)"""
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as handle:
+            json.dump(self.accounts, handle, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
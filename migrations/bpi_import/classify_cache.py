@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cache de classificação: LRU em memória + SQLite persistente entre execuções
+
+Os extractos repetem as mesmas linhas todos os meses (a mesma transferência
+do mesmo membro, o mesmo débito da luz), por isso a classificação é guardada
+por (descrição, beneficiário, categoria, ...). A camada em memória é um LRU
+limitado; a camada em disco é um ficheiro SQLite, lido só nas falhas do LRU.
+
+Cada importador usa o seu namespace e regista o digest das suas tabelas de
+regras: se MEMBER_MAP/CATEGORY_MAP/... mudarem, as entradas desse namespace
+são apagadas ao abrir a cache.
+
+Os números de operação (ex.: 'TRF CR SEPA+ 0000028') tornam cada linha
+única; quando nenhum dos padrões procurados no texto contém dígitos, cada sequência de
+dígitos da chave é reduzida a '0', o que não altera nenhum resultado (um
+padrão sem dígitos coincide com o texto original se e só se coincidir com o
+texto reduzido).
+"""
+
+import hashlib
+import json
+import re
+from collections import OrderedDict
+
+DEFAULT_MAXSIZE = 65536
+
+# Nº de entradas novas acumuladas antes de as escrever no SQLite
+FLUSH_EVERY = 1000
+
+_DIGIT_RUNS = re.compile(r'\d+')
+
+
+def rules_digest(rules):
+    """SHA-256 das tabelas de regras (qualquer estrutura serializável em JSON)"""
+    text = json.dumps(rules, sort_keys=True, ensure_ascii=False, default=list)
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class ClassificationCache:
+    def __init__(self, namespace, rules, patterns, path=None, maxsize=DEFAULT_MAXSIZE):
+        """`rules`: tudo o que determina o resultado; `patterns`: textos procurados nas linhas"""
+        self.namespace = namespace
+        self.digest = rules_digest(rules)
+        self.collapse_digits = not any(ch.isdigit() for pattern in patterns for ch in pattern)
+        self.maxsize = maxsize
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._lru = OrderedDict()
+        self._pending = {}
+        self._db = None
+        if path:
+            self._open(path)
+
+    def _open(self, path):
+        # Só a cache persistente precisa do sqlite3 (importado aqui, não no arranque)
+        import sqlite3
+
+        # Vários processos (--jobs) podem partilhar o ficheiro
+        db = sqlite3.connect(path, timeout=60)
+        db.execute("CREATE TABLE IF NOT EXISTS rules (namespace TEXT PRIMARY KEY, digest TEXT NOT NULL)")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS classification ("
+            " namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL,"
+            " PRIMARY KEY (namespace, key))"
+        )
+        row = db.execute("SELECT digest FROM rules WHERE namespace = ?", (self.namespace,)).fetchone()
+        if row is None or row[0] != self.digest:
+            # Regras alteradas: as classificações guardadas deixam de valer
+            db.execute("DELETE FROM classification WHERE namespace = ?", (self.namespace,))
+            db.execute("INSERT OR REPLACE INTO rules VALUES (?, ?)", (self.namespace, self.digest))
+        db.commit()
+        self._db = db
+
+    def key(self, *fields):
+        text = '\x1f'.join(fields)
+        if self.collapse_digits:
+            text = _DIGIT_RUNS.sub('0', text)
+        return text
+
+    def get(self, key):
+        """Valor guardado (tuplo) ou None"""
+        value = self._lru.get(key)
+        if value is not None:
+            self._lru.move_to_end(key)
+            self.hits += 1
+            return value
+
+        value = self._pending.get(key)
+        if value is None and self._db is not None:
+            row = self._db.execute(
+                "SELECT value FROM classification WHERE namespace = ? AND key = ?", (self.namespace, key)
+            ).fetchone()
+            if row is not None:
+                value = tuple(json.loads(row[0]))
+        if value is None:
+            self.misses += 1
+            return None
+
+        self.disk_hits += 1
+        self._remember(key, value)
+        return value
+
+    def put(self, key, value):
+        value = tuple(value)
+        self._remember(key, value)
+        if self._db is not None:
+            self._pending[key] = value
+            if len(self._pending) >= FLUSH_EVERY:
+                self.flush()
+        return value
+
+    def _remember(self, key, value):
+        self._lru[key] = value
+        if len(self._lru) > self.maxsize:
+            self._lru.popitem(last=False)
+
+    def flush(self):
+        if self._db is None or not self._pending:
+            return
+        self._db.executemany(
+            "INSERT OR REPLACE INTO classification VALUES (?, ?, ?)",
+            [(self.namespace, key, json.dumps(value)) for key, value in self._pending.items()],
+        )
+        self._db.commit()
+        self._pending = {}
+
+    def close(self):
+        self.flush()
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def stats(self):
+        return {'hits': self.hits, 'disk_hits': self.disk_hits, 'misses': self.misses, 'size': len(self._lru)}
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Linha de comandos única dos importadores BPI
+
+  python -m bpi_import process [opções] [ficheiros]   SQL de importação
+  python -m bpi_import analyze [opções] [ficheiros]   saldos ano a ano
+  python -m bpi_import summary [opções] [ficheiros]   resumo da classificação
+
+Só o módulo do subcomando é importado (e, dentro dele, só os das opções
+usadas), por isso o arranque não paga o que o comando não usa. Sem ficheiros
+os três usam o extracto de exemplo (bpi_import/data/extracto_buraca.csv).
+"""
+
+import argparse
+import importlib
+import sys
+
+PROG = 'python -m bpi_import'
+
+# subcomando -> (módulo com main(argv, prog), descrição)
+COMMANDS = {
+    'process': ('bpi_import.process', 'gera o SQL de importação (CSV ou CSV.gz)'),
+    'analyze': ('bpi_import.analyze', 'análise ano a ano: saldos, categorias e membros'),
+    'summary': ('bpi_import.summary', 'resumo da classificação (membros, categorias, descartes)'),
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog=PROG,
+        description='Importadores de exportações BPI',
+        epilog='\n'.join(f"  {name:<9}{description}" for name, (_, description) in COMMANDS.items()),
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument('command', choices=COMMANDS, metavar='COMANDO', help=', '.join(COMMANDS))
+    parser.add_argument('args', nargs=argparse.REMAINDER, metavar='OPÇÕES', help="opções do comando (COMANDO --help)")
+    args = parser.parse_args(argv)
+
+    module, _ = COMMANDS[args.command]
+    return importlib.import_module(module).main(args.args, prog=f'{PROG} {args.command}')
+
+
+if __name__ == '__main__':
+    sys.exit(main())
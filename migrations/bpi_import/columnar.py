@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Parse colunar (NumPy) das colunas Fecha e Importe
+
+Um lote inteiro de valores é convertido de uma vez: datas DD/MM/YYYY em dias
+desde 1970-01-01 e valores '1629,24' / '-0,32' em cêntimos inteiros (int64),
+sem Decimal nem datetime por linha. As linhas inválidas não levantam
+excepções: ficam marcadas a False nas máscaras date_ok / amount_ok.
+Os totais em cêntimos são exactos.
+"""
+
+import numpy as np
+
+_ZERO = ord('0')
+
+# Dias acumulados antes de cada mês (ano comum), para dias desde a época
+_DAYS_BEFORE_MONTH = np.array([0, 31, 59, 90, 120, 151, 181, 212, 243, 273, 304, 334], dtype=np.int64)
+_DAYS_IN_MONTH = np.array([31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31], dtype=np.int64)
+
+
+def _code_points(values):
+    """Matriz (n, largura) de code points; posições vazias ficam a 0"""
+    arr = np.asarray(values, dtype=np.str_)
+    width = arr.dtype.itemsize // 4
+    if len(arr) == 0 or width == 0:
+        return np.zeros((len(arr), 0), dtype=np.uint32)
+    return arr.view(np.uint32).reshape(len(arr), width)
+
+
+def _is_leap(year):
+    return (year % 4 == 0) & ((year % 100 != 0) | (year % 400 == 0))
+
+
+def days_from_civil(year, month, day):
+    """Dias desde 1970-01-01 (vectorizado, calendário gregoriano)"""
+    y = year - 1
+    days_before_year = 365 * y + y // 4 - y // 100 + y // 400 - 719162
+    leap_shift = (_is_leap(year) & (month > 2)).astype(np.int64)
+    return days_before_year + _DAYS_BEFORE_MONTH[np.clip(month, 1, 12) - 1] + leap_shift + day - 1
+
+
+def split_days(days):
+    """Dias desde a época -> (ano, mês, dia) como arrays int64"""
+    d64 = np.asarray(days, dtype='datetime64[D]')
+    months = d64.astype('datetime64[M]')
+    year = months.astype('datetime64[Y]').astype(np.int64) + 1970
+    month = (months.astype(np.int64) % 12) + 1
+    day = (d64 - months).astype(np.int64) + 1
+    return year, month, day
+
+
+def parse_dates(values):
+    """DD/MM/YYYY -> (dias desde a época int64, máscara de válidos)"""
+    codes = _code_points(values)
+    n = len(codes)
+    if codes.shape[1] < 10:
+        return np.zeros(n, dtype=np.int64), np.zeros(n, dtype=bool)
+
+    c = codes[:, :10].astype(np.int64) - _ZERO
+    digits = c[:, [0, 1, 3, 4, 6, 7, 8, 9]]
+    ok = ((digits >= 0) & (digits <= 9)).all(axis=1)
+    ok &= (codes[:, 2] == ord('/')) & (codes[:, 5] == ord('/'))
+    if codes.shape[1] > 10:
+        ok &= (codes[:, 10:] == 0).all(axis=1)
+
+    day = c[:, 0] * 10 + c[:, 1]
+    month = c[:, 3] * 10 + c[:, 4]
+    year = c[:, 6] * 1000 + c[:, 7] * 100 + c[:, 8] * 10 + c[:, 9]
+
+    ok &= (month >= 1) & (month <= 12) & (day >= 1) & (year >= 1)
+    month_len = _DAYS_IN_MONTH[np.clip(month, 1, 12) - 1] + (_is_leap(year) & (month == 2))
+    ok &= day <= month_len
+
+    days = np.where(ok, days_from_civil(year, month, day), 0)
+    return days, ok
+
+
+def parse_amounts(values):
+    """'1629,24' / '-0,32' / '26.13' -> (cêntimos int64, máscara de válidos).
+
+    Aceita um único separador decimal (',' ou '.') com até 2 casas, sinal
+    antes dos dígitos e espaços (também U+00A0) em qualquer posição, como o
+    parse_amount de rules.py. Separadores de milhares não são aceites.
+    """
+    codes = _code_points(values).astype(np.int64)
+    n = len(codes)
+    if codes.shape[1] == 0:
+        return np.zeros(n, dtype=np.int64), np.zeros(n, dtype=bool)
+
+    is_digit = (codes >= ord('0')) & (codes <= ord('9'))
+    is_sep = (codes == ord(',')) | (codes == ord('.'))
+    is_minus = codes == ord('-')
+    is_plus = codes == ord('+')
+    is_blank = (codes == 0) | (codes == ord(' ')) | (codes == 0xA0)
+
+    ok = (is_digit | is_sep | is_minus | is_plus | is_blank).all(axis=1)
+    ok &= is_sep.sum(axis=1) <= 1
+    ok &= (is_minus | is_plus).sum(axis=1) <= 1
+
+    # O sinal tem de vir antes de qualquer dígito e do separador
+    after_sep = np.cumsum(is_sep, axis=1) > 0
+    digits_before = np.cumsum(is_digit, axis=1) - is_digit
+    ok &= ~((is_minus | is_plus) & ((digits_before > 0) | after_sep)).any(axis=1)
+
+    int_digit = is_digit & ~after_sep
+    frac_digit = is_digit & after_sep
+
+    n_int = int_digit.sum(axis=1)
+    n_frac = frac_digit.sum(axis=1)
+    ok &= (n_int + n_frac >= 1) & (n_frac <= 2) & (n_int <= 15)
+
+    value = np.where(is_digit, codes - _ZERO, 0)
+
+    # Expoente de cada dígito inteiro = nº de dígitos inteiros à sua direita
+    int_exp = np.cumsum(int_digit[:, ::-1], axis=1)[:, ::-1] - 1
+    int_exp = np.where(int_digit, int_exp, 0)
+    integer = (value * np.where(int_digit, 10 ** int_exp, 0)).sum(axis=1)
+
+    # 1ª casa decimal vale 10 cêntimos, a 2ª vale 1
+    frac_rank = np.cumsum(frac_digit, axis=1)
+    frac_weight = np.where(frac_digit & (frac_rank <= 2), 10 ** np.clip(2 - frac_rank, 0, 2), 0)
+    fraction = (value * frac_weight).sum(axis=1)
+
+    cents = integer * 100 + fraction
+    cents = np.where(is_minus.any(axis=1), -cents, cents)
+    return np.where(ok, cents, 0), ok
+
+
+class ColumnBatch:
+    """Colunas tipadas de um lote do extracto"""
+
+    def __init__(self, fechas, importes):
+        self.days, self.date_ok = parse_dates(fechas)
+        self.cents, self.amount_ok = parse_amounts(importes)
+        self.ok = self.date_ok & self.amount_ok
+
+        self.year, self.month, self.day = split_days(self.days)
+        self.sign = np.sign(self.cents)
+        self.abs_cents = np.abs(self.cents)
+        self.is_income = self.cents > 0
+
+    def __len__(self):
+        return len(self.days)
+
+    def totals(self):
+        """Totais exactos (cêntimos) de receitas e despesas das linhas válidas"""
+        valid = self.ok
+        income = int(self.cents[valid & (self.cents > 0)].sum())
+        expense = int(-self.cents[valid & (self.cents < 0)].sum())
+        return income, expense
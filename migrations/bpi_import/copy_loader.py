@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Saída em modo COPY: ficheiro de dados CSV + script psql de carregamento
+
+Em vez de um bloco DO com todas as descrições escapadas à mão, as transações
+vão para um CSV compatível com COPY. O loader carrega-o numa tabela temporária
+com um único \\copy e resolve building, períodos e membros com joins feitos
+uma vez, num só INSERT ... SELECT.
+"""
+
+import csv
+
+from bpi_import.balances import write_balance_upsert, write_trigger_toggle
+from bpi_import.budgets import load_triggers, write_budget_rollup
+
+DATA_FILE = 'transactions.csv'
+LOADER_FILE = 'load.sql'
+
+# Colunas da tabela de staging, pela ordem do CSV
+COPY_COLUMNS = [
+    'line_no', 'transaction_date', 'year', 'transaction_type', 'description',
+    'amount', 'member_key', 'is_fee_payment', 'category_id', 'payment_method',
+    'import_fingerprint',
+]
+
+PAYMENT_METHODS = {
+    'income': 'Transferência Bancária',
+    'expense': 'Débito Direto',
+}
+
+
+def copy_row(t):
+    """Linha CSV de uma transação classificada (campos vazios = NULL)"""
+    return [
+        t['idx'],
+        t['date'],
+        t['year'],
+        t['type'],
+        t['description'],
+        t['amount'],
+        t['member_key'] or '',
+        'true' if t['is_fee'] else 'false',
+        t['category_id'] or '',
+        PAYMENT_METHODS[t['type']],
+        t['fingerprint'],
+    ]
+
+
+def write_copy_file(transactions, path):
+    """Escreve as transações em streaming; devolve o número de linhas"""
+    count = 0
+    with open(path, 'w', encoding='utf-8', newline='') as handle:
+        writer = csv.writer(handle, lineterminator='\n')
+        writer.writerow(COPY_COLUMNS)
+        for t in transactions:
+            writer.writerow(copy_row(t))
+            count += 1
+    return count
+
+
+def sql_literal(value):
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def write_member_lookup(out, building_id, member_patterns, on_commit='DROP', member_ids=None):
+    """Tabela temporária import_members (member_key -> member_id), resolvida uma vez.
+
+    on_commit='PRESERVE ROWS' mantém-na para as transações seguintes da sessão.
+    Com member_ids ({member_key: uuid}, do directório de membros) os IDs são
+    escritos literalmente, sem procurar os nomes com LIKE.
+    """
+    def emit(line=''):
+        print(line, file=out)
+
+    building = f"{sql_literal(building_id)}::uuid"
+
+    emit(f"CREATE TEMP TABLE import_members (member_key TEXT PRIMARY KEY, member_id UUID) ON COMMIT {on_commit};")
+    emit("INSERT INTO import_members (member_key, member_id)")
+    if member_ids is not None:
+        items = sorted(member_ids.items())
+        if not items:
+            emit("SELECT NULL, NULL WHERE false;")
+            emit()
+            return
+        emit("VALUES")
+        for i, (member_key, member_id) in enumerate(items):
+            comma = ',' if i < len(items) - 1 else ';'
+            emit(f"    ({sql_literal(member_key)}, {sql_literal(member_id)}::uuid){comma}")
+        emit()
+        return
+    emit("SELECT DISTINCT ON (p.member_key) p.member_key, m.id")
+    emit("FROM (VALUES")
+    patterns = sorted(member_patterns.items())
+    for i, (member_key, pattern) in enumerate(patterns):
+        comma = ',' if i < len(patterns) - 1 else ''
+        emit(f"    ({sql_literal(member_key)}, {sql_literal(pattern)}){comma}")
+    emit(") AS p (member_key, name_pattern)")
+    emit(f"JOIN members m ON m.building_id = {building} AND m.name LIKE p.name_pattern")
+    emit("ORDER BY p.member_key, m.name;")
+    emit()
+
+
+def write_transactions_insert(out, building_id, source):
+    """INSERT ... SELECT das linhas de `source` (linhas FROM com alias s e as COPY_COLUMNS).
+
+    Precisa das tabelas temporárias import_periods e import_members.
+    """
+    def emit(line=''):
+        print(line, file=out)
+
+    building = f"{sql_literal(building_id)}::uuid"
+
+    emit("INSERT INTO transactions (")
+    emit("    id, building_id, period_id, member_id, category_id,")
+    emit("    transaction_date, transaction_type, description, amount,")
+    emit("    is_fee_payment, payment_method, year, import_fingerprint")
+    emit(")")
+    emit("SELECT")
+    emit(f"    uuid_generate_v4(), {building}, p.period_id, m.member_id, s.category_id,")
+    emit("    s.transaction_date, s.transaction_type, s.description, s.amount,")
+    emit("    s.is_fee_payment, s.payment_method, s.year, s.import_fingerprint")
+    for line in source:
+        emit(line)
+    emit("LEFT JOIN import_periods p ON p.year = s.year")
+    emit("LEFT JOIN import_members m ON m.member_key = s.member_key")
+    emit("ORDER BY s.line_no")
+    emit("ON CONFLICT (import_fingerprint) WHERE import_fingerprint IS NOT NULL DO NOTHING;")
+
+
+def write_loader_script(out, building_id, member_patterns, aggregates,
+                        data_file=DATA_FILE, member_ids=None, budgets=None):
+    """Escreve o script psql que carrega `data_file` com um único \\copy.
+
+    Com budgets (de aggregate_expenses) a execução dos orçamentos também é
+    actualizada em bloco (budgets.py).
+    """
+    def emit(line=''):
+        print(line, file=out)
+
+    building = f"{sql_literal(building_id)}::uuid"
+
+    emit("-- =====================================================")
+    emit("-- CARREGAMENTO EM BLOCO DO EXTRATO BPI (COPY)")
+    emit(f"-- Executar na pasta do ficheiro: psql \"$DATABASE_URL\" -f {LOADER_FILE}")
+    emit("-- =====================================================")
+    emit("\\set ON_ERROR_STOP on")
+    emit()
+    emit("BEGIN;")
+    emit()
+    emit("CREATE TEMP TABLE import_staging (")
+    emit("    line_no INTEGER,")
+    emit("    transaction_date DATE,")
+    emit("    year INTEGER,")
+    emit("    transaction_type VARCHAR(20),")
+    emit("    description TEXT,")
+    emit("    amount NUMERIC(12,2),")
+    emit("    member_key TEXT,")
+    emit("    is_fee_payment BOOLEAN,")
+    emit("    category_id UUID,")
+    emit("    payment_method VARCHAR(50),")
+    emit("    import_fingerprint VARCHAR(64)")
+    emit(") ON COMMIT DROP;")
+    emit()
+    emit(f"\\copy import_staging ({', '.join(COPY_COLUMNS)}) FROM {sql_literal(data_file)} WITH (FORMAT csv, HEADER true)")
+    emit()
+
+    write_member_lookup(out, building_id, member_patterns, member_ids=member_ids)
+
+    # Períodos: ano -> id, só os anos presentes no ficheiro
+    emit("CREATE TEMP TABLE import_periods (year INTEGER PRIMARY KEY, period_id UUID) ON COMMIT DROP;")
+    emit("INSERT INTO import_periods (year, period_id)")
+    emit("SELECT fp.year, fp.id")
+    emit("FROM financial_periods fp")
+    emit(f"WHERE fp.building_id = {building}")
+    emit("  AND fp.year IN (SELECT DISTINCT year FROM import_staging);")
+    emit()
+
+    # Os saldos são calculados em bloco no fim, não linha a linha
+    write_trigger_toggle(out, enable=False, triggers=load_triggers(budgets))
+    write_transactions_insert(out, building_id, ["FROM import_staging s"])
+    write_trigger_toggle(out, enable=True, triggers=load_triggers(budgets))
+    emit()
+
+    write_balance_upsert(out, building_id, aggregates)
+    if budgets is not None:
+        write_budget_rollup(out, building_id, budgets)
+    emit("COMMIT;")
+    emit()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Impressões digitais estáveis das linhas do extracto e watermark por conta
+
+A impressão digital depende só do conteúdo da linha (conta, data, hora,
+valor, descrição, memória), nunca da posição no ficheiro, por isso a mesma
+linha tem o mesmo valor em todas as exportações. Linhas idênticas no mesmo
+dia (ex.: duas comissões iguais) distinguem-se pelo nº de ocorrência.
+
+O watermark guarda, por conta, a data mais recente já importada e as
+impressões digitais desse dia; numa nova execução só passam as linhas
+posteriores (ou do próprio dia mas ainda desconhecidas).
+"""
+
+import hashlib
+import json
+import os
+from decimal import Decimal
+
+
+def _clean(text):
+    return ' '.join((text or '').split()).upper()
+
+
+def row_fingerprint(account, date, time, amount, description, memoria, occurrence=0):
+    """SHA-256 (hex) dos campos normalizados da linha bancária"""
+    signed = Decimal(amount).quantize(Decimal('0.01'))
+    key = '\x1f'.join([
+        _clean(account),
+        date,
+        (time or '').strip(),
+        str(signed),
+        _clean(description),
+        _clean(memoria),
+        str(occurrence),
+    ])
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+
+def fingerprint_transactions(transactions):
+    """Etapa do pipeline: acrescenta t['fingerprint'] a cada transação.
+
+    As exportações BPI vêm ordenadas por data, por isso o contador de
+    linhas repetidas só precisa de guardar o dia corrente.
+    """
+    current_date = None
+    seen = {}
+    for t in transactions:
+        if t['date'] != current_date:
+            current_date = t['date']
+            seen = {}
+
+        base = (t['account'], t['time'], t['signed_amount'], t['raw_description'], t['memoria'])
+        occurrence = seen.get(base, 0)
+        seen[base] = occurrence + 1
+
+        t['fingerprint'] = row_fingerprint(
+            t['account'], t['date'], t['time'], t['signed_amount'],
+            t['raw_description'], t['memoria'], occurrence
+        )
+        yield t
+
+
+def filter_known(transactions, fingerprints, metrics=None):
+    """Etapa do pipeline: descarta as transações já gravadas (ex.: num backup, ver pgdump.py)"""
+    for t in transactions:
+        if t['fingerprint'] in fingerprints:
+            if metrics:
+                metrics.skip('in_backup')
+            continue
+        yield t
+
+
+class WatermarkStore:
+    """Watermark por conta persistido num ficheiro JSON.
+
+    Sem `path` (ex.: dentro de um processo de trabalho) recebe as contas já
+    carregadas e devolve o novo watermark com pending(), para o processo
+    principal o juntar com absorb() e gravar.
+    """
+
+    def __init__(self, path=None, accounts=None):
+        self.path = path
+        self.accounts = {}
+        if accounts is not None:
+            self.accounts = accounts
+        elif path and os.path.exists(path):
+            with open(path, encoding='utf-8') as handle:
+                self.accounts = json.load(handle)
+        self._pending = {}
+
+    def is_new(self, t):
+        """True se a transação ainda não foi importada para a sua conta"""
+        mark = self.accounts.get(t['account'])
+        if mark is None or t['date'] > mark['date']:
+            return True
+        if t['date'] < mark['date']:
+            return False
+        return t['fingerprint'] not in mark['fingerprints']
+
+    def observe(self, t):
+        """Regista a transação como candidata ao novo watermark"""
+        pending = self._pending.get(t['account'])
+        if pending is None or t['date'] > pending['date']:
+            # Ao subir de dia, herda as impressões já conhecidas desse dia
+            previous = self.accounts.get(t['account'])
+            known = previous['fingerprints'] if previous and previous['date'] == t['date'] else []
+            pending = {'date': t['date'], 'fingerprints': set(known)}
+            self._pending[t['account']] = pending
+        if t['date'] == pending['date']:
+            pending['fingerprints'].add(t['fingerprint'])
+
+    def filter_new(self, transactions):
+        """Etapa do pipeline: deixa passar só as linhas posteriores ao watermark"""
+        for t in transactions:
+            if self.is_new(t):
+                self.observe(t)
+                yield t
+
+    def pending(self):
+        """Novo watermark das contas vistas nesta execução (serializável)"""
+        return {
+            account: {'date': mark['date'], 'fingerprints': sorted(mark['fingerprints'])}
+            for account, mark in self._pending.items()
+        }
+
+    def absorb(self, pending):
+        """Junta o watermark calculado noutro processo"""
+        for account, mark in pending.items():
+            self._pending[account] = {'date': mark['date'], 'fingerprints': set(mark['fingerprints'])}
+
+    def save(self):
+        """Grava o novo watermark (chamar só depois de o SQL ter sido escrito)"""
+        self.accounts.update(self.pending())
+        self._pending = {}
+
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as handle:
+            json.dump(self.accounts, handle, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Classificador multi-padrão compilado (membros e categorias de despesa)
+
+Todos os padrões são normalizados uma única vez (maiúsculas, sem acentos) e
+compilados numa só alternância regex. Cada linha é percorrida uma vez,
+independentemente do número de padrões da tabela.
+"""
+
+import re
+import unicodedata
+
+
+def normalize(text):
+    """Maiúsculas e sem acentos ('Manutenção' -> 'MANUTENCAO')"""
+    text = text.upper()
+    if text.isascii():
+        return text
+    decomposed = unicodedata.normalize('NFKD', text)
+    return ''.join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def _trie_regex(node):
+    """Converte um trie {carácter: subárvore, '': fim} numa regex factorizada"""
+    branches = [re.escape(ch) + _trie_regex(child) for ch, child in sorted(node.items()) if ch]
+    # O fim de padrão vai por último: o regex prefere sempre o padrão mais longo
+    if '' in node:
+        branches.append('')
+    if len(branches) == 1:
+        return branches[0]
+    return '(?:' + '|'.join(branches) + ')'
+
+
+class PatternMatcher:
+    """Devolve o valor do primeiro padrão (pela ordem da tabela) contido no texto.
+
+    Mantém a semântica dos antigos ciclos `for pattern in TABELA: if pattern in
+    text`: ganha o padrão que aparece primeiro na tabela, não o que aparece
+    primeiro no texto.
+
+    Os padrões são compilados num trie-regex dentro de um lookahead, por isso
+    em cada posição do texto o custo é o de descer o trie (não o de testar
+    todos os padrões) e obtém-se o padrão mais longo que começa aí. Os outros
+    padrões que começam na mesma posição são forçosamente prefixos desse, e a
+    melhor prioridade entre eles está pré-calculada em `_priority`.
+    """
+
+    def __init__(self, rules, default=None):
+        self.default = default
+        self.patterns = []
+        self.values = []
+
+        priority = {}
+        for pattern, value in rules:
+            key = normalize(pattern)
+            # Padrões repetidos após normalização nunca ganhariam: descartar
+            if not key or key in priority:
+                continue
+            priority[key] = len(self.patterns)
+            self.patterns.append(key)
+            self.values.append(value)
+
+        # Prioridade efectiva = melhor entre o padrão e os seus prefixos
+        self._priority = {
+            key: min(priority.get(key[:n], rank) for n in range(1, len(key) + 1))
+            for key, rank in priority.items()
+        }
+
+        if self.patterns:
+            trie = {}
+            for key in self.patterns:
+                node = trie
+                for ch in key:
+                    node = node.setdefault(ch, {})
+                node[''] = True
+            self._regex = re.compile(f'(?=({_trie_regex(trie)}))')
+        else:
+            self._regex = None
+
+    def __len__(self):
+        return len(self.patterns)
+
+    def match_normalized(self, text):
+        """Como match(), para texto já normalizado"""
+        if self._regex is None:
+            return self.default
+
+        priority = self._priority
+        best = None
+        for m in self._regex.finditer(text):
+            rank = priority[m.group(1)]
+            if best is None or rank < best:
+                best = rank
+                if best == 0:
+                    break
+
+        return self.default if best is None else self.values[best]
+
+    def match(self, text):
+        return self.match_normalized(normalize(text))
+
+    __call__ = match
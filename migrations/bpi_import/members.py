@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Directório de membros: nomes e aliases -> member_id, resolvido em Python
+
+Carregado uma vez de uma exportação da tabela members (CSV), de uma
+exportação de aliases (CSV alias,member) ou de um backup pg_dump (bloco
+COPY public.members, simples ou .gz). Cada nome e alias fica num dicionário
+indexado pela forma normalizada (maiúsculas, sem acentos nem pontuação), por
+isso identificar o pagador é uma consulta O(1) pelo beneficiário ou pelo
+nome a seguir a ' DE ' na descrição; só se nenhuma coincidir o texto é
+procurado (PatternMatcher) por todos os nomes e aliases.
+
+Com o directório os importadores emitem os UUIDs literais dos membros em vez
+de os procurar com `name LIKE` em cada importação.
+"""
+
+import csv
+import os
+import re
+from decimal import Decimal
+
+from bpi_import.matcher import PatternMatcher, normalize
+from bpi_import.pgdump import iter_table
+from bpi_import.reader import dict_reader, open_extract
+from bpi_import.similarity import TrigramIndex
+
+# Separador dos aliases na coluna 'aliases' da exportação de membros
+ALIAS_SEPARATOR = '|'
+
+# Semelhança (Dice de trigramas) mínima para propor um membro
+MIN_SIMILARITY = 0.4
+
+_NON_ALNUM = re.compile(r'[^0-9A-Z]+')
+_KEY_CHARS = re.compile(r'[^0-9a-z]+')
+
+# Chave partilhada por mais de um membro: não identifica ninguém
+_AMBIGUOUS = object()
+
+
+def name_key(text):
+    """'Vítor M. Rodrigues' -> 'VITOR M RODRIGUES'"""
+    return ' '.join(_NON_ALNUM.sub(' ', normalize(text or '')).split())
+
+
+def payer_name(description):
+    """Nome do ordenante numa descrição 'TRF CR SEPA+ 0000030 DE NOME' (ou None)"""
+    _, sep, name = (description or '').upper().rpartition(' DE ')
+    return name if sep else None
+
+
+def like_to_regex(pattern):
+    """Padrão SQL LIKE ('Vítor%') -> regex compilada"""
+    parts = []
+    for ch in pattern:
+        if ch == '%':
+            parts.append('.*')
+        elif ch == '_':
+            parts.append('.')
+        else:
+            parts.append(re.escape(ch))
+    return re.compile(''.join(parts) + r'\Z', re.DOTALL)
+
+
+class MemberDirectory:
+    def __init__(self):
+        self.members = {}   # member_id -> {'id', 'name', 'building_id', 'fraction', 'permilage', 'key'}
+        self._index = {}    # name_key -> member_id (ou _AMBIGUOUS)
+        self._aliases = []  # (texto, member_id), pela ordem de prioridade
+        self._keys = {}     # member_key -> member_id
+        self._matcher = None
+        self._similar = None
+
+    def __len__(self):
+        return len(self.members)
+
+    # -------------------------------------------------------------
+    # Construção
+    # -------------------------------------------------------------
+
+    def add(self, member_id, name, building_id=None, fraction=None, aliases=(), permilage=None):
+        self.members[member_id] = {
+            'id': member_id,
+            'name': name,
+            'building_id': building_id,
+            'fraction': fraction,
+            'permilage': permilage,
+            'key': None,
+        }
+        self._index_name(name, member_id)
+        # Nome próprio + apelido ('Joao Longo'), como aparece no Beneficiario
+        tokens = name_key(name).split()
+        if len(tokens) > 2:
+            self._index_name(f"{tokens[0]} {tokens[-1]}", member_id)
+        for alias in aliases:
+            self.add_alias(alias, member_id)
+        self._matcher = None
+        self._similar = None
+
+    def _index_name(self, text, member_id):
+        key = name_key(text)
+        if not key:
+            return
+        current = self._index.get(key)
+        if current is None:
+            self._index[key] = member_id
+        elif current != member_id:
+            self._index[key] = _AMBIGUOUS
+
+    def add_alias(self, alias, member):
+        """Alias de um membro (id, member_key ou nome); False se o membro não existir"""
+        member_id = self._member_id(member)
+        if member_id is None:
+            return False
+        self._index_name(alias, member_id)
+        self._aliases.append((alias, member_id))
+        self._matcher = None
+        self._similar = None
+        return True
+
+    def add_aliases(self, items):
+        """[(alias, membro)] como os antigos MEMBER_MAP; ignora membros inexistentes"""
+        for alias, member in items:
+            self.add_alias(alias, member)
+
+    def _member_id(self, member):
+        if member in self.members:
+            return member
+        if member in self._keys:
+            return self._keys[member]
+        found = self._index.get(name_key(member))
+        return None if found is _AMBIGUOUS else found
+
+    def bind_keys(self, patterns):
+        """Associa member_keys ({key: padrão LIKE}, ex.: MEMBER_NAME_PATTERNS) aos membros.
+
+        Como o antigo `SELECT ... WHERE name LIKE`: se vários nomes coincidirem,
+        fica o primeiro por ordem alfabética. Os restantes membros recebem uma
+        chave derivada do nome próprio.
+        """
+        for key, pattern in sorted(patterns.items()):
+            regex = like_to_regex(pattern)
+            names = sorted(
+                (m['name'], member_id) for member_id, m in self.members.items()
+                if m['key'] is None and regex.match(m['name'])
+            )
+            if names:
+                self._set_key(names[0][1], key)
+        for member_id, m in sorted(self.members.items(), key=lambda item: item[1]['name']):
+            if m['key'] is None:
+                self._set_key(member_id, self._derive_key(m))
+        self._matcher = None
+
+    def _set_key(self, member_id, key):
+        self.members[member_id]['key'] = key
+        self._keys[key] = member_id
+
+    def _derive_key(self, member):
+        """Chave legível e válida como identificador SQL ('vitor', 'maria_c', ...)"""
+        base = _KEY_CHARS.sub('_', name_key(member['name']).split(' ')[0].lower()).strip('_') or 'membro'
+        candidates = [base]
+        if member['fraction']:
+            candidates.append(f"{base}_{_KEY_CHARS.sub('_', normalize(member['fraction']).lower()).strip('_')}")
+        for candidate in candidates:
+            if candidate not in self._keys:
+                return candidate
+        n = 2
+        while f"{base}_{n}" in self._keys:
+            n += 1
+        return f"{base}_{n}"
+
+    def for_building(self, building_id):
+        """Cópia só com os membros do edifício (os sem building_id contam para todos)"""
+        directory = MemberDirectory()
+        aliases = {}
+        for alias, member_id in self._aliases:
+            aliases.setdefault(member_id, []).append(alias)
+        for member_id, m in self.members.items():
+            if m['building_id'] in (None, building_id):
+                directory.add(member_id, m['name'], m['building_id'], m['fraction'], aliases.get(member_id, ()),
+                              m['permilage'])
+        return directory
+
+    # -------------------------------------------------------------
+    # Consulta
+    # -------------------------------------------------------------
+
+    def key_of(self, member_id):
+        return self.members[member_id]['key'] if member_id else None
+
+    def lookup(self, text):
+        """member_id pelo nome ou alias exacto (normalizado), ou None"""
+        member_id = self._index.get(name_key(text))
+        return None if member_id is _AMBIGUOUS else member_id
+
+    def resolve(self, description, beneficiary=''):
+        """member_id do pagador de uma linha do extracto, ou None.
+
+        Primeiro as consultas exactas (beneficiário, ordenante da descrição);
+        depois os nomes e aliases contidos no texto, pela ordem dos aliases.
+        """
+        member_id = self.lookup(beneficiary)
+        if member_id is None:
+            payer = payer_name(description)
+            if payer:
+                member_id = self.lookup(payer)
+        if member_id is None:
+            member_id = self.matcher.match(f"{description} {beneficiary}")
+        return member_id
+
+    @property
+    def matcher(self):
+        if self._matcher is None:
+            rules = list(self._aliases)
+            rules += [(m['name'], member_id) for member_id, m in sorted(self.members.items())]
+            self._matcher = PatternMatcher(rules)
+        return self._matcher
+
+    def suggest(self, text, min_score=MIN_SIMILARITY):
+        """(member_id, semelhança, nome/alias mais parecido) para um pagador desconhecido, ou None"""
+        if self._similar is None:
+            self._similar = TrigramIndex()
+            for key, member_id in sorted(self._index.items()):
+                if member_id is not _AMBIGUOUS:
+                    self._similar.add(key, member_id)
+        found = self._similar.best(name_key(text), min_score)
+        if found is None:
+            return None
+        score, member_id, matched = found
+        return member_id, score, matched
+
+    def permilages(self):
+        """{member_key: permilagem ou None}"""
+        return {key: self.members[member_id]['permilage'] for key, member_id in sorted(self._keys.items())}
+
+    def member_ids(self):
+        """{member_key: member_id} para emitir os UUIDs literais"""
+        return dict(sorted(self._keys.items()))
+
+    def patterns(self):
+        """Textos procurados nas linhas (para a cache de classificação)"""
+        return self.matcher.patterns
+
+    def rules(self):
+        """Tudo o que determina a resolução (para o digest da cache)"""
+        return {
+            'index': sorted((k, v if v is not _AMBIGUOUS else None) for k, v in self._index.items()),
+            'aliases': self._aliases,
+            'keys': sorted(self._keys.items()),
+        }
+
+
+# -------------------------------------------------------------
+# Carregamento
+# -------------------------------------------------------------
+
+def iter_dump_members(path):
+    """Linhas (dict) do bloco COPY public.members de um backup pg_dump"""
+    return iter_table(path, 'members')
+
+
+def _is_active(row):
+    active = row.get('is_active')
+    if isinstance(active, bool):
+        return active
+    return (active or 't').lower() not in ('f', 'false', '0')
+
+
+def _add_row(directory, row):
+    aliases = [a.strip() for a in (row.get('aliases') or '').split(ALIAS_SEPARATOR) if a.strip()]
+    permilage = Decimal(row['permilage']) if row.get('permilage') is not None and row['permilage'] != '' else None
+    directory.add(row['id'], row['name'], row.get('building_id') or None, row.get('fraction') or None, aliases,
+                  permilage)
+
+
+def append_aliases(path, aliases):
+    """Acrescenta [(alias, member_id)] a uma exportação de aliases (criada se não existir)"""
+    new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+    with open(path, 'a', encoding='utf-8', newline='') as handle:
+        writer = csv.writer(handle, lineterminator='\n')
+        if new_file:
+            writer.writerow(['alias', 'member'])
+        writer.writerows(aliases)
+
+
+def load_directory(paths):
+    """Directório a partir de exportações de membros/aliases (CSV) e/ou backups (.sql[.gz])"""
+    directory = MemberDirectory()
+    alias_rows = []
+    for path in paths:
+        if path.endswith(('.sql', '.sql.gz')):
+            for row in iter_dump_members(path):
+                # Membros apagados (soft delete) ou inactivos não pagam quotas
+                if _is_active(row) and not row.get('deleted_at'):
+                    _add_row(directory, row)
+            continue
+        with open_extract(path) as handle:
+            reader = dict_reader(handle)
+            fields = reader.fieldnames or []
+            if 'alias' in fields:
+                alias_rows.extend(reader)
+            elif 'id' in fields and 'name' in fields:
+                for row in reader:
+                    if _is_active(row):
+                        _add_row(directory, row)
+            else:
+                raise ValueError(f"{path}: esperadas colunas id,name[,building_id,fraction,permilage,aliases] ou alias,member")
+    # Os aliases podem referir membros de qualquer um dos ficheiros
+    for row in alias_rows:
+        directory.add_alias(row['alias'], row['member'])
+    return directory
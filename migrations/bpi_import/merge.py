@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Junção em streaming de exportações sobrepostas (k-way merge por data)
+
+Exportações de períodos que se sobrepõem (ex.: Jan-Jun e Abr-Dez) são lidas
+em simultâneo e juntas por Fecha com um heap (heapq.merge), uma linha de cada
+ficheiro de cada vez. Cada exportação tem de vir ordenada por Fecha; a ordem
+(descendente, como o homebanking exporta, ou ascendente) é detectada nas
+primeiras linhas e tem de ser a mesma em todas.
+
+Duas linhas são a mesma quando coincidem em conta, data, hora, valor,
+descrição e memória. Como a junção entrega as linhas por data, as repetidas
+chegam seguidas e a janela de comparação é só o dia corrente: a memória fica
+limitada às linhas de um dia, não ao tamanho das exportações. Linhas
+idênticas dentro do mesmo ficheiro (ex.: duas comissões iguais) são
+legítimas; de cada linha fica o maior nº de ocorrências visto num ficheiro.
+"""
+
+import heapq
+from itertools import chain
+
+from bpi_import.mmap_reader import iso_date
+
+# Chave de ordenação das linhas sem Fecha válida no início de um ficheiro
+_FIRST = float('-inf')
+
+
+def _clean(text):
+    return ' '.join((text or '').split()).upper()
+
+
+def row_key(row):
+    """Campos que identificam a mesma linha em exportações diferentes"""
+    return (
+        _clean(row.get('Cuentas')),
+        (row.get('Hora') or '').strip(),
+        (row.get('Importe') or '').strip(),
+        _clean(row.get('Descripción')),
+        _clean(row.get('Memoria')),
+    )
+
+
+def _day(date):
+    return int(date.replace('-', ''))
+
+
+def detect_order(rows):
+    """('desc' | 'asc' | None, linhas): espreita até à 2ª data diferente.
+
+    As linhas lidas para decidir ficam num buffer (no máximo um dia) e são
+    devolvidas à frente das restantes.
+    """
+    rows = iter(rows)
+    buffered = []
+    first = None
+    order = None
+    for row in rows:
+        buffered.append(row)
+        date = iso_date(row['Fecha'])
+        if date is None or date == first:
+            continue
+        if first is None:
+            first = date
+            continue
+        order = 'desc' if date < first else 'asc'
+        break
+    return order, chain(buffered, rows)
+
+
+def _keyed(number, source, rows, order):
+    """(chave de ordenação, nº do ficheiro, data, linha), validando a ordem"""
+    sign = -1 if order == 'desc' else 1
+    last = _FIRST
+    for row in rows:
+        date = iso_date(row['Fecha'])
+        if date is not None:
+            key = sign * _day(date)
+            if key < last:
+                raise ValueError(f"{source}: exportação fora de ordem por Fecha ({row['Fecha']})")
+            last = key
+        # Linhas sem data seguem na posição em que estão (o parse descarta-as)
+        yield last, number, date, row
+
+
+def merge_exports(sources, counts=None):
+    """Linhas das exportações juntas por Fecha, sem as repetidas entre ficheiros.
+
+    sources: [(nome, linhas)] com as linhas (dict) de cada exportação.
+    counts (opcional) recebe {'files', 'rows', 'duplicates'}. A ordem é
+    detectada já aqui (ValueError se as exportações não concordarem); as
+    linhas só são lidas à medida que o gerador devolvido é consumido.
+    """
+    if counts is None:
+        counts = {}
+    counts.update(files=len(sources), rows=0, duplicates=0)
+
+    orders = set()
+    peeked = []
+    for source, rows in sources:
+        order, rows = detect_order(rows)
+        if order:
+            orders.add(order)
+        peeked.append((source, rows))
+    if len(orders) > 1:
+        raise ValueError("as exportações a juntar não têm a mesma ordem por Fecha")
+    order = orders.pop() if orders else 'desc'
+
+    streams = [_keyed(number, source, rows, order) for number, (source, rows) in enumerate(peeked)]
+    return _dedup(heapq.merge(*streams, key=lambda item: item[0]), counts)
+
+
+def _dedup(merged, counts):
+    """Descarta as linhas do dia corrente já entregues por outro ficheiro"""
+    current = None
+    emitted = {}  # chave -> nº de linhas já entregues no dia corrente
+    seen = {}     # (chave, nº do ficheiro) -> linhas vistas nesse ficheiro
+    for _, number, date, row in merged:
+        counts['rows'] += 1
+        if date is None:
+            yield row
+            continue
+        if date != current:
+            current = date
+            emitted = {}
+            seen = {}
+
+        key = row_key(row)
+        n = seen.get((key, number), 0) + 1
+        seen[(key, number)] = n
+        if n > emitted.get(key, 0):
+            emitted[key] = n
+            yield row
+        else:
+            counts['duplicates'] += 1
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Métricas por etapa da importação, gravadas em JSON ao lado do SQL
+
+Cada etapa do pipeline (geradores encadeados) é envolvida por track(), que
+conta as linhas que saem e o tempo acumulado até essa etapa; o tempo próprio
+de cada etapa é a diferença para a etapa anterior. Registam-se também as
+linhas descartadas por motivo, os pagadores sem membro e as despesas sem
+categoria, para acompanhar a latência e a cobertura da classificação.
+"""
+
+import json
+import os
+import re
+import time
+
+METRICS_FILE = 'metrics.json'
+
+# Nº máximo de textos distintos guardados nas listas de não identificados
+TOP_UNMATCHED = 20
+
+_DIGITS = re.compile(r'\d+')
+
+
+def _unmatched_key(text):
+    """Remove números de operação para agrupar o mesmo pagador/fornecedor"""
+    return ' '.join(_DIGITS.sub(' ', text or '').split())
+
+
+def _bump(counter, key, amount=1):
+    counter[key] = counter.get(key, 0) + amount
+
+
+class ImportMetrics:
+    def __init__(self):
+        self.started = None
+        self.finished = None
+        self.stages = []
+        self.skipped = {}
+        self.income = 0
+        self.income_matched = 0
+        self.fees = 0
+        self.expense = 0
+        self.expense_classified = 0
+        self.unmatched_payers = {}
+        self.unclassified_expenses = {}
+        self.cache = None
+
+    def start(self):
+        self.started = time.perf_counter()
+
+    def track(self, name, iterable):
+        """Etapa transparente: conta as linhas e o tempo acumulado até aqui"""
+        # Registada já (e não no 1º next) para as etapas ficarem pela ordem do pipeline
+        stage = {'name': name, 'rows_out': 0, 'seconds': 0.0}
+        self.stages.append(stage)
+        return self._timed(stage, iter(iterable))
+
+    def _timed(self, stage, iterator):
+        while True:
+            t0 = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                stage['seconds'] += time.perf_counter() - t0
+                return
+            stage['seconds'] += time.perf_counter() - t0
+            stage['rows_out'] += 1
+            yield item
+
+    def finish(self, name, rows_out):
+        """Fecha o pipeline com a etapa final (a que consome tudo, ex.: emissão)"""
+        self.finished = time.perf_counter()
+        self.stages.append({'name': name, 'rows_out': rows_out, 'seconds': self.finished - self.started})
+
+    def rows_out(self, name):
+        for stage in self.stages:
+            if stage['name'] == name:
+                return stage['rows_out']
+        return None
+
+    def skip(self, reason, count=1):
+        _bump(self.skipped, reason, count)
+
+    def observe_classification(self, transactions, member_field='member_key', category_field='category_id',
+                               unclassified=None):
+        """Etapa: cobertura da classificação (receitas sem membro, despesas sem categoria)"""
+        for t in transactions:
+            self.observe(t, member_field, category_field, unclassified)
+            yield t
+
+    def observe(self, t, member_field='member_key', category_field='category_id', unclassified=None):
+        if t['type'] == 'income':
+            self.income += 1
+            if t.get('is_fee') or t.get('is_fee_payment'):
+                self.fees += 1
+            if t[member_field]:
+                self.income_matched += 1
+            else:
+                _bump(self.unmatched_payers, _unmatched_key(t.get('raw_description') or t['description']))
+        else:
+            self.expense += 1
+            if t[category_field] != unclassified:
+                self.expense_classified += 1
+            else:
+                _bump(self.unclassified_expenses, _unmatched_key(t.get('raw_description') or t['description']))
+
+    def to_dict(self):
+        stages = []
+        previous_rows = None
+        previous_seconds = 0.0
+        for stage in self.stages:
+            # O tempo registado inclui as etapas anteriores (geradores encadeados)
+            own = max(stage['seconds'] - previous_seconds, 0.0)
+            stages.append({
+                'name': stage['name'],
+                'rows_in': previous_rows if previous_rows is not None else stage['rows_out'],
+                'rows_out': stage['rows_out'],
+                'seconds': round(own, 6),
+            })
+            previous_rows = stage['rows_out']
+            previous_seconds = max(previous_seconds, stage['seconds'])
+
+        wall = None
+        if self.started is not None:
+            wall = round((self.finished or time.perf_counter()) - self.started, 6)
+
+        return {
+            'wall_seconds': wall,
+            'stages': stages,
+            'skipped': dict(sorted(self.skipped.items())),
+            'classification': {
+                'income': self.income,
+                'income_matched': self.income_matched,
+                'fee_payments': self.fees,
+                'expense': self.expense,
+                'expense_classified': self.expense_classified,
+                'member_coverage': round(self.income_matched / self.income, 4) if self.income else None,
+                'category_coverage': round(self.expense_classified / self.expense, 4) if self.expense else None,
+            },
+            'unmatched_payers': _top(self.unmatched_payers),
+            'unclassified_expenses': _top(self.unclassified_expenses),
+            'classification_cache': self.cache,
+        }
+
+
+def _top(counter):
+    items = sorted(counter.items(), key=lambda kv: (-kv[1], kv[0]))
+    return {
+        'distinct': len(items),
+        'rows': sum(counter.values()),
+        'top': [{'text': text, 'count': count} for text, count in items[:TOP_UNMATCHED]],
+    }
+
+
+def merge_metrics(labelled):
+    """Junta as métricas de vários shards [(conta, dict), ...].
+
+    Os segundos das etapas somam-se (tempo dos vários processos). As listas
+    de não identificados juntam só o top de cada shard; os totais de linhas
+    são exactos.
+    """
+    merged = {'accounts': {}, 'stages': [], 'skipped': {}, 'classification': {}}
+    stages = {}
+    unmatched = {'unmatched_payers': {}, 'unclassified_expenses': {}}
+    unmatched_rows = {'unmatched_payers': 0, 'unclassified_expenses': 0}
+
+    for account, metrics in labelled:
+        merged['accounts'][account] = metrics
+        for stage in metrics['stages']:
+            target = stages.get(stage['name'])
+            if target is None:
+                target = stages[stage['name']] = {'name': stage['name'], 'rows_in': 0, 'rows_out': 0, 'seconds': 0.0}
+                merged['stages'].append(target)
+            target['rows_in'] += stage['rows_in']
+            target['rows_out'] += stage['rows_out']
+            target['seconds'] = round(target['seconds'] + stage['seconds'], 6)
+        for reason, count in metrics['skipped'].items():
+            _bump(merged['skipped'], reason, count)
+        for key, value in metrics['classification'].items():
+            if not key.endswith('_coverage'):
+                _bump(merged['classification'], key, value)
+        if metrics.get('classification_cache'):
+            cache = merged.setdefault('classification_cache', {})
+            for key, value in metrics['classification_cache'].items():
+                _bump(cache, key, value)
+        for field, counter in unmatched.items():
+            unmatched_rows[field] += metrics[field]['rows']
+            for item in metrics[field]['top']:
+                _bump(counter, item['text'], item['count'])
+
+    c = merged['classification']
+    c['member_coverage'] = round(c['income_matched'] / c['income'], 4) if c.get('income') else None
+    c['category_coverage'] = round(c['expense_classified'] / c['expense'], 4) if c.get('expense') else None
+    for field, counter in unmatched.items():
+        merged[field] = _top(counter)
+        merged[field]['rows'] = unmatched_rows[field]
+    return merged
+
+
+def write_metrics(data, path):
+    """Grava o JSON de métricas (escrita atómica)"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as handle:
+        json.dump(data, handle, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
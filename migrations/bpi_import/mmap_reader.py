@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Leitura de exportações grandes por mmap, com índice esparso data -> offset
+
+O ficheiro é mapeado em memória e partido em registos por offsets, sem copiar
+o extracto. O índice guarda a Fecha de um registo a cada `stride` bytes
+(lido directamente nessa posição, sem percorrer o ficheiro); como as
+exportações BPI vêm ordenadas por Fecha (descendente, mas ascendente também é
+aceite), um período '2024-01..2024-12' é localizado por bisecção e lido
+até ao fim do período. Reprocessar um mês custa o tamanho desse mês.
+
+Ficheiros gzip e stdin não podem ser mapeados: para esses (ou se a ordem não
+for monótona) o período é filtrado numa leitura completa.
+"""
+
+import calendar
+import csv
+import mmap
+import os
+import re
+
+from bpi_import.reader import GZIP_MAGIC, iter_rows
+
+DEFAULT_STRIDE = 64 * 1024
+
+_BOM = b'\xef\xbb\xbf'
+_PERIOD_PART = re.compile(r'^(\d{4})(?:-(\d{2})(?:-(\d{2}))?)?$')
+
+
+def _period_start(part):
+    m = _PERIOD_PART.match(part)
+    if not m:
+        raise ValueError(f"Período inválido: {part!r} (use AAAA, AAAA-MM ou AAAA-MM-DD)")
+    year, month, day = m.group(1), m.group(2) or '01', m.group(3) or '01'
+    return f"{year}-{month}-{day}"
+
+
+def _period_end(part):
+    m = _PERIOD_PART.match(part)
+    if not m:
+        raise ValueError(f"Período inválido: {part!r} (use AAAA, AAAA-MM ou AAAA-MM-DD)")
+    year, month, day = m.group(1), m.group(2), m.group(3)
+    if day:
+        return f"{year}-{month}-{day}"
+    if month:
+        return f"{year}-{month}-{calendar.monthrange(int(year), int(month))[1]:02d}"
+    return f"{year}-12-31"
+
+
+def parse_period(spec):
+    """'2024-01..2024-12' / '2024' / '2024-03' -> ('2024-01-01', '2024-12-31')"""
+    first, sep, last = spec.partition('..')
+    if not sep:
+        last = first
+    return _period_start(first.strip()), _period_end(last.strip())
+
+
+def iso_date(fecha):
+    """'13/11/2025' -> '2025-11-13' (None se não tiver esse formato)"""
+    if len(fecha) != 10 or fecha[2] != '/' or fecha[5] != '/':
+        return None
+    return f"{fecha[6:10]}-{fecha[3:5]}-{fecha[0:2]}"
+
+
+class MappedExtract:
+    """Exportação BPI (CSV simples) mapeada em memória"""
+
+    def __init__(self, path, stride=DEFAULT_STRIDE):
+        self.path = path
+        self._file = open(path, 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+        self.size = size
+
+        start = len(_BOM) if self._mm[:len(_BOM)] == _BOM else 0
+        header_end = self._line_end(start)
+        header = next(csv.reader([self._mm[start:header_end].decode('utf-8')]), [])
+        self.fieldnames = [name.strip().strip('"') for name in header]
+        self._fecha = self.fieldnames.index('Fecha') if 'Fecha' in self.fieldnames else None
+        self.data_start = header_end
+
+        self.index = self._build_index(stride) if self._fecha is not None else []
+        self.order = self._detect_order()
+
+    def close(self):
+        if isinstance(self._mm, mmap.mmap):
+            self._mm.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # -------------------------------------------------------------
+    # Registos e índice
+    # -------------------------------------------------------------
+
+    def _line_end(self, pos):
+        """Offset a seguir ao fim da linha que começa em pos"""
+        end = self._mm.find(b'\n', pos)
+        return self.size if end < 0 else end + 1
+
+    def _lines(self, start):
+        """Linhas decodificadas uma a uma a partir de start (só a linha é copiada)"""
+        pos = start
+        while pos < self.size:
+            line_end = self._line_end(pos)
+            yield self._mm[pos:line_end].decode('utf-8')
+            pos = line_end
+
+    def _record_date(self, line):
+        fields = next(csv.reader([line]), None)
+        if not fields or len(fields) <= self._fecha:
+            return None
+        return iso_date(fields[self._fecha])
+
+    def _build_index(self, stride):
+        """[(offset, data ISO)] de um registo a cada `stride` bytes"""
+        index = []
+        target = self.data_start
+        while target < self.size:
+            # Alinha ao início do registo seguinte (o 1º já está alinhado)
+            pos = target if target == self.data_start else self._line_end(target - 1)
+            if pos >= self.size:
+                break
+            line_end = self._line_end(pos)
+            date = self._record_date(self._mm[pos:line_end].decode('utf-8'))
+            if date and (not index or index[-1][0] != pos):
+                index.append((pos, date))
+            target = max(pos + 1, target + stride)
+        return index
+
+    def _detect_order(self):
+        """'desc', 'asc' ou None (índice não monótono: só leitura completa)"""
+        dates = [date for _, date in self.index]
+        if all(a >= b for a, b in zip(dates, dates[1:])):
+            return 'desc'
+        if all(a <= b for a, b in zip(dates, dates[1:])):
+            return 'asc'
+        return None
+
+    # -------------------------------------------------------------
+    # Leitura
+    # -------------------------------------------------------------
+
+    def _rows(self, start):
+        return csv.DictReader(self._lines(start), fieldnames=self.fieldnames)
+
+    def iter_rows(self):
+        """Todas as linhas (dict), como reader.iter_rows"""
+        return self._rows(self.data_start)
+
+    def iter_range(self, date_from, date_to):
+        """Linhas com date_from <= Fecha <= date_to (datas ISO, inclusivas).
+
+        Linhas sem Fecha DD/MM/YYYY não pertencem a nenhum período e são ignoradas.
+        """
+        if self.order is None:
+            yield from filter_period(self.iter_rows(), date_from, date_to)
+            return
+
+        dates = [date for _, date in self.index]
+        position = self._bisect(dates, date_from, date_to)
+        start = self.index[position - 1][0] if position > 0 else self.data_start
+
+        for row in self._rows(start):
+            date = iso_date(row['Fecha'])
+            if date is None:
+                continue
+            if self.order == 'desc':
+                if date > date_to:
+                    continue
+                if date < date_from:
+                    return
+            else:
+                if date < date_from:
+                    continue
+                if date > date_to:
+                    return
+            yield row
+
+    def _bisect(self, dates, date_from, date_to):
+        """Nº de pontos do índice totalmente antes do período"""
+        lo, hi = 0, len(dates)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            before = dates[mid] > date_to if self.order == 'desc' else dates[mid] < date_from
+            if before:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+
+def is_mappable(path):
+    """Ficheiro simples (não stdin, não gzip) que pode ser mapeado"""
+    if path == '-' or not os.path.isfile(path):
+        return False
+    with open(path, 'rb') as handle:
+        return handle.read(2) != GZIP_MAGIC
+
+
+def filter_period(rows, date_from, date_to):
+    """Filtro linear por período, para o que não pode ser mapeado"""
+    for row in rows:
+        date = iso_date(row['Fecha'])
+        if date and date_from <= date <= date_to:
+            yield row
+
+
+def iter_rows_period(paths, date_from, date_to):
+    """Linhas de todas as exportações dentro do período (ISO, inclusivo)"""
+    for path in paths:
+        if is_mappable(path):
+            with MappedExtract(path) as extract:
+                yield from extract.iter_range(date_from, date_to)
+        else:
+            yield from filter_period(iter_rows([path]), date_from, date_to)
+
+
+def iter_rows_mapped(paths):
+    """Como reader.iter_rows, mas com mmap para os ficheiros simples"""
+    for path in paths:
+        if is_mappable(path):
+            with MappedExtract(path) as extract:
+                yield from extract.iter_rows()
+        else:
+            yield from iter_rows([path])
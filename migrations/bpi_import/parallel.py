@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Importação em paralelo por conta/edifício
+
+A coluna 'Cuentas' identifica a conta bancária e, por ela, o edifício. O
+processo principal só reparte as linhas por conta (ficheiros temporários, sem
+as guardar em memória); cada conta é classificada e agregada num processo
+separado e os resultados são juntados por ordem de conta, por isso a saída é
+sempre a mesma independentemente do nº de processos.
+"""
+
+import csv
+import json
+import os
+from decimal import Decimal
+
+from bpi_import.reader import BPI_COLUMNS
+
+
+class UnknownAccountError(ValueError):
+    """Conta do extracto sem edifício configurado"""
+
+
+def load_account_buildings(path):
+    """Lê o mapa conta -> building_id de um ficheiro JSON"""
+    with open(path, encoding='utf-8') as handle:
+        return json.load(handle)
+
+
+def shard_file_name(index):
+    return f'shard_{index:03d}.csv'
+
+
+def spool_by_account(rows, directory, account_buildings):
+    """Reparte as linhas por conta em CSVs dentro de `directory`.
+
+    Devolve {conta: caminho}, com as contas pela ordem em que aparecem.
+    """
+    handles = {}
+    writers = {}
+    paths = {}
+    try:
+        for row in rows:
+            account = row['Cuentas']
+            writer = writers.get(account)
+            if writer is None:
+                if account not in account_buildings:
+                    raise UnknownAccountError(f"Conta sem edifício configurado: {account!r}")
+                path = os.path.join(directory, shard_file_name(len(paths)))
+                handle = open(path, 'w', encoding='utf-8', newline='')
+                writer = csv.DictWriter(handle, fieldnames=BPI_COLUMNS, extrasaction='ignore')
+                writer.writeheader()
+                handles[account] = handle
+                writers[account] = writer
+                paths[account] = path
+            writer.writerow(row)
+    finally:
+        for handle in handles.values():
+            handle.close()
+    return paths
+
+
+def merge_stats(labelled_stats):
+    """Junta as estatísticas de vários shards [(conta, stats), ...] por ordem.
+
+    Com mais de uma conta, as chaves de membro passam a 'conta: membro'
+    (a mesma chave pode existir em edifícios diferentes).
+    """
+    merged = {
+        'total': 0,
+        'income': 0,
+        'expense': 0,
+        'first_date': None,
+        'last_date': None,
+        'years': set(),
+        'members': {},
+        'year_totals': {},
+    }
+    qualify = len(labelled_stats) > 1
+
+    for account, stats in labelled_stats:
+        for key in ('total', 'income', 'expense'):
+            merged[key] += stats[key]
+        if stats['first_date'] and (merged['first_date'] is None or stats['first_date'] < merged['first_date']):
+            merged['first_date'] = stats['first_date']
+        if stats['last_date'] and (merged['last_date'] is None or stats['last_date'] > merged['last_date']):
+            merged['last_date'] = stats['last_date']
+        merged['years'] |= stats['years']
+
+        for member_key, member in stats['members'].items():
+            key = f'{account}: {member_key}' if qualify else member_key
+            target = merged['members'].setdefault(key, {'count': 0, 'total': Decimal('0')})
+            target['count'] += member['count']
+            target['total'] += member['total']
+
+        for year, totals in stats['year_totals'].items():
+            target = merged['year_totals'].setdefault(year, {'income': Decimal('0'), 'expense': Decimal('0')})
+            target['income'] += totals['income']
+            target['expense'] += totals['expense']
+
+        # Cada shard é uma conta: as chaves (conta, mês) não se repetem
+        if 'months' in stats:
+            merged.setdefault('months', {}).update(stats['months'])
+
+        for key, agg in stats.get('budgets', {}).items():
+            target = merged.setdefault('budgets', {}).setdefault(key, {'spent': Decimal('0'), 'count': 0})
+            target['spent'] += agg['spent']
+            target['count'] += agg['count']
+
+        for payer, suggestion in stats.get('suggestions', {}).items():
+            target = merged.setdefault('suggestions', {}).get(payer)
+            if target is None:
+                merged['suggestions'][payer] = dict(suggestion)
+            else:
+                target['rows'] += suggestion['rows']
+                target['amount'] += suggestion['amount']
+
+    return merged
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Leitura em streaming de backups pg_dump (formato texto, simples ou .gz)
+
+O backup é lido linha a linha (gzip descomprimido à medida, ver
+reader.open_extract) e só os blocos `COPY public.<tabela> (...) FROM stdin`
+pedidos são convertidos; tudo o resto é saltado sem ser guardado. Os tipos
+das colunas vêm do `CREATE TABLE` da própria tabela no backup:
+
+  integer/bigint/smallint -> int      numeric/real/double -> Decimal
+  boolean                 -> bool     arrays (x[])        -> list
+  NULL (\\N)               -> None     restantes           -> str
+
+Datas e timestamps ficam em texto ISO ('2025-01-13'), como no resto do
+pipeline. Um backup só de dados (sem CREATE TABLE) devolve tudo em texto.
+
+Com isto os importadores verificam uma importação contra um backup (membros,
+impressões digitais já gravadas, totais por ano) sem restaurar a base de
+dados.
+"""
+
+import re
+from decimal import Decimal
+
+from bpi_import.reader import open_extract
+
+# Tabelas lidas por omissão
+DUMP_TABLES = ('members', 'transactions', 'financial_periods', 'member_period_balance')
+
+_CREATE = re.compile(r'^CREATE TABLE public\.(\w+) \($')
+_COPY = re.compile(r'^COPY public\.(\w+) \((.*)\) FROM stdin;$')
+_ESCAPE = re.compile(r'\\(.)')
+_ESCAPES = {'t': '\t', 'n': '\n', 'r': '\r', 'b': '\b', 'f': '\f', 'v': '\v', '\\': '\\'}
+
+
+def unescape_copy(value):
+    """Campo do formato texto do COPY ('\\N' é NULL)"""
+    if value == '\\N':
+        return None
+    if '\\' not in value:
+        return value
+    return _ESCAPE.sub(lambda m: _ESCAPES.get(m.group(1), m.group(1)), value)
+
+
+def _parse_bool(value):
+    return value == 't'
+
+
+def _parse_array(value, element=str):
+    """'{1,2}' / '{"a b",c}' -> lista (um nível, como nos backups do projecto)"""
+    inner = value[1:-1]
+    if not inner:
+        return []
+    items = []
+    current = []
+    quoted = False
+    escaped = False
+    was_quoted = False
+    for ch in inner:
+        if escaped:
+            current.append(ch)
+            escaped = False
+        elif ch == '\\':
+            escaped = True
+        elif ch == '"':
+            quoted = not quoted
+            was_quoted = True
+        elif ch == ',' and not quoted:
+            items.append((''.join(current), was_quoted))
+            current = []
+            was_quoted = False
+        else:
+            current.append(ch)
+    items.append((''.join(current), was_quoted))
+    return [None if text == 'NULL' and not q else element(text) for text, q in items]
+
+
+def column_parser(sql_type):
+    """Conversor de texto COPY -> valor Python para um tipo SQL do CREATE TABLE"""
+    base = sql_type.lower()
+    is_array = '[]' in base
+    if base.startswith(('integer', 'bigint', 'smallint', 'serial', 'bigserial')):
+        element = int
+    elif base.startswith(('numeric', 'decimal', 'real', 'double precision', 'money')):
+        element = Decimal
+    elif base.startswith('boolean'):
+        element = _parse_bool
+    else:
+        element = None
+    if is_array:
+        return lambda value: _parse_array(value, element or str)
+    return element
+
+
+def _column_type(line):
+    """('nome', 'tipo ...') de uma linha de coluna do CREATE TABLE, ou None"""
+    line = line.strip().rstrip(',')
+    if not line or line.startswith(('CONSTRAINT', 'PRIMARY KEY', 'UNIQUE', 'CHECK', 'FOREIGN KEY', ')')):
+        return None
+    if line.startswith('"'):
+        end = line.index('"', 1)
+        return line[1:end], line[end + 1:].strip()
+    name, _, rest = line.partition(' ')
+    return name, rest
+
+
+def iter_dump(path, tables=DUMP_TABLES):
+    """Gera (tabela, registo) das linhas dos blocos COPY das tabelas pedidas.
+
+    Pára assim que todos os blocos pedidos foram lidos.
+    """
+    wanted = set(tables)
+    types = {}      # tabela -> {coluna: tipo SQL}
+    creating = None
+    done = set()
+    with open_extract(path) as handle:
+        lines = iter(handle)
+        for line in lines:
+            if creating is not None:
+                if line.startswith(');'):
+                    creating = None
+                    continue
+                column = _column_type(line)
+                if column:
+                    types[creating][column[0]] = column[1]
+                continue
+
+            if line.startswith('CREATE TABLE '):
+                m = _CREATE.match(line.rstrip('\n'))
+                if m and m.group(1) in wanted:
+                    creating = m.group(1)
+                    types[creating] = {}
+                continue
+            if not line.startswith('COPY '):
+                continue
+            m = _COPY.match(line.rstrip('\n'))
+            if not m or m.group(1) not in wanted:
+                continue
+
+            table = m.group(1)
+            columns = [c.strip().strip('"') for c in m.group(2).split(',')]
+            table_types = types.get(table, {})
+            parsers = [column_parser(table_types.get(c, 'text')) for c in columns]
+            typed = [(i, p) for i, p in enumerate(parsers) if p is not None]
+            for line in lines:
+                line = line.rstrip('\n')
+                if line == '\\.':
+                    break
+                values = [unescape_copy(v) for v in line.split('\t')]
+                for i, parse in typed:
+                    if values[i] is not None:
+                        values[i] = parse(values[i])
+                yield table, dict(zip(columns, values))
+            done.add(table)
+            if done == wanted:
+                return
+
+
+def iter_table(path, table):
+    """Registos (dict) de uma só tabela do backup"""
+    for _, record in iter_dump(path, (table,)):
+        yield record
+
+
+# -------------------------------------------------------------
+# Verificação de importações
+# -------------------------------------------------------------
+
+def dump_fingerprints(path, building_ids=None):
+    """Impressões digitais (import_fingerprint) das transações já no backup"""
+    fingerprints = set()
+    for t in iter_table(path, 'transactions'):
+        fingerprint = t.get('import_fingerprint')
+        if fingerprint and not t.get('deleted_at') and (building_ids is None or t['building_id'] in building_ids):
+            fingerprints.add(fingerprint)
+    return fingerprints
+
+
+def dump_year_totals(path, building_ids=None):
+    """{ano: {'income': Decimal, 'expense': Decimal}} das transações do backup"""
+    totals = {}
+    for t in iter_table(path, 'transactions'):
+        if t.get('deleted_at') or (building_ids is not None and t['building_id'] not in building_ids):
+            continue
+        kind = t.get('transaction_type') or t.get('type')
+        if kind not in ('income', 'expense'):
+            continue
+        date = t.get('transaction_date') or t.get('date')
+        year = int(t.get('year') or date[:4])
+        year_totals = totals.setdefault(year, {'income': Decimal('0'), 'expense': Decimal('0')})
+        year_totals[kind] += abs(Decimal(t['amount']))
+    return totals
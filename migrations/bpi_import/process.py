@@ -0,0 +1,1031 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Procesar extracto bancário BPI - TODAS las transacciones desde 2021
+"""
+
+import argparse
+import os
+import sys
+import time
+from collections import namedtuple
+from decimal import Decimal
+
+from bpi_import.balances import aggregate_payments, write_balance_upsert, write_trigger_toggle
+from bpi_import.batched_sql import open_output, write_batched_sql
+from bpi_import.budgets import aggregate_expenses, load_triggers, write_budget_rollup
+from bpi_import.classify_cache import ClassificationCache
+from bpi_import.copy_loader import (
+    DATA_FILE, LOADER_FILE, write_copy_file, write_loader_script, write_member_lookup
+)
+from bpi_import.fingerprint import WatermarkStore, filter_known, fingerprint_transactions
+from bpi_import.matcher import PatternMatcher
+from bpi_import.metrics import METRICS_FILE, ImportMetrics, merge_metrics, write_metrics
+from bpi_import.reader import iter_rows, iter_text_rows
+from bpi_import.rules import (
+    ACCOUNT_BUILDINGS, BUILDING_ID, CATEGORY_KEYWORDS, CATEGORY_MAP, MEMBER_MAP, MEMBER_NAME_PATTERNS,
+    QUOTA_KEYWORDS, parse_amount, parse_date, sample_text
+)
+
+# Os módulos das opções (--members, --reconcile, --jobs, --period, ...) só são
+# importados quando a opção é usada: o arranque fica com o custo do caminho normal
+
+# Compilados uma vez para todo o extracto
+MEMBER_MATCHER = PatternMatcher(MEMBER_MAP.items())
+CATEGORY_MATCHER = PatternMatcher(
+    (keyword, CATEGORY_MAP[key]) for keyword, key in CATEGORY_KEYWORDS
+)
+
+def identify_member(text):
+    """Identifica membro pelo nome no texto"""
+    return MEMBER_MATCHER.match(text)
+
+def identify_category(text):
+    """Identifica categoria da despesa"""
+    return CATEGORY_MATCHER.match(text)
+
+def is_quota_payment(categoria, beneficiario):
+    """Determina se é pagamento de quota"""
+    text = f"{categoria} {beneficiario}"
+    return any(kw in text for kw in QUOTA_KEYWORDS)
+
+# Tudo o que determina a classificação: se mudar, a cache persistente é invalidada
+CLASSIFICATION_RULES = {
+    'members': MEMBER_MAP,
+    'categories': CATEGORY_MAP,
+    'keywords': CATEGORY_KEYWORDS,
+    'quota': QUOTA_KEYWORDS,
+}
+
+def open_classification_cache(path=None, directory=None):
+    patterns = list(MEMBER_MAP) + [keyword for keyword, _ in CATEGORY_KEYWORDS] + QUOTA_KEYWORDS
+    if directory is None:
+        return ClassificationCache('process_bank_statement', CLASSIFICATION_RULES, patterns, path)
+    # Namespace próprio: alternar com e sem --members não apaga a cache do outro modo
+    rules = dict(CLASSIFICATION_RULES, directory=directory.rules())
+    return ClassificationCache('process_bank_statement/members', rules, patterns + directory.patterns(), path)
+
+
+def building_directory(directory, building_id):
+    """Membros de um edifício, com as member_keys e os aliases de MEMBER_MAP"""
+    directory = directory.for_building(building_id)
+    directory.bind_keys(MEMBER_NAME_PATTERNS)
+    directory.add_aliases(MEMBER_MAP.items())
+    return directory
+
+# =====================================================
+# PIPELINE: parse -> classify -> emit (tudo em streaming)
+# =====================================================
+
+def build_transaction(idx, row, date, year, amount):
+    """Transação (dict) a partir da linha do CSV e da data/valor já convertidos"""
+    desc = row['Descripción']
+    memoria = row['Memoria']
+
+    # Descripción completa
+    full_desc = desc
+    if memoria and memoria != desc:
+        full_desc += f" - {memoria}"
+
+    return {
+        'idx': idx,
+        'date': date,
+        'year': year,
+        'type': 'income' if amount > 0 else 'expense',
+        'amount': abs(amount),
+        'description': full_desc,
+        'raw_description': desc,
+        'beneficiario': row['Beneficiario'],
+        'categoria': row['Categoría'],
+        'account': row['Cuentas'],
+        'time': row['Hora'],
+        'memoria': memoria,
+        'signed_amount': amount,
+    }
+
+def parse_rows(rows, metrics=None):
+    """Etapa 1: converte linhas do CSV em transações, descartando linhas inválidas"""
+    for idx, row in enumerate(rows, 1):
+        date = parse_date(row['Fecha'])
+        if not date:
+            if metrics:
+                metrics.skip('invalid_date')
+            continue
+
+        amount = parse_amount(row['Importe'])
+        if amount == 0:
+            if metrics:
+                metrics.skip('zero_or_invalid_amount')
+            continue
+
+        yield build_transaction(idx, row, date, int(date.split('-')[0]), amount)
+
+def parse_rows_columnar(rows, batch_size=50000, metrics=None):
+    """Etapa 1 (variante NumPy): converte Fecha/Importe lote a lote.
+
+    As linhas que o parse vectorizado rejeita (ex.: '1/2/2025') voltam a
+    passar por parse_date/parse_amount, por isso o resultado é o de parse_rows.
+    """
+    from bpi_import.columnar import ColumnBatch
+
+    def flush(batch, first_idx):
+        cols = ColumnBatch([r['Fecha'] for r in batch], [r['Importe'] for r in batch])
+        years = cols.year.tolist()
+        months = cols.month.tolist()
+        days = cols.day.tolist()
+        cents = cols.cents.tolist()
+        ok = cols.ok.tolist()
+
+        for i, row in enumerate(batch):
+            idx = first_idx + i
+            if ok[i]:
+                if cents[i] == 0:
+                    if metrics:
+                        metrics.skip('zero_or_invalid_amount')
+                    continue
+                date = f"{years[i]:04d}-{months[i]:02d}-{days[i]:02d}"
+                yield build_transaction(idx, row, date, years[i], Decimal(cents[i]).scaleb(-2))
+            else:
+                yield from parse_rows_at(idx, row, metrics)
+
+    batch = []
+    first_idx = 1
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield from flush(batch, first_idx)
+            first_idx += len(batch)
+            batch = []
+    if batch:
+        yield from flush(batch, first_idx)
+
+def parse_rows_at(idx, row, metrics=None):
+    """parse_rows para uma única linha com índice conhecido"""
+    for t in parse_rows([row], metrics):
+        t['idx'] = idx
+        yield t
+
+def classify(kind, desc, beneficiario, categoria, directory=None):
+    """(member_key, is_fee, category_id) de uma linha"""
+    if kind == 'income':
+        if directory is None:
+            member_key = identify_member(f"{desc} {beneficiario}")
+        else:
+            member_key = directory.key_of(directory.resolve(desc, beneficiario))
+        return member_key, is_quota_payment(categoria, beneficiario), None
+    return None, False, identify_category(f"{desc} {beneficiario} {categoria}")
+
+def classify_transactions(transactions, cache=None, directory=None):
+    """Etapa 2: identifica membro/quota (receitas) e categoria (despesas)"""
+    for t in transactions:
+        fields = (t['type'], t['raw_description'], t['beneficiario'], t['categoria'])
+        if cache is None:
+            result = classify(*fields, directory)
+        else:
+            key = cache.key(*fields)
+            result = cache.get(key)
+            if result is None:
+                result = cache.put(key, classify(*fields, directory))
+
+        t['member_key'], t['is_fee'], t['category_id'] = result
+        yield t
+
+def suggest_members(transactions, directory, suggestions, accept=None):
+    """Etapa opcional: propõe o membro mais parecido (trigramas) para receitas sem membro.
+
+    Uma proposta por pagador em `suggestions`; as de semelhança >= accept são
+    aplicadas à transação e ficam marcadas para aprender o alias.
+    """
+    from bpi_import.members import payer_name
+
+    for t in transactions:
+        if t['type'] == 'income' and not t['member_key']:
+            payer = payer_name(t['raw_description']) or t['beneficiario'] or t['raw_description']
+            suggestion = suggestions.get(payer)
+            if suggestion is None:
+                suggestion = suggestions[payer] = {'member_id': None, 'score': 0.0, 'rows': 0,
+                                                   'amount': Decimal('0'), 'accepted': False}
+                found = directory.suggest(payer)
+                if found:
+                    member_id, score, matched = found
+                    suggestion.update(member_id=member_id, member=directory.members[member_id]['name'],
+                                      matched=matched, score=score,
+                                      accepted=accept is not None and score >= accept)
+            suggestion['rows'] += 1
+            suggestion['amount'] += t['amount']
+            if suggestion['accepted']:
+                t['member_key'] = directory.key_of(suggestion['member_id'])
+        yield t
+
+def propose_categories(transactions, model, proposals, accept=None, batch_size=4096):
+    """Etapa opcional: propõe uma categoria (token_classifier.py) para despesas sem categoria.
+
+    Trabalha por lotes de batch_size linhas, pela ordem de entrada: as despesas
+    classificadas pelas regras treinam o modelo e as que ficaram sem categoria
+    recebem a mais provável. Uma proposta por descrição (sem nºs de operação)
+    em `proposals`; as de confiança >= accept são aplicadas à transação.
+    """
+    from bpi_import.token_classifier import group_key
+
+    def flush(batch):
+        expenses = [t for t in batch if t['type'] == 'expense']
+        learned = [t for t in expenses if t['category_id']]
+        model.learn([model.features(t['raw_description'], t['beneficiario'], t['categoria']) for t in learned],
+                    [t['category_id'] for t in learned])
+
+        pending = {}
+        for t in expenses:
+            if t['category_id']:
+                continue
+            key = group_key(t['raw_description'])
+            proposal = proposals.get(key)
+            if proposal is None:
+                proposal = proposals[key] = {'category_id': None, 'confidence': 0.0, 'rows': 0,
+                                             'amount': Decimal('0'), 'accepted': False,
+                                             'features': model.features(t['raw_description'], t['beneficiario'],
+                                                                        t['categoria'])}
+            if 'features' in proposal:
+                # Nova, ou vista quando o modelo ainda não tinha categorias
+                pending[key] = proposal
+            proposal['rows'] += 1
+            proposal['amount'] += t['amount']
+
+        predicted = model.predict([p['features'] for p in pending.values()])
+        if predicted:
+            for proposal, category_id, confidence in zip(pending.values(), *predicted):
+                proposal.update(category_id=category_id, confidence=confidence,
+                                accepted=accept is not None and confidence >= accept)
+                del proposal['features']
+
+        for t in expenses:
+            if not t['category_id']:
+                proposal = proposals[group_key(t['raw_description'])]
+                if proposal['accepted']:
+                    t['category_id'] = proposal['category_id']
+        return batch
+
+    batch = []
+    for t in transactions:
+        batch.append(t)
+        if len(batch) >= batch_size:
+            yield from flush(batch)
+            batch = []
+    if batch:
+        yield from flush(batch)
+
+def finish_proposals(model, proposals):
+    """Proposta (só para o resumo) das descrições vistas antes de o modelo ter categorias"""
+    pending = [p for p in proposals.values() if 'features' in p]
+    predicted = model.predict([p.pop('features') for p in pending])
+    if predicted:
+        for proposal, category_id, confidence in zip(pending, *predicted):
+            proposal.update(category_id=category_id, confidence=confidence)
+
+def new_stats():
+    return {
+        'total': 0,
+        'income': 0,
+        'expense': 0,
+        'first_date': None,
+        'last_date': None,
+        'years': set(),
+        'members': {},
+        'year_totals': {},
+    }
+
+def track_stats(transactions, stats):
+    """Acumula totais à passagem (memória proporcional ao nº de membros, não de linhas)"""
+    for t in transactions:
+        stats['total'] += 1
+        stats[t['type']] += 1
+        stats['years'].add(t['year'])
+        year_totals = stats['year_totals'].setdefault(t['year'], {'income': Decimal('0'), 'expense': Decimal('0')})
+        year_totals[t['type']] += t['amount']
+        if stats['first_date'] is None or t['date'] < stats['first_date']:
+            stats['first_date'] = t['date']
+        if stats['last_date'] is None or t['date'] > stats['last_date']:
+            stats['last_date'] = t['date']
+        if t['type'] == 'income' and t['member_key']:
+            member = stats['members'].setdefault(t['member_key'], {'count': 0, 'total': Decimal('0')})
+            member['count'] += 1
+            member['total'] += t['amount']
+        yield t
+
+def emit_summary(stats, out=sys.stdout):
+    def emit(line=''):
+        print(line, file=out)
+
+    emit("-- =====================================================")
+    emit(f"-- Total de transações: {stats['total']}")
+    emit(f"-- Período: {stats['first_date']} a {stats['last_date']}")
+    emit(f"-- Receitas: {stats['income']} transações")
+    emit(f"-- Despesas: {stats['expense']} transações")
+    if stats.get('overlap'):
+        overlap = stats['overlap']
+        emit(f"-- Exportações juntas: {overlap['files']} ficheiros, {overlap['rows']} linhas, "
+             f"{overlap['duplicates']} repetidas descartadas")
+    emit("-- Resumo de pagamentos por membro:")
+    for member, member_stats in sorted(stats['members'].items()):
+        emit(f"--   {member}: {member_stats['count']} pagamentos = €{member_stats['total']:.2f}")
+    emit("-- Totais por ano:")
+    for year, totals in sorted(stats['year_totals'].items()):
+        emit(f"--   {year}: receitas €{totals['income']:.2f} / despesas €{totals['expense']:.2f}")
+    if stats.get('backup_totals') is not None:
+        emit("-- Comparação com o backup (receitas / despesas):")
+        backup_totals = stats['backup_totals']
+        zero = {'income': Decimal('0'), 'expense': Decimal('0')}
+        for year in sorted(set(stats['year_totals']) | set(backup_totals)):
+            ours = stats['year_totals'].get(year, zero)
+            theirs = backup_totals.get(year, zero)
+            mark = 'OK' if ours == theirs else 'DIFERENTE'
+            emit(f"--   {year}: extracto €{ours['income']:.2f} / €{ours['expense']:.2f}, "
+                 f"backup €{theirs['income']:.2f} / €{theirs['expense']:.2f} {mark}")
+    if stats.get('budgets'):
+        emit("-- Despesas por ano e categoria (execução dos orçamentos):")
+        category_keys = {category_id: key for key, category_id in CATEGORY_MAP.items()}
+        for (year, category_id), agg in sorted(stats['budgets'].items()):
+            emit(f"--   {year} {category_keys.get(category_id, category_id)}: "
+                 f"{agg['count']} despesas = €{agg['spent']:.2f}")
+    if stats.get('resumed_from'):
+        emit(f"-- Lidas só as linhas desde {stats['resumed_from']} (último mês com checkpoint)")
+    if stats.get('checkpoints'):
+        emit("-- Saldos mensais (checkpoints) refeitos:")
+        for account, month in sorted(stats['checkpoints'].items()):
+            emit(f"--   {account}: desde {month}")
+    if stats.get('suggestions'):
+        emit("-- Pagadores sem membro (proposta por semelhança; [x] = aplicada):")
+        for payer, s in sorted(stats['suggestions'].items(), key=lambda item: (-item[1]['score'], item[0])):
+            proposal = f"{s['member']} ({s['score']:.2f})" if s['member_id'] else "sem proposta"
+            mark = '[x]' if s['accepted'] else '[ ]'
+            emit(f"--   {mark} {payer}: {s['rows']} linhas, €{s['amount']:.2f} -> {proposal}")
+    if stats.get('category_proposals'):
+        emit("-- Despesas sem categoria (proposta do classificador; [x] = aplicada):")
+        category_keys = {category_id: key for key, category_id in CATEGORY_MAP.items()}
+        proposals = sorted(stats['category_proposals'].items(), key=lambda item: (-item[1]['rows'], item[0]))
+        for description, p in proposals[:CATEGORY_PROPOSALS_SHOWN]:
+            if p['category_id']:
+                proposal = f"{category_keys.get(p['category_id'], p['category_id'])} ({p['confidence']:.2f})"
+            else:
+                proposal = "sem proposta"
+            mark = '[x]' if p['accepted'] else '[ ]'
+            emit(f"--   {mark} {description}: {p['rows']} linhas, €{p['amount']:.2f} -> {proposal}")
+        if len(proposals) > CATEGORY_PROPOSALS_SHOWN:
+            emit(f"--   ... e mais {len(proposals) - CATEGORY_PROPOSALS_SHOWN} descrições")
+    emit("-- =====================================================")
+    emit()
+
+# Linhas de propostas de categoria mostradas no resumo
+CATEGORY_PROPOSALS_SHOWN = 30
+
+def format_income_values(t):
+    member_var = f"v_{t['member_key']}_id" if t['member_key'] else "NULL"
+    is_fee = 'true' if t['is_fee'] else 'false'
+    desc = t['description'].replace("'", "''")
+    return f"(uuid_generate_v4(), v_building_id, v_period_id, {member_var}, '{t['date']}', 'income', '{desc}', {t['amount']}, {is_fee}, 'Transferência Bancária', {t['year']}, '{t['fingerprint']}')"
+
+def format_expense_values(t):
+    category_var = f"'{t['category_id']}'" if t['category_id'] else "NULL"
+    desc = t['description'].replace("'", "''")
+    return f"(uuid_generate_v4(), v_building_id, v_period_id, {category_var}, '{t['date']}', 'expense', '{desc}', {t['amount']}, false, 'Débito Direto', {t['year']}, '{t['fingerprint']}')"
+
+INSERT_HEADERS = {
+    'income': (
+        "    INSERT INTO transactions (\n"
+        "        id, building_id, period_id, member_id,\n"
+        "        transaction_date, transaction_type, description, amount,\n"
+        "        is_fee_payment, payment_method, year, import_fingerprint\n"
+        "    ) VALUES"
+    ),
+    'expense': (
+        "    INSERT INTO transactions (\n"
+        "        id, building_id, period_id, category_id,\n"
+        "        transaction_date, transaction_type, description, amount,\n"
+        "        is_fee_payment, payment_method, year, import_fingerprint\n"
+        "    ) VALUES"
+    ),
+}
+
+# Linhas já importadas (mesma impressão digital) são ignoradas pela BD
+ON_CONFLICT = "\n        ON CONFLICT (import_fingerprint) WHERE import_fingerprint IS NOT NULL DO NOTHING;"
+
+VALUE_FORMATTERS = {
+    'income': format_income_values,
+    'expense': format_expense_values,
+}
+
+def emit_sql(transactions, stats, building_id=BUILDING_ID, out=sys.stdout, member_ids=None, budgets=None):
+    """Etapa 3: escreve o bloco PL/pgSQL à medida que as transações chegam.
+
+    As linhas consecutivas do mesmo ano e tipo partilham um INSERT; o
+    separador é escrito antes de cada linha, por isso não é preciso conhecer
+    o total da lista para decidir entre ',' e ';'. Com member_ids (directório
+    de membros) os IDs dos membros são literais. Com budgets o trigger dos
+    orçamentos também fica desligado (budgets.py).
+    """
+    def emit(line=''):
+        print(line, file=out)
+
+    emit("-- =====================================================")
+    emit("-- IMPORTAÇÃO COMPLETA DO EXTRATO BPI")
+    emit("-- (resumo de totais no fim do ficheiro)")
+    emit("-- =====================================================")
+    emit()
+
+    member_keys = sorted(member_ids) if member_ids is not None else sorted(set(MEMBER_MAP.values()))
+
+    # Os saldos dos membros são calculados em bloco no fim (ver balances.py)
+    emit("BEGIN;")
+    write_trigger_toggle(out, enable=False, triggers=load_triggers(budgets))
+    emit()
+
+    emit("DO $$")
+    emit("DECLARE")
+    emit(f"    v_building_id UUID := '{building_id}';")
+    emit("    v_period_id UUID;")
+    for member_key in member_keys:
+        if member_ids is not None:
+            emit(f"    v_{member_key}_id UUID := '{member_ids[member_key]}';")
+        else:
+            emit(f"    v_{member_key}_id UUID;")
+    emit("BEGIN")
+    emit()
+
+    # Buscar IDs de membros
+    if member_ids is None:
+        emit("    -- Buscar IDs de membros")
+        for member_key in member_keys:
+            pattern = MEMBER_NAME_PATTERNS.get(member_key, f'{member_key.title()}%')
+            emit(f"    SELECT id INTO v_{member_key}_id FROM members")
+            emit(f"    WHERE building_id = v_building_id AND name LIKE '{pattern}';")
+        emit()
+
+    current_year = None
+    current_group = None
+
+    for t in track_stats(transactions, stats):
+        year = t['year']
+        group = (year, t['type'])
+
+        if group != current_group:
+            if current_group is not None:
+                emit(ON_CONFLICT)
+                emit()
+            if year != current_year:
+                emit("    -- =============================================")
+                emit(f"    -- ANO {year}")
+                emit("    -- =============================================")
+                emit("    SELECT id INTO v_period_id FROM financial_periods")
+                emit(f"    WHERE building_id = v_building_id AND year = {year};")
+                emit()
+                current_year = year
+            emit(f"    -- {'Receitas' if t['type'] == 'income' else 'Despesas'} {year}")
+            emit(INSERT_HEADERS[t['type']])
+            out.write(f"        {VALUE_FORMATTERS[t['type']](t)}")
+            current_group = group
+        else:
+            out.write(f",\n        {VALUE_FORMATTERS[t['type']](t)}")
+
+    if current_group is not None:
+        emit(ON_CONFLICT)
+        emit()
+
+    emit("END $$;")
+    emit()
+    write_trigger_toggle(out, enable=True, triggers=load_triggers(budgets))
+    emit()
+
+def emit_checks(stats, out=sys.stdout):
+    """Recalcula saldos e imprime as consultas de verificação"""
+    def emit(line=''):
+        print(line, file=out)
+
+    years = ', '.join(str(y) for y in sorted(stats['years'])) or 'NULL'
+    last_year = max(stats['years']) if stats['years'] else 'NULL'
+
+    # =====================================================
+    # VERIFICAÇÕES FINAIS
+    # =====================================================
+    emit("-- Verificar totais por ano")
+    emit("SELECT")
+    emit("    year,")
+    emit("    transaction_type,")
+    emit("    COUNT(*) AS num_transacoes,")
+    emit("    SUM(amount) AS total")
+    emit("FROM transactions")
+    emit(f"WHERE year IN ({years})")
+    emit("  AND deleted_at IS NULL")
+    emit("GROUP BY year, transaction_type")
+    emit("ORDER BY year, transaction_type;")
+    emit()
+
+    emit(f"-- Verificar saldos dos membros em {last_year}")
+    emit("SELECT")
+    emit("    m.name,")
+    emit("    mpb.quota_expected_annual,")
+    emit("    mpb.quota_paid_total,")
+    emit("    mpb.balance,")
+    emit("    mpb.status")
+    emit("FROM member_period_balance mpb")
+    emit("JOIN members m ON mpb.member_id = m.id")
+    emit("JOIN financial_periods fp ON mpb.period_id = fp.id")
+    emit(f"WHERE fp.year = {last_year}")
+    emit("ORDER BY m.name;")
+
+def process_stream(rows, building_id, out=sys.stdout, copy_dir=None, watermarks=None,
+                   columnar=False, metrics=None, cache=None, batch_size=None, directory=None,
+                   accept_similar=None, quotas=None, known=None, category_model=None, accept_predicted=None,
+                   checkpoints=False, budgets=False):
+    """Pipeline completo para um edifício; devolve as estatísticas.
+
+    Os saldos dos (membro, ano) tocados são sempre refeitos a partir das
+    transações gravadas. Com watermarks a importação é incremental; sem eles o
+    extracto é a história completa. Com metrics (ImportMetrics) cada etapa é medida.
+    Sem cache (ClassificationCache) a classificação usa só um LRU em memória. Com batch_size o SQL sai em lotes,
+    uma transação por lote (batched_sql.py), em vez do bloco DO. Com directory
+    (MemberDirectory, ver building_directory) os membros são resolvidos em
+    Python e o SQL leva os seus UUIDs, e as receitas sem membro recebem uma
+    proposta por semelhança (aplicada se >= accept_similar). Com quotas
+    ({ano: (q150, q200)}, só com directory) os pagamentos são reconciliados
+    com as quotas mensais da permilagem de cada membro (reconcile.py) numa
+    transação final. Com known (impressões
+    digitais de um backup, ver pgdump.py) as linhas já gravadas são descartadas.
+    Com category_model (TokenClassifier) as despesas sem categoria recebem uma
+    proposta do classificador (aplicada se >= accept_predicted). Com
+    checkpoints os totais por conta e mês ficam em stats['months'], para
+    BalanceCheckpoints.record. Com budgets as despesas são somadas por ano e
+    categoria e aplicadas a budget_items no fim da carga, com o trigger dos
+    orçamentos desligado (budgets.py).
+    """
+    if cache is None:
+        cache = open_classification_cache(directory=directory)
+    member_ids = directory.member_ids() if directory is not None else None
+    if metrics:
+        metrics.start()
+        track = metrics.track
+    else:
+        track = lambda name, iterable: iterable
+
+    rows = track('read', rows)
+    parsed = parse_rows_columnar(rows, metrics=metrics) if columnar else parse_rows(rows, metrics)
+    transactions = track('fingerprint', fingerprint_transactions(track('parse', parsed)))
+    if watermarks:
+        transactions = track('watermark', watermarks.filter_new(transactions))
+    if known is not None:
+        transactions = filter_known(transactions, known, metrics)
+
+    stats = new_stats()
+    if checkpoints:
+        from bpi_import.checkpoints import track_months
+        stats['months'] = {}
+        transactions = track_months(transactions, stats['months'])
+    transactions = classify_transactions(transactions, cache, directory)
+    if directory is not None:
+        stats['suggestions'] = {}
+        transactions = suggest_members(transactions, directory, stats['suggestions'], accept_similar)
+    if category_model is not None:
+        stats['category_proposals'] = {}
+        transactions = propose_categories(transactions, category_model, stats['category_proposals'],
+                                          accept_predicted)
+    if metrics:
+        transactions = metrics.observe_classification(transactions)
+    transactions = track('classify', transactions)
+    payments = {}
+    transactions = track('aggregate', aggregate_payments(transactions, payments))
+    budget_totals = None
+    if budgets:
+        budget_totals = stats['budgets'] = {}
+        transactions = aggregate_expenses(transactions, budget_totals)
+    fee_payments = []
+    if quotas is not None:
+        if directory is None:
+            raise ValueError("a reconciliação precisa do directório de membros (permilagem de cada um)")
+        from bpi_import.reconcile import collect_payments, reconcile, write_reconciliation
+        transactions = collect_payments(transactions, fee_payments)
+
+    def write_member_ids(handle):
+        write_member_lookup(handle, building_id, MEMBER_NAME_PATTERNS, member_ids=member_ids)
+
+    def write_quota_reconciliation(handle):
+        if quotas is None or not stats['total']:
+            return
+        permilages = directory.permilages()
+        first = (int(stats['first_date'][:4]), 1)
+        last = (int(stats['last_date'][:4]), int(stats['last_date'][5:7]))
+        rows, summary = reconcile(fee_payments, permilages, quotas, first, last)
+        write_reconciliation(handle, building_id, rows, summary, write_member_ids)
+
+    if copy_dir:
+        os.makedirs(copy_dir, exist_ok=True)
+        write_copy_file(track_stats(transactions, stats), os.path.join(copy_dir, DATA_FILE))
+        if category_model is not None:
+            finish_proposals(category_model, stats['category_proposals'])
+        with open(os.path.join(copy_dir, LOADER_FILE), 'w', encoding='utf-8') as loader:
+            write_loader_script(loader, building_id, MEMBER_NAME_PATTERNS, payments,
+                                member_ids=member_ids, budgets=budget_totals)
+            write_quota_reconciliation(loader)
+            emit_summary(stats, loader)
+            emit_checks(stats, loader)
+    elif batch_size:
+        write_batched_sql(out, track_stats(transactions, stats), building_id, MEMBER_NAME_PATTERNS,
+                          payments, batch_size, member_ids, budget_totals)
+        write_quota_reconciliation(out)
+    else:
+        emit_sql(transactions, stats, building_id, out, member_ids, budget_totals)
+        write_member_lookup(out, building_id, MEMBER_NAME_PATTERNS, member_ids=member_ids)
+        write_balance_upsert(out, building_id, payments)
+        if budgets:
+            write_budget_rollup(out, building_id, budget_totals)
+        print("COMMIT;", file=out)
+        print(file=out)
+        write_quota_reconciliation(out)
+    if category_model is not None and not copy_dir:
+        finish_proposals(category_model, stats['category_proposals'])
+
+    if metrics:
+        metrics.finish('copy' if copy_dir else 'emit', stats['total'])
+        if watermarks:
+            metrics.skip('already_imported', metrics.rows_out('fingerprint') - metrics.rows_out('watermark'))
+        metrics.cache = cache.stats()
+
+    return stats
+
+# Trabalho de um shard (uma conta) para run_shard; as opções não indicadas ficam
+# desligadas. mark: False = sem watermark, None = watermark ainda sem marca
+ShardJob = namedtuple('ShardJob', [
+    'account', 'building_id', 'shard_path', 'sql_path', 'copy_dir', 'mark', 'columnar', 'measure',
+    'cache_path', 'batch_size', 'directory', 'accept_similar', 'quotas', 'known', 'checkpoints', 'budgets',
+], defaults=(None, False, False, False, None, None, None, None, None, None, False, False))
+
+def run_shard(job):
+    """Processo de trabalho: corre o pipeline (ShardJob) sobre o CSV de uma conta"""
+    watermarks = None
+    if job.mark is not False:
+        watermarks = WatermarkStore(accounts={job.account: job.mark} if job.mark else {})
+    metrics = ImportMetrics() if job.measure else None
+
+    directory = job.directory
+    if directory is not None:
+        directory = building_directory(directory, job.building_id)
+
+    options = dict(watermarks=watermarks, columnar=job.columnar, metrics=metrics, directory=directory,
+                   accept_similar=job.accept_similar, quotas=job.quotas, known=job.known,
+                   checkpoints=job.checkpoints, budgets=job.budgets)
+    rows = iter_rows([job.shard_path])
+    with open_classification_cache(job.cache_path, directory) as cache:
+        if job.copy_dir:
+            stats = process_stream(rows, job.building_id, copy_dir=job.copy_dir, cache=cache, **options)
+        else:
+            with open(job.sql_path, 'w', encoding='utf-8') as out:
+                stats = process_stream(rows, job.building_id, out, cache=cache, batch_size=job.batch_size,
+                                       **options)
+
+    return stats, watermarks.pending() if watermarks else {}, metrics.to_dict() if metrics else None
+
+def run_parallel(rows, account_buildings, jobs, copy_dir=None, watermarks=None, columnar=False,
+                 shard_metrics=None, cache_path=None, batch_size=None, out=sys.stdout, directory=None,
+                 accept_similar=None, quotas=None, known=None, checkpoints=False, budgets=False):
+    """Reparte por conta, processa cada conta num processo e junta por ordem de conta.
+
+    Com shard_metrics (lista) acrescenta-lhe (conta, métricas) de cada shard.
+    directory (MemberDirectory de todos os edifícios) é filtrado em cada shard.
+    """
+    import shutil
+    import tempfile
+    from concurrent.futures import ProcessPoolExecutor
+
+    from bpi_import.parallel import merge_stats, spool_by_account
+
+    with tempfile.TemporaryDirectory(prefix='bpi_shards_') as tmp:
+        shards = spool_by_account(rows, tmp, account_buildings)
+
+        job_list = []
+        for account in sorted(shards):
+            shard_path = shards[account]
+            mark = False
+            if watermarks:
+                mark = watermarks.accounts.get(account)
+            shard_copy_dir = None
+            if copy_dir:
+                shard_copy_dir = os.path.join(copy_dir, os.path.basename(shard_path)[:-len('.csv')])
+            job_list.append(ShardJob(
+                account, account_buildings[account], shard_path, f'{shard_path[:-len(".csv")]}.sql',
+                copy_dir=shard_copy_dir, mark=mark, columnar=columnar, measure=shard_metrics is not None,
+                cache_path=cache_path, batch_size=batch_size, directory=directory,
+                accept_similar=accept_similar, quotas=quotas, known=known, checkpoints=checkpoints,
+                budgets=budgets,
+            ))
+
+        labelled_stats = []
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            # map() devolve pela ordem dos jobs: a saída não depende do escalonamento
+            for job, (stats, pending, metrics) in zip(job_list, pool.map(run_shard, job_list)):
+                print(f"-- >>> Conta {job.account} -> edifício {job.building_id}", file=out)
+                if job.copy_dir:
+                    print(f"-- >>> {os.path.join(job.copy_dir, LOADER_FILE)}", file=out)
+                    print(file=out)
+                else:
+                    with open(job.sql_path, encoding='utf-8') as shard_sql:
+                        shutil.copyfileobj(shard_sql, out)
+                labelled_stats.append((job.account, stats))
+                if watermarks:
+                    watermarks.absorb(pending)
+                if metrics:
+                    shard_metrics.append((job.account, metrics))
+
+    return merge_stats(labelled_stats)
+
+# Opções que não se combinam: (opção, opção, motivo)
+INCOMPATIBLE_OPTIONS = [
+    ('--batch-size', '--copy-dir', "o --copy-dir carrega com COPY e não escreve lotes"),
+    ('--reconcile', '--state', "a reconciliação precisa da história completa"),
+    ('--reconcile', '--skip-in-backup', "a reconciliação precisa da história completa"),
+    ('--reconcile', '--period', "a reconciliação precisa da história completa"),
+    ('--category-model', '--jobs', "o classificador aprende pela ordem do extracto"),
+]
+
+# Opções que só fazem sentido com outra: (opção, opção necessária, motivo)
+REQUIRED_OPTIONS = [
+    ('--accept-similar', '--members', "as propostas vêm do directório de membros"),
+    ('--learn-aliases', '--members', "as propostas vêm do directório de membros"),
+    ('--reconcile', '--members', "a quota esperada depende da permilagem de cada membro"),
+    ('--quotas', '--reconcile', "as quotas só são usadas na reconciliação"),
+    ('--accept-predicted', '--category-model', "as propostas vêm do classificador"),
+]
+
+def option_given(args, option):
+    value = getattr(args, option[2:].replace('-', '_'))
+    return value is not None and value is not False
+
+def check_options(parser, args):
+    """Recusa (parser.error) as combinações de INCOMPATIBLE_OPTIONS e REQUIRED_OPTIONS"""
+    for option, other, reason in INCOMPATIBLE_OPTIONS:
+        if option_given(args, option) and option_given(args, other):
+            parser.error(f"{option} não se combina com {other}: {reason}")
+    for option, required, reason in REQUIRED_OPTIONS:
+        if option_given(args, option) and not option_given(args, required):
+            parser.error(f"{option} precisa de {required}: {reason}")
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(
+        prog=prog,
+        description='Gera SQL de importação a partir de exportações BPI (CSV ou CSV.gz)'
+    )
+    parser.add_argument(
+        'files', nargs='*',
+        help="ficheiros a processar ('-' para stdin); sem argumentos usa o extracto de exemplo "
+             "(bpi_import/data/extracto_buraca.csv)"
+    )
+    parser.add_argument(
+        '--state', metavar='FICHEIRO',
+        help="watermark por conta (JSON); só são emitidas as linhas ainda não importadas"
+    )
+    parser.add_argument(
+        '--copy-dir', metavar='DIR',
+        help=f"em vez do bloco DO, escreve {DATA_FILE} (formato COPY) e {LOADER_FILE} em DIR"
+    )
+    parser.add_argument(
+        '--jobs', type=int, metavar='N',
+        help="processa cada conta ('Cuentas') num processo separado (0 = nº de CPUs)"
+    )
+    parser.add_argument(
+        '--accounts', metavar='FICHEIRO',
+        help="JSON {conta: building_id} para o modo --jobs (por omissão só a conta BURACA)"
+    )
+    parser.add_argument(
+        '--columnar', action='store_true',
+        help="converte datas e valores em lotes com NumPy (requer numpy)"
+    )
+    parser.add_argument(
+        '--period', metavar='DE..ATÉ',
+        help="só as linhas deste período, ex.: 2024-01..2024-12, 2024 ou 2024-03 "
+             "(lido por mmap e índice de datas, sem percorrer o resto do ficheiro); os saldos dos anos "
+             "tocados são refeitos a partir das transações gravadas"
+    )
+    parser.add_argument(
+        '--merge', action='store_true',
+        help="junta exportações com períodos sobrepostos por Fecha e descarta as linhas repetidas "
+             "entre ficheiros (cada exportação tem de vir ordenada por Fecha)"
+    )
+    parser.add_argument(
+        '--classify-cache', metavar='FICHEIRO',
+        help="cache persistente (SQLite) da classificação, invalidada quando as regras mudam"
+    )
+    parser.add_argument(
+        '--members', metavar='FICHEIRO', action='append',
+        help="membros e aliases (CSV id,name,building_id,fraction,permilage,aliases ou alias,member) ou backup "
+             "pg_dump (.sql/.sql.gz); os membros são resolvidos aqui e o SQL leva os UUIDs (repetível)"
+    )
+    parser.add_argument(
+        '--accept-similar', type=float, metavar='S',
+        help="com --members, aplica as propostas por semelhança de trigramas >= S (0-1) "
+             "às receitas sem membro; as restantes só aparecem no resumo"
+    )
+    parser.add_argument(
+        '--learn-aliases', metavar='FICHEIRO',
+        help="exportação de aliases (CSV alias,member) lida com --members e onde são gravadas "
+             "as propostas aplicadas, para a próxima importação as reconhecer directamente"
+    )
+    parser.add_argument(
+        '--reconcile', action='store_true',
+        help="reconcilia as quotas pagas com as mensais esperadas e escreve member_monthly_tracking "
+             "(precisa de --members, com a permilagem de cada membro)"
+    )
+    parser.add_argument(
+        '--quotas', metavar='FICHEIRO',
+        help='com --reconcile, quotas mensais em JSON {"2025": {"150": 32.66, "200": 43.54}} '
+             '(por omissão as de 20251122_financial_system_hybrid.sql)'
+    )
+    parser.add_argument(
+        '--skip-in-backup', metavar='FICHEIRO',
+        help="backup pg_dump (.sql/.sql.gz): descarta as linhas cujas impressões digitais já lá estão "
+             "e refaz os saldos tocados a partir das transações gravadas"
+    )
+    parser.add_argument(
+        '--verify-backup', metavar='FICHEIRO',
+        help="backup pg_dump (.sql/.sql.gz): compara os totais por ano do extracto com os das "
+             "transações do backup, no resumo"
+    )
+    parser.add_argument(
+        '--budgets', action='store_true',
+        help="actualiza budget_items (20251123_create_budgets_system.sql) com as despesas somadas por ano e "
+             "categoria, num único UPDATE, com o trigger por linha desligado durante a carga"
+    )
+    parser.add_argument(
+        '--checkpoints', metavar='FICHEIRO',
+        help="saldos de fecho por conta e mês (JSON, ver analyze --checkpoints), "
+             "actualizados com os meses desta importação; sem --period só são lidas as linhas a partir "
+             "do último mês com checkpoint (o resto já foi importado)"
+    )
+    parser.add_argument(
+        '--category-model', metavar='FICHEIRO',
+        help="modelo de tokens (.npz, requer numpy) treinado com as despesas já classificadas; propõe uma "
+             "categoria para as que ficaram sem categoria e é gravado com o que aprendeu nesta importação"
+    )
+    parser.add_argument(
+        '--accept-predicted', type=float, metavar='P',
+        help="com --category-model, aplica as categorias propostas com confiança >= P (0-1); "
+             "as restantes só aparecem no resumo"
+    )
+    parser.add_argument(
+        '--output', '-o', metavar='FICHEIRO',
+        help="escreve o SQL neste ficheiro em vez do stdout ('.gz' comprime à medida que escreve)"
+    )
+    parser.add_argument(
+        '--batch-size', type=int, metavar='N',
+        help="SQL em lotes de N linhas, cada lote numa transação (para cargas grandes)"
+    )
+    parser.add_argument(
+        '--metrics', metavar='FICHEIRO',
+        help=f"grava métricas por etapa em JSON (com --copy-dir, por omissão {METRICS_FILE} em DIR)"
+    )
+    args = parser.parse_args(argv)
+    check_options(parser, args)
+    if args.batch_size is not None and args.batch_size < 1:
+        parser.error("--batch-size tem de ser positivo")
+
+    account_buildings = ACCOUNT_BUILDINGS
+    if args.accounts:
+        from bpi_import.parallel import load_account_buildings
+        account_buildings = load_account_buildings(args.accounts)
+    resume = None
+    if args.checkpoints:
+        from bpi_import.checkpoints import BalanceCheckpoints
+        checkpoints = BalanceCheckpoints(args.checkpoints)
+        if not args.period and checkpoints.accounts:
+            # Os meses antes do último checkpoint já foram importados; uma conta sem checkpoint relê tudo
+            resume = checkpoints.resume_from(account_buildings)
+
+    if args.period or resume:
+        from bpi_import.mmap_reader import filter_period, iter_rows_period, parse_period
+        if resume:
+            date_from, date_to = resume, '9999-12-31'
+        else:
+            try:
+                date_from, date_to = parse_period(args.period)
+            except ValueError as e:
+                parser.error(str(e))
+        if args.files:
+            read = lambda path: iter_rows_period([path], date_from, date_to)
+            rows = iter_rows_period(args.files, date_from, date_to)
+        else:
+            rows = filter_period(iter_text_rows(sample_text()), date_from, date_to)
+    else:
+        read = lambda path: iter_rows([path])
+        rows = iter_rows(args.files) if args.files else iter_text_rows(sample_text())
+    overlap = None
+    if args.merge and len(args.files) > 1:
+        from bpi_import.merge import merge_exports
+        overlap = {}
+        try:
+            rows = merge_exports([(path, read(path)) for path in args.files], overlap)
+        except ValueError as e:
+            parser.error(str(e))
+    watermarks = WatermarkStore(args.state) if args.state else None
+    category_model = None
+    if args.category_model:
+        from bpi_import.token_classifier import TokenClassifier
+        if os.path.exists(args.category_model):
+            category_model = TokenClassifier.load(args.category_model)
+        else:
+            category_model = TokenClassifier()
+    quotas = None
+    if args.reconcile:
+        from bpi_import.reconcile import DEFAULT_MONTHLY_QUOTAS, load_quotas
+        quotas = load_quotas(args.quotas) if args.quotas else DEFAULT_MONTHLY_QUOTAS
+    directory = None
+    if args.members:
+        member_files = list(args.members)
+        if args.learn_aliases and os.path.exists(args.learn_aliases):
+            member_files.append(args.learn_aliases)
+        from bpi_import.members import load_directory
+        try:
+            directory = load_directory(member_files)
+        except ValueError as e:
+            parser.error(str(e))
+    building_ids = set(account_buildings.values()) if args.jobs is not None else {BUILDING_ID}
+    if args.reconcile:
+        missing = sorted(m['name'] for m in directory.members.values()
+                         if m['permilage'] is None and m['building_id'] in building_ids | {None})
+        if missing:
+            parser.error(f"--reconcile: membros sem permilagem em --members: {', '.join(missing)}")
+    known = None
+    if args.skip_in_backup:
+        from bpi_import.pgdump import dump_fingerprints
+        known = dump_fingerprints(args.skip_in_backup, building_ids)
+    metrics_path = args.metrics
+    if not metrics_path and args.copy_dir:
+        metrics_path = os.path.join(args.copy_dir, METRICS_FILE)
+
+    out = open_output(args.output)
+    try:
+        if args.jobs is not None:
+            from bpi_import.parallel import UnknownAccountError
+            shard_metrics = [] if metrics_path else None
+            started = time.perf_counter()
+            try:
+                stats = run_parallel(rows, account_buildings, args.jobs or os.cpu_count(),
+                                     args.copy_dir, watermarks, args.columnar, shard_metrics,
+                                     args.classify_cache, args.batch_size, out, directory,
+                                     args.accept_similar, quotas, known, args.checkpoints is not None,
+                                     args.budgets)
+            except UnknownAccountError as e:
+                parser.error(str(e))
+            if metrics_path:
+                metrics = merge_metrics(shard_metrics)
+                metrics['wall_seconds'] = round(time.perf_counter() - started, 6)
+        else:
+            import_metrics = ImportMetrics() if metrics_path else None
+            if directory is not None:
+                directory = building_directory(directory, BUILDING_ID)
+            with open_classification_cache(args.classify_cache, directory) as cache:
+                stats = process_stream(rows, BUILDING_ID, out, copy_dir=args.copy_dir, watermarks=watermarks,
+                                       columnar=args.columnar, metrics=import_metrics, cache=cache,
+                                       batch_size=args.batch_size, directory=directory,
+                                       accept_similar=args.accept_similar, quotas=quotas, known=known,
+                                       category_model=category_model, accept_predicted=args.accept_predicted,
+                                       checkpoints=args.checkpoints is not None, budgets=args.budgets)
+            if metrics_path:
+                metrics = import_metrics.to_dict()
+
+        if overlap:
+            stats['overlap'] = overlap
+        if args.verify_backup:
+            from bpi_import.pgdump import dump_year_totals
+            stats['backup_totals'] = dump_year_totals(args.verify_backup, building_ids)
+        if args.checkpoints:
+            # Com watermark ou backup só passam as linhas novas: somam-se aos meses guardados
+            stats['resumed_from'] = resume
+            months = stats['months']
+            if args.period:
+                # Os meses cortados pelo período (ex.: 2024-03-10..) estão incompletos: não substituem os guardados
+                months = {key: totals for key, totals in months.items()
+                          if date_from <= parse_period(key[1])[0] and parse_period(key[1])[1] <= date_to}
+            stats['checkpoints'] = checkpoints.record(months, incremental=bool(watermarks or known))
+        emit_summary(stats, out)
+        if not args.copy_dir:
+            emit_checks(stats, out)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    if metrics_path:
+        write_metrics(metrics, metrics_path)
+
+    if args.learn_aliases:
+        learned = [(payer, s['member_id']) for payer, s in sorted(stats.get('suggestions', {}).items())
+                   if s['accepted']]
+        if learned:
+            from bpi_import.members import append_aliases
+            append_aliases(args.learn_aliases, learned)
+
+    if category_model is not None:
+        category_model.save(args.category_model)
+
+    # Só avança o watermark (e os checkpoints) depois de todo o SQL ter sido escrito
+    if watermarks:
+        watermarks.save()
+    if args.checkpoints:
+        checkpoints.save()
+
+if __name__ == '__main__':
+    main(prog='python -m bpi_import process')
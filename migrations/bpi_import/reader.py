@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Leitura em streaming de exportações BPI (ficheiro, stdin, simples ou gzip)
+"""
+
+import csv
+import gzip
+import io
+import sys
+
+GZIP_MAGIC = b'\x1f\x8b'
+
+# Colunas da exportação BPI (ver bpi_import/data/extracto_buraca.csv)
+BPI_COLUMNS = [
+    'Cuentas', 'Transferencias', 'Descripción', 'Beneficiario', 'Categoría',
+    'Fecha', 'Hora', 'Memoria', 'Importe', 'Moneda', 'Número de cheque', 'Etiquetas',
+]
+
+
+def open_extract(path):
+    """Abre uma exportação em modo texto; '-' é stdin, gzip detectado pelo magic"""
+    if path == '-':
+        raw = sys.stdin.buffer
+    else:
+        raw = open(path, 'rb')
+
+    buffered = raw if isinstance(raw, io.BufferedReader) else io.BufferedReader(raw)
+    if buffered.peek(2)[:2] == GZIP_MAGIC:
+        buffered = gzip.GzipFile(fileobj=buffered, mode='rb')
+
+    # utf-8-sig descarta o BOM que o homebanking às vezes inclui
+    return io.TextIOWrapper(buffered, encoding='utf-8-sig', newline='')
+
+
+def dict_reader(handle):
+    """csv.DictReader com cabeçalhos limpos (o CSV colado tem 'Cuentas"' no 1º)"""
+    reader = csv.DictReader(handle)
+    if reader.fieldnames:
+        reader.fieldnames = [name.strip().strip('"') for name in reader.fieldnames]
+    return reader
+
+
+def iter_rows(paths):
+    """Gera as linhas (dict) de todas as exportações, uma de cada vez"""
+    for path in paths:
+        with open_extract(path) as handle:
+            yield from dict_reader(handle)
+
+
+def iter_text_rows(text):
+    """Gera as linhas de um extracto já em memória (ex.: CSV colado no script)"""
+    yield from dict_reader(io.StringIO(text))
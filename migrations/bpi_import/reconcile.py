@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Reconciliação das quotas pagas com as quotas mensais esperadas
+
+A quota esperada de cada mês segue create_payment_triggers.sql: permilagem
+200 -> financial_periods.monthly_quota_200, qualquer outra -> monthly_quota_150.
+Os valores vêm de um JSON {ano: {"150": x, "200": y}} (--quotas) ou, por
+omissão, de DEFAULT_MONTHLY_QUOTAS (os de 20251122_financial_system_hybrid.sql).
+
+Os pagamentos de quota são recolhidos à passagem, ordenados uma vez por
+(membro, data) e imputados aos meses por merge ordenado: cada pagamento paga
+primeiro o mês mais antigo em dívida (FIFO) e o excedente passa aos meses
+seguintes. Não há procuras por pagamento; o custo é a ordenação mais uma
+passagem linear por pagamentos e meses.
+
+O resultado são linhas de member_monthly_tracking (upsert em bloco) e o
+resumo de dívida por membro. Como em balances.py, balance = esperado - pago
+(positivo = em dívida).
+"""
+
+import json
+from decimal import Decimal
+
+# Quotas mensais por ano (permilagem 150, 200)
+DEFAULT_MONTHLY_QUOTAS = {
+    2021: (Decimal('26.13'), Decimal('34.84')),
+    2022: (Decimal('26.13'), Decimal('34.84')),
+    2023: (Decimal('26.13'), Decimal('34.84')),
+    2024: (Decimal('26.13'), Decimal('34.84')),
+    2025: (Decimal('32.66'), Decimal('43.54')),
+}
+
+
+def load_quotas(path):
+    """JSON {"2025": {"150": 32.66, "200": 43.54}, ...} -> {ano: (q150, q200)}"""
+    with open(path, encoding='utf-8') as handle:
+        data = json.load(handle)
+    return {
+        int(year): (Decimal(str(q['150'])), Decimal(str(q.get('200', q['150']))))
+        for year, q in data.items()
+    }
+
+
+def monthly_quota(quotas, year, permilage):
+    """Quota esperada; anos sem valor usam o ano conhecido anterior (ou o primeiro)"""
+    known = [y for y in quotas if y <= year]
+    q150, q200 = quotas[max(known) if known else min(quotas)]
+    return q200 if permilage is not None and permilage == 200 else q150
+
+
+def collect_payments(transactions, payments):
+    """Etapa do pipeline: guarda (member_key, data, valor) das quotas pagas"""
+    for t in transactions:
+        if t['type'] == 'income' and t['is_fee'] and t['member_key']:
+            payments.append((t['member_key'], t['date'], t['amount']))
+        yield t
+
+
+def month_range(first, last):
+    """[(ano, mês)] de first a last, inclusive ((ano, mês) cada um)"""
+    year, month = first
+    months = []
+    while (year, month) <= last:
+        months.append((year, month))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+
+def reconcile(payments, permilages, quotas, first, last):
+    """Imputa os pagamentos aos meses de first a last ((ano, mês)).
+
+    permilages: {member_key: permilagem ou None} dos membros a reconciliar
+    (os que pagaram e não estão lá entram com a quota de 150).
+    Devolve (linhas de tracking, {member_key: resumo}).
+    """
+    months = month_range(first, last)
+    payments = sorted(payments)
+    members = sorted(set(permilages) | {p[0] for p in payments})
+
+    rows = []
+    summary = {}
+    schedules = {}  # quotas dos meses, uma vez por tipo de quota (150/200)
+    p = 0
+    for member_key in members:
+        permilage = permilages.get(member_key)
+        kind = 200 if permilage is not None and permilage == 200 else 150
+        due = schedules.get(kind)
+        if due is None:
+            due = schedules[kind] = [monthly_quota(quotas, year, permilage) for year, _ in months]
+        paid = [Decimal('0')] * len(months)
+        paid_on = [None] * len(months)
+        credit = Decimal('0')
+        i = 0
+
+        # Pagamentos deste membro (a lista está ordenada por membro e data)
+        while p < len(payments) and payments[p][0] < member_key:
+            p += 1
+        while p < len(payments) and payments[p][0] == member_key:
+            _, date, amount = payments[p]
+            p += 1
+            while amount > 0 and i < len(months):
+                take = min(amount, due[i] - paid[i])
+                paid[i] += take
+                paid_on[i] = date
+                amount -= take
+                if paid[i] >= due[i]:
+                    i += 1
+            credit += amount
+
+        for (year, month), expected, amount, date in zip(months, due, paid, paid_on):
+            rows.append({
+                'member_key': member_key,
+                'year': year,
+                'month': month,
+                'expected': expected,
+                'paid': amount,
+                'payment_date': date,
+            })
+
+        unpaid = [m for m, expected, amount in zip(months, due, paid) if amount < expected]
+        expected_total = sum(due, Decimal('0'))
+        paid_total = sum(paid, Decimal('0'))
+        summary[member_key] = {
+            'expected': expected_total,
+            'paid': paid_total + credit,
+            'arrears': expected_total - paid_total,
+            'credit': credit,
+            'months_unpaid': len(unpaid),
+            'oldest_unpaid': f"{unpaid[0][0]}-{unpaid[0][1]:02d}" if unpaid else None,
+        }
+    return rows, summary
+
+
+def write_reconciliation(out, building_id, rows, summary, write_member_lookup):
+    """Transação própria: upsert de member_monthly_tracking e overdue_months.
+
+    write_member_lookup(out) escreve a tabela temporária import_members.
+    """
+    def emit(line=''):
+        print(line, file=out)
+
+    building = f"'{building_id}'::uuid"
+
+    emit("-- =====================================================")
+    emit("-- RECONCILIAÇÃO DE QUOTAS (member_monthly_tracking)")
+    emit("-- =====================================================")
+    for member_key, s in sorted(summary.items()):
+        oldest = f", desde {s['oldest_unpaid']}" if s['oldest_unpaid'] else ''
+        emit(f"--   {member_key}: esperado €{s['expected']:.2f}, pago €{s['paid']:.2f}, "
+             f"em dívida €{s['arrears']:.2f} ({s['months_unpaid']} meses{oldest}), crédito €{s['credit']:.2f}")
+    if not rows:
+        emit("-- Sem membros a reconciliar")
+        emit()
+        return
+
+    emit("BEGIN;")
+    write_member_lookup(out)
+    emit("CREATE TEMP TABLE import_tracking (")
+    emit("    member_key TEXT,")
+    emit("    year INTEGER,")
+    emit("    month INTEGER,")
+    emit("    quota_expected NUMERIC(10,2),")
+    emit("    quota_paid NUMERIC(10,2),")
+    emit("    payment_date DATE")
+    emit(") ON COMMIT DROP;")
+    emit("INSERT INTO import_tracking VALUES")
+    for i, r in enumerate(rows):
+        comma = ',' if i < len(rows) - 1 else ';'
+        date = f"'{r['payment_date']}'" if r['payment_date'] else 'NULL'
+        emit(f"    ('{r['member_key']}', {r['year']}, {r['month']}, {r['expected']}, {r['paid']}, {date}){comma}")
+    emit()
+
+    emit("INSERT INTO member_monthly_tracking (")
+    emit("    member_id, period_id, building_id, year, month,")
+    emit("    quota_expected, quota_paid, balance, is_paid, payment_date, payment_method, notes")
+    emit(")")
+    emit("SELECT")
+    emit("    im.member_id, fp.id, fp.building_id, t.year, t.month,")
+    emit("    t.quota_expected, t.quota_paid, t.quota_expected - t.quota_paid,")
+    emit("    t.quota_paid >= t.quota_expected, t.payment_date,")
+    emit("    CASE WHEN t.quota_paid > 0 THEN 'Transferência Bancária' END,")
+    emit("    'Reconciliação da importação do extrato bancário'")
+    emit("FROM import_tracking t")
+    emit("JOIN import_members im ON im.member_key = t.member_key")
+    emit(f"JOIN financial_periods fp ON fp.building_id = {building} AND fp.year = t.year")
+    emit("ON CONFLICT (member_id, period_id, year, month) DO UPDATE SET")
+    emit("    quota_expected = EXCLUDED.quota_expected,")
+    emit("    quota_paid = EXCLUDED.quota_paid,")
+    emit("    balance = EXCLUDED.balance,")
+    emit("    is_paid = EXCLUDED.is_paid,")
+    emit("    payment_date = EXCLUDED.payment_date,")
+    emit("    payment_method = EXCLUDED.payment_method,")
+    emit("    updated_at = NOW();")
+    emit()
+
+    emit("UPDATE member_period_balance mpb")
+    emit("SET overdue_months = o.months, updated_at = NOW()")
+    emit("FROM (")
+    emit("    SELECT im.member_id, fp.id AS period_id,")
+    emit("           COUNT(*) FILTER (WHERE t.quota_paid < t.quota_expected) AS months")
+    emit("    FROM import_tracking t")
+    emit("    JOIN import_members im ON im.member_key = t.member_key")
+    emit(f"    JOIN financial_periods fp ON fp.building_id = {building} AND fp.year = t.year")
+    emit("    GROUP BY im.member_id, fp.id")
+    emit(") o")
+    emit("WHERE mpb.member_id = o.member_id AND mpb.period_id = o.period_id;")
+    emit("COMMIT;")
+    emit()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Regras partilhadas pelos importadores: conversão de datas e valores, tabelas
+de membros e categorias, edifícios e o extracto de exemplo
+
+As tabelas vivem todas aqui: process (SQL) e analyze usam MEMBER_MAP,
+CATEGORY_MAP e CATEGORY_KEYWORDS; summary usa MEMBER_MAPPING,
+EXPENSE_CATEGORIES e GENERIC_EXPENSE_PATTERNS. Mudar uma tabela invalida a
+cache de classificação de quem a usa (CLASSIFICATION_RULES de process.py e
+de summary.py).
+"""
+
+import os
+from datetime import datetime
+from decimal import ROUND_HALF_UP, Decimal
+
+# Extracto de exemplo usado quando não são indicados ficheiros
+SAMPLE_EXTRACT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'extracto_buraca.csv')
+
+
+def sample_text():
+    """Conteúdo do extracto de exemplo (lido só quando é preciso)"""
+    with open(SAMPLE_EXTRACT, encoding='utf-8') as handle:
+        return handle.read()
+
+
+def parse_date(date_str):
+    """Converte data DD/MM/YYYY para YYYY-MM-DD"""
+    try:
+        dt = datetime.strptime(date_str, '%d/%m/%Y')
+        return dt.strftime('%Y-%m-%d')
+    except:
+        return None
+
+
+def parse_amount(amount_str):
+    """Converte string de valor para Decimal"""
+    try:
+        # Remove espaços (também os não separáveis, U+00A0) e troca vírgula por ponto
+        amount = Decimal(amount_str.replace(' ', '').replace('\xa0', '').replace(',', '.'))
+        # 'NaN' e 'Infinity' são aceites por Decimal mas não são valores
+        return amount if amount.is_finite() else Decimal('0')
+    except:
+        return Decimal('0')
+
+
+def to_cents(amount):
+    """Decimal em euros -> cêntimos inteiros (arredondado ao cêntimo, metades para longe do zero)"""
+    return int(amount.quantize(Decimal('0.01'), ROUND_HALF_UP) * 100)
+
+
+# Padrões LIKE para encontrar cada membro na tabela members
+MEMBER_NAME_PATTERNS = {
+    'vitor': 'Vítor%',
+    'joao': 'João%',
+    'antonio': 'António%',
+    'cristina': 'Cristina%',
+    'aldina': 'Maria Albina%',
+    'jose': 'José%'
+}
+
+BUILDING_ID = 'fb0d83d3-fe04-47cb-ba48-f95538a2a7fc'
+
+# Conta bancária (coluna 'Cuentas') -> edifício, para o modo --jobs
+ACCOUNT_BUILDINGS = {
+    'BPI COND. BURACA': BUILDING_ID,
+}
+
+# -------------------------------------------------------------
+# process / analyze
+# -------------------------------------------------------------
+
+# Mapeo de nombres a member keys
+MEMBER_MAP = {
+    'VITOR': 'vitor',
+    'JOAO': 'joao',
+    'JOÃO': 'joao',
+    'JOSE': 'jose',
+    'JOSÉ': 'jose',
+    'ANTONIO': 'antonio',
+    'ANTÓNIO': 'antonio',
+    'CRISTINA': 'cristina',
+    'ALDINA': 'aldina',
+    'MARIA ALDINA': 'aldina',
+}
+
+# Mapeo de categorías
+CATEGORY_MAP = {
+    'luz': 'a1c5c5c5-5e5e-4e4e-8e8e-8e8e8e8e8e04',  # Electricidade
+    'limpeza': 'a1c5c5c5-5e5e-4e4e-8e8e-8e8e8e8e8e03',  # Limpeza
+    'seguros': 'a1c5c5c5-5e5e-4e4e-8e8e-8e8e8e8e8e06',  # Seguros
+    'banco': 'a1c5c5c5-5e5e-4e4e-8e8e-8e8e8e8e8e07',  # Despesas Bancárias
+    'admin': 'a1c5c5c5-5e5e-4e4e-8e8e-8e8e8e8e8e08',  # Administração
+}
+
+# Palavras-chave de cada categoria, por ordem de prioridade
+CATEGORY_KEYWORDS = [
+    ('ELETRICIDADE', 'luz'),
+    ('LIMPEZA', 'limpeza'),
+    ('VICENCIA', 'limpeza'),
+    ('SEGUROS', 'seguros'),
+    ('FIDELIDADE', 'seguros'),
+    ('ALLIANZ', 'seguros'),
+    ('MANUTENCAO', 'banco'),
+    ('IMPOSTO', 'banco'),
+    ('BANCO', 'banco'),
+    ('COPIMATICA', 'admin'),
+]
+
+QUOTA_KEYWORDS = ['Quota', 'Fraçao', 'INICIO', 'Prestamos > Socios', 'Reembolsos Anulaciones']
+
+# -------------------------------------------------------------
+# summary
+# -------------------------------------------------------------
+
+# Mapeamento de nomes no extrato para IDs de membros (vou buscar da BD)
+MEMBER_MAPPING = {
+    'VITOR MANUEL SEBASTIAN RODRIGUES': 'vitor',
+    'VITOR RODRIGUES': 'vitor',
+    'JOAO MANUEL FERNANDES LONGO': 'joao',
+    'Joao Longo': 'joao',
+    'ANTONIO MANUEL CARACA BAIAO': 'antonio',
+    'Antonio Beirao': 'antonio',
+    'CRISTINA MARIA BERTOLO GOUVEIA': 'cristina',
+    'Cristina Gouveia': 'cristina',
+    'ALEXANDRE MARTINS DA SILVA': 'cristina',  # Pagamento por outra pessoa
+    'CARLOTA LOPES BERTOLO GOUVEIA': 'cristina',  # Família
+    'MARIA ALDINA SEQUEIRA': 'aldina',
+    'Aldina Sequeira': 'aldina',
+    'DEPOSITO EM NUMERARIO ALINA': 'aldina',
+    'JOSE MANUEL COSTA RICARDO': 'jose',
+    'Jose Ricardo': 'jose',
+}
+
+# Categorias de despesas
+EXPENSE_CATEGORIES = {
+    'SU Eletricidade': 'Luz',
+    'SU ELETRICIDADE': 'Luz',
+    'COBR SEPA SU ELETRICIDADE': 'Luz',
+    'Manutenção Conta': 'Despesas Bancárias',
+    'MANUTENCAO DE CONTA': 'Despesas Bancárias',
+    'Inposto Selo Conta': 'Despesas Bancárias',
+    'IMPOSTO DE SELO': 'Despesas Bancárias',
+    'FIDELIDADE': 'Seguros',
+    'Allianz': 'Seguros',
+    'ALLIANZ': 'Seguros',
+    'Vicencia': 'Limpeza',
+    'Copimatica': 'Administração',
+    'Jose Rodrigues': 'Manutenção',
+    'Cartao': 'Despesas Bancárias'
+}
+
+# Padrões genéricos, só considerados se nenhum de EXPENSE_CATEGORIES coincidir
+GENERIC_EXPENSE_PATTERNS = [
+    ('ELETRICIDADE', 'Luz'),
+    ('EL-E', 'Luz'),
+    ('IMPOSTO', 'Despesas Bancárias'),
+    ('SELO', 'Despesas Bancárias'),
+    ('MANUTENCAO', 'Despesas Bancárias'),
+    ('COMISSAO', 'Despesas Bancárias'),
+    ('SEGURO', 'Seguros'),
+    ('FIDELIDADE', 'Seguros'),
+    ('ALLIANZ', 'Seguros'),
+    ('LIMPEZA', 'Limpeza'),
+    ('VICENCIA', 'Limpeza'),
+]
+
+# Palavras-chave de quota na Descripción e na Categoría
+QUOTA_DESCRIPTION_KEYWORDS = ['QUOTA', 'TRF CR', 'TRANSFERENCIA', 'NUMERARIO']
+QUOTA_CATEGORIA_KEYWORDS = ['Quota', 'INICIO', 'Prestamos > Socios', 'Reembolsos Anulaciones']
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Índice de trigramas para propor o membro de pagadores desconhecidos
+
+Cada nome/alias é partido em trigramas (por palavra, com margens, sobre a
+forma normalizada de members.name_key); a semelhança é o coeficiente de Dice
+entre os conjuntos de trigramas da consulta e da entrada.
+
+As listas de entradas de cada trigrama são bitmasks (int do Python, bit i =
+entrada i). Numa consulta somam-se as bitmasks dos seus trigramas em
+contadores bit-sliced (contadores[k] = bit k da contagem de cada entrada):
+cada soma são poucas operações sobre inteiros grandes, feitas em C, em vez de
+um ciclo Python por entrada. Com as entradas agrupadas pelo nº de trigramas,
+a melhor contagem de cada grupo encontra-se por bisecção sobre os
+contadores. O custo por consulta cresce com o nº de trigramas da consulta e
+muito devagar com o nº de entradas (milhares de aliases: décimos de ms).
+"""
+
+import math
+
+
+def trigrams(key):
+    """Trigramas de um texto já normalizado ('JOAO LONGO' -> {'  J', ' JO', 'JOA', ...})"""
+    grams = set()
+    for word in key.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def _add(counters, mask):
+    """Soma 1 às entradas de mask (somador com transporte, bit a bit)"""
+    carry = mask
+    for k, bits in enumerate(counters):
+        counters[k] = bits ^ carry
+        carry &= bits
+        if not carry:
+            return
+    counters.append(carry)
+
+
+def _at_least(counters, threshold, group):
+    """Bitmask das entradas de group cuja contagem é >= threshold"""
+    greater = 0
+    equal = group
+    for k in reversed(range(max(len(counters), threshold.bit_length()))):
+        bits = counters[k] if k < len(counters) else 0
+        if threshold >> k & 1:
+            equal &= bits
+        else:
+            greater |= equal & bits
+            equal &= ~bits
+        if not equal:
+            break
+    return greater | equal
+
+
+class TrigramIndex:
+    def __init__(self):
+        self._values = []
+        self._texts = []
+        self._postings = {}  # trigrama -> bitmask das entradas
+        self._sizes = {}     # nº de trigramas -> bitmask das entradas
+        self._seen = set()
+
+    def __len__(self):
+        return len(self._values)
+
+    def add(self, key, value):
+        """Entrada para o texto normalizado `key` (repetidos ficam com o 1º valor)"""
+        if not key or key in self._seen:
+            return
+        self._seen.add(key)
+        grams = trigrams(key)
+        bit = 1 << len(self._values)
+        self._values.append(value)
+        self._texts.append(key)
+        for gram in grams:
+            self._postings[gram] = self._postings.get(gram, 0) | bit
+        self._sizes[len(grams)] = self._sizes.get(len(grams), 0) | bit
+
+    def best(self, key, min_score=0.5):
+        """(semelhança, valor, texto) da entrada mais parecida, ou None abaixo de min_score"""
+        grams = trigrams(key)
+        counters = []
+        for gram in grams:
+            mask = self._postings.get(gram)
+            if mask:
+                _add(counters, mask)
+        if not counters:
+            return None
+
+        n = len(grams)
+        best = None
+        best_score = min_score
+        # Grupos pela melhor semelhança possível (todos os trigramas em comum)
+        for size in sorted(self._sizes, key=lambda m: (-2 * min(n, m) / (n + m), m)):
+            if 2 * min(n, size) / (n + size) < best_score:
+                break
+            low = max(1, math.ceil(best_score * (n + size) / 2 - 1e-9))
+            hits = _at_least(counters, low, self._sizes[size])
+            if not hits:
+                continue
+            high = min(n, size)
+            while low < high:
+                middle = (low + high + 1) // 2
+                more = _at_least(counters, middle, hits)
+                if more:
+                    low, hits = middle, more
+                else:
+                    high = middle - 1
+            score = 2 * low / (n + size)
+            if best is None or score > best_score:
+                best_score = score
+                best = (hits & -hits).bit_length() - 1
+
+        if best is None:
+            return None
+        return round(best_score, 4), self._values[best], self._texts[best]
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Snapshot colunar das transações classificadas de uma exportação
+
+Depois do parse e da classificação, as transações de uma exportação são
+gravadas ao lado dela (<exportação>.snap) em colunas binárias: data
+(AAAAMMDD), cêntimos, tipo/quota, e conta, member_key, category_id e
+descrição como índices para uma tabela de strings internadas.
+
+O snapshot guarda o SHA-256 da exportação e o digest das regras de
+classificação (ClassificationCache.digest). Nas execuções seguintes é aberto
+por mmap e as colunas são vistas sobre o ficheiro (memoryview.cast), sem
+parse do CSV nem classificação. Se o tamanho e o mtime da exportação forem os
+gravados o conteúdo não é relido; se mudarem compara-se o SHA-256; se a
+exportação ou as regras mudarem o snapshot é refeito.
+
+Formato: MAGIC, tamanho do cabeçalho (uint32), cabeçalho JSON e as colunas,
+cada uma alinhada a 8 bytes, na ordem nativa da máquina que o gravou.
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from decimal import Decimal
+
+from bpi_import.rules import to_cents
+
+# 2: cêntimos arredondados (to_cents); os snapshots anteriores são refeitos
+MAGIC = b'BPISNAP2'
+SUFFIX = '.snap'
+
+FLAG_INCOME = 1
+FLAG_FEE = 2
+
+# Colunas de texto (índices para a tabela de strings; 0 = None)
+TEXT_COLUMNS = ('account', 'member_key', 'category_id', 'description')
+
+_COLUMNS = [('date', 'i'), ('cents', 'q'), ('flags', 'B')] + [(name, 'I') for name in TEXT_COLUMNS]
+
+
+def snapshot_path(source_path):
+    return f'{source_path}{SUFFIX}'
+
+
+def file_digest(path):
+    """SHA-256 (hex) do conteúdo do ficheiro, lido por blocos"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as handle:
+        for block in iter(lambda: handle.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _pad(offset):
+    return (offset + 7) & ~7
+
+
+def write_snapshot(source_path, transactions, rules):
+    """Consome as transações classificadas (dicts do pipeline) e grava o snapshot.
+
+    rules: digest das regras de classificação. Devolve o nº de transações.
+    """
+    columns = {name: array(code) for name, code in _COLUMNS}
+    strings = [None]
+    string_ids = {None: 0}
+    text_columns = [(name, columns[name]) for name in TEXT_COLUMNS]
+    for t in transactions:
+        columns['date'].append(int(t['date'].replace('-', '')))
+        columns['cents'].append(to_cents(t['amount']))
+        columns['flags'].append((FLAG_INCOME if t['type'] == 'income' else 0) | (FLAG_FEE if t['is_fee'] else 0))
+        for name, column in text_columns:
+            text = t[name]
+            string_id = string_ids.get(text)
+            if string_id is None:
+                string_id = string_ids[text] = len(strings)
+                strings.append(text)
+            column.append(string_id)
+
+    # Tabela de strings: offsets (uint32) para um bloco UTF-8 contínuo
+    blob = bytearray()
+    offsets = array('I', [0])
+    for text in strings[1:]:
+        blob += text.encode('utf-8')
+        offsets.append(len(blob))
+    columns['string_offsets'] = offsets
+
+    info = os.stat(source_path)
+    header = {
+        'source': {'sha256': file_digest(source_path), 'size': info.st_size, 'mtime_ns': info.st_mtime_ns},
+        'rules': rules,
+        'byteorder': sys.byteorder,
+        'rows': len(columns['date']),
+        'columns': {},
+    }
+    # Offsets relativos ao fim do cabeçalho (o tamanho do cabeçalho não os afecta)
+    offset = 0
+    for name, column in columns.items():
+        header['columns'][name] = [offset, column.typecode, len(column)]
+        offset = _pad(offset + len(column) * column.itemsize)
+    header['columns']['strings'] = [offset, 'B', len(blob)]
+
+    encoded = json.dumps(header).encode('utf-8')
+    data_start = _pad(len(MAGIC) + 4 + len(encoded))
+    path = snapshot_path(source_path)
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as handle:
+        handle.write(MAGIC)
+        handle.write(struct.pack('<I', len(encoded)))
+        handle.write(encoded)
+        for name, (column_offset, _, _) in header['columns'].items():
+            handle.write(b'\0' * (data_start + column_offset - handle.tell()))
+            handle.write(blob if name == 'strings' else columns[name].tobytes())
+    os.replace(tmp_path, path)
+    return header['rows']
+
+
+class Snapshot:
+    """Snapshot aberto por mmap; column(nome) é uma vista tipada sobre o ficheiro"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise
+        self._buffer = memoryview(self._mm)
+        self._views = {}
+        self._strings = {0: None}
+        try:
+            if self._buffer[:len(MAGIC)] != MAGIC:
+                raise ValueError(f"{path}: não é um snapshot")
+            (size,) = struct.unpack_from('<I', self._mm, len(MAGIC))
+            start = len(MAGIC) + 4
+            self.header = json.loads(bytes(self._buffer[start:start + size]))
+            self._data_start = _pad(start + size)
+            if self.header['byteorder'] != sys.byteorder:
+                raise ValueError(f"{path}: gravado noutra ordem de bytes")
+        except Exception:
+            self.close()
+            raise
+
+    def close(self):
+        # As vistas derivadas primeiro: o mmap só fecha sem vistas exportadas
+        for view in reversed(list(self._views.values())):
+            view.release()
+        self._views = {}
+        self._buffer.release()
+        self._mm.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.header['rows']
+
+    def column(self, name):
+        view = self._views.get(name)
+        if view is None:
+            offset, typecode, count = self.header['columns'][name]
+            start = self._data_start + offset
+            view = self._buffer[start:start + count * array(typecode).itemsize]
+            if typecode != 'B':
+                self._views[f'{name}/raw'] = view
+                view = view.cast(typecode)
+            self._views[name] = view
+        return view
+
+    def string(self, string_id):
+        """Texto de um índice da tabela de strings (descodificado na 1ª consulta)"""
+        text = self._strings.get(string_id, False)
+        if text is False:
+            offsets = self.column('string_offsets')
+            blob = self.column('strings')
+            text = self._strings[string_id] = str(blob[offsets[string_id - 1]:offsets[string_id]], 'utf-8')
+        return text
+
+    def transactions(self):
+        """Transações como dicts do pipeline (account, date, year, type, amount, ...)"""
+        string = self.string
+        columns = [self.column(name) for name in ('date', 'cents', 'flags') + TEXT_COLUMNS]
+        for day, cents, flags, account, member_key, category_id, description in zip(*columns):
+            yield {
+                'account': string(account),
+                'date': f"{day // 10000:04d}-{day // 100 % 100:02d}-{day % 100:02d}",
+                'year': day // 10000,
+                'type': 'income' if flags & FLAG_INCOME else 'expense',
+                'amount': Decimal(cents).scaleb(-2),
+                'is_fee': bool(flags & FLAG_FEE),
+                'member_key': string(member_key),
+                'category_id': string(category_id),
+                'description': string(description),
+            }
+
+
+def open_snapshot(source_path, rules):
+    """Snapshot válido da exportação (mesmo conteúdo e mesmas regras), ou None"""
+    path = snapshot_path(source_path)
+    if not os.path.exists(path):
+        return None
+    try:
+        snapshot = Snapshot(path)
+    except (OSError, ValueError, KeyError, struct.error):
+        return None
+
+    source = snapshot.header['source']
+    info = os.stat(source_path)
+    valid = snapshot.header['rules'] == rules and source['size'] == info.st_size
+    if valid and source['mtime_ns'] != info.st_mtime_ns:
+        valid = file_digest(source_path) == source['sha256']
+    if not valid:
+        snapshot.close()
+        return None
+    return snapshot
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Armazém compacto de transações classificadas (colunas em arrays tipados)
+
+Em vez de um dict por linha (com Decimal e cópias das strings), cada coluna
+é um array tipado: data como inteiro AAAAMMDD, valor em cêntimos, tipo e
+quota em bits, e as colunas de texto como índices para uma tabela de strings
+partilhada (internadas: 'IMPOSTO DE SELO', o beneficiário, a categoria ou a
+member_key repetidos milhares de vezes ficam guardados uma só vez). Uma
+linha ocupa algumas dezenas de bytes mais as strings distintas.
+
+As vistas por tipo/ano (view) são listas de índices de linhas, mantidas à
+medida que as linhas entram; nenhuma linha é copiada. Cada elemento de uma
+vista é um Transaction (__slots__) que lê os campos do armazém quando
+pedidos, com o mesmo acesso t['campo'] dos dicts que substitui.
+"""
+
+import heapq
+from array import array
+from decimal import Decimal
+
+from bpi_import.rules import to_cents
+
+INCOME = 1
+FEE = 2
+
+# Colunas de texto (índices para a tabela de strings; 0 = None)
+TEXT_FIELDS = ('description', 'member_key', 'member_id', 'category', 'beneficiary', 'original_categoria')
+
+
+class Transaction:
+    """Linha do armazém; campos lidos à medida (t['amount'], t.get('category'), ...)"""
+
+    __slots__ = ('_store', '_row')
+
+    def __init__(self, store, row):
+        self._store = store
+        self._row = row
+
+    def __getitem__(self, name):
+        return self._store.field(self._row, name)
+
+    def get(self, name, default=None):
+        if name not in self._store.fields:
+            return default
+        return self._store.field(self._row, name)
+
+    def keys(self):
+        return self._store.fields
+
+    def as_dict(self):
+        return {name: self[name] for name in self._store.fields}
+
+    def __repr__(self):
+        return f"Transaction({self.as_dict()!r})"
+
+
+class TransactionView:
+    """Linhas seleccionadas de um armazém, por índice (sem cópias)"""
+
+    __slots__ = ('_store', '_rows')
+
+    def __init__(self, store, rows):
+        self._store = store
+        self._rows = rows
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __iter__(self):
+        store = self._store
+        for row in self._rows:
+            yield Transaction(store, row)
+
+    def __getitem__(self, position):
+        return Transaction(self._store, self._rows[position])
+
+
+class TransactionStore:
+    fields = ('date', 'year', 'type', 'amount', 'is_fee_payment') + TEXT_FIELDS
+
+    def __init__(self):
+        self._dates = array('i')    # AAAAMMDD
+        self._cents = array('q')
+        self._flags = array('B')    # INCOME | FEE
+        self._text = {name: array('I') for name in TEXT_FIELDS}
+        self._strings = [None]
+        self._string_ids = {None: 0}
+        self._views = {}            # (tipo, ano) -> array de índices de linhas
+
+    def __len__(self):
+        return len(self._dates)
+
+    def _intern(self, text):
+        string_id = self._string_ids.get(text)
+        if string_id is None:
+            string_id = self._string_ids[text] = len(self._strings)
+            self._strings.append(text)
+        return string_id
+
+    def append(self, date, type, amount, is_fee_payment=False, **text):
+        """Acrescenta uma linha (date ISO, amount Decimal positivo); devolve o índice"""
+        row = len(self._dates)
+        day = int(date[0:4]) * 10000 + int(date[5:7]) * 100 + int(date[8:10])
+        self._dates.append(day)
+        self._cents.append(to_cents(amount))
+        self._flags.append((INCOME if type == 'income' else 0) | (FEE if is_fee_payment else 0))
+        for name in TEXT_FIELDS:
+            self._text[name].append(self._intern(text.get(name)))
+
+        key = (type, day // 10000)
+        rows = self._views.get(key)
+        if rows is None:
+            rows = self._views[key] = array('I')
+        rows.append(row)
+        return row
+
+    def field(self, row, name):
+        if name == 'amount':
+            return Decimal(self._cents[row]).scaleb(-2)
+        if name == 'date':
+            day = self._dates[row]
+            return f"{day // 10000:04d}-{day // 100 % 100:02d}-{day % 100:02d}"
+        if name == 'year':
+            return self._dates[row] // 10000
+        if name == 'type':
+            return 'income' if self._flags[row] & INCOME else 'expense'
+        if name == 'is_fee_payment':
+            return bool(self._flags[row] & FEE)
+        column = self._text.get(name)
+        if column is None:
+            raise KeyError(name)
+        return self._strings[column[row]]
+
+    def years(self):
+        return sorted({year for _, year in self._views})
+
+    def view(self, type=None, year=None):
+        """Linhas de um tipo ('income'/'expense') e/ou ano, pela ordem em que entraram"""
+        keys = [k for k in self._views if (type is None or k[0] == type) and (year is None or k[1] == year)]
+        if len(keys) == 1:
+            return TransactionView(self, self._views[keys[0]])
+        if type is None and year is None:
+            return TransactionView(self, range(len(self)))
+        # Várias listas (já ordenadas): junta os índices, 4 bytes por linha
+        rows = array('I', heapq.merge(*(self._views[key] for key in keys)))
+        return TransactionView(self, rows)
@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+Script para importar extrato bancário BPI para a base de dados
+Cria transações com categorias e vincula a membros e períodos financeiros
+"""
+
+import argparse
+import os
+from decimal import Decimal
+
+from bpi_import.classify_cache import ClassificationCache
+from bpi_import.matcher import PatternMatcher
+from bpi_import.metrics import ImportMetrics
+from bpi_import.reader import iter_text_rows
+from bpi_import.rules import (
+    EXPENSE_CATEGORIES, GENERIC_EXPENSE_PATTERNS, MEMBER_MAPPING, MEMBER_NAME_PATTERNS,
+    QUOTA_CATEGORIA_KEYWORDS, QUOTA_DESCRIPTION_KEYWORDS, parse_amount, parse_date, sample_text
+)
+from bpi_import.store import Transaction, TransactionStore
+
+# Compilados uma vez; a ordem das tabelas define a prioridade
+MEMBER_MATCHER = PatternMatcher(MEMBER_MAPPING.items())
+CATEGORY_MATCHER = PatternMatcher(
+    list(EXPENSE_CATEGORIES.items()) + GENERIC_EXPENSE_PATTERNS,
+    default='Outros'
+)
+
+def identify_member(description, beneficiary):
+    """Identifica o membro baseado na descrição e beneficiário"""
+    return MEMBER_MATCHER.match(f"{description} {beneficiary}")
+
+def identify_category(description, beneficiary, transferencia):
+    """Identifica a categoria da despesa"""
+    return CATEGORY_MATCHER.match(f"{description} {beneficiary} {transferencia}")
+
+def is_quota_payment(description, categoria):
+    """Verifica se é pagamento de quota"""
+    desc_upper = description.upper()
+
+    # Se tem palavra-chave de categoria de quota, é quota
+    for keyword in QUOTA_CATEGORIA_KEYWORDS:
+        if keyword in categoria:
+            return True
+
+    # Se tem palavra-chave na descrição E é receita (valor positivo)
+    for keyword in QUOTA_DESCRIPTION_KEYWORDS:
+        if keyword in desc_upper:
+            return True
+
+    return False
+
+# Tudo o que determina a classificação: se mudar, a cache persistente é invalidada
+CLASSIFICATION_RULES = {
+    'members': MEMBER_MAPPING,
+    'categories': EXPENSE_CATEGORIES,
+    'generic': GENERIC_EXPENSE_PATTERNS,
+    'quota': QUOTA_DESCRIPTION_KEYWORDS,
+    'quota_categoria': QUOTA_CATEGORIA_KEYWORDS,
+}
+
+def open_classification_cache(path=None, directory=None):
+    patterns = (list(MEMBER_MAPPING) + list(EXPENSE_CATEGORIES) + [p for p, _ in GENERIC_EXPENSE_PATTERNS]
+                + QUOTA_DESCRIPTION_KEYWORDS + QUOTA_CATEGORIA_KEYWORDS)
+    if directory is None:
+        return ClassificationCache('import_bank_statement', CLASSIFICATION_RULES, patterns, path)
+    rules = dict(CLASSIFICATION_RULES, directory=directory.rules())
+    return ClassificationCache('import_bank_statement/members', rules, patterns + directory.patterns(), path)
+
+def member_directory(paths, building_id=None):
+    """Directório de membros (ver bpi_import/members.py) com os aliases de MEMBER_MAPPING"""
+    from bpi_import.members import load_directory
+
+    directory = load_directory(paths)
+    if building_id:
+        directory = directory.for_building(building_id)
+    directory.bind_keys(MEMBER_NAME_PATTERNS)
+    directory.add_aliases(MEMBER_MAPPING.items())
+    return directory
+
+def classify(is_income, description, beneficiary, categoria, transferencia, directory=None):
+    """(member_key, is_fee, category) de uma linha"""
+    if is_income:
+        if directory is None:
+            member_key = identify_member(description, beneficiary)
+        else:
+            member_key = directory.key_of(directory.resolve(description, beneficiary))
+        return member_key, is_quota_payment(description, categoria), None
+    return None, False, identify_category(description, beneficiary, transferencia)
+
+def generate_sql_from_csv(csv_content, metrics=None, cache=None, directory=None):
+    """Gera SQL a partir do conteúdo CSV (com metrics, regista descartes e cobertura)"""
+    # Lido em streaming, sem partir o texto numa lista de linhas
+    return generate_sql_from_rows(iter_text_rows(csv_content.lstrip()), metrics, cache, directory)
+
+def generate_sql_from_files(paths, period=None, metrics=None, cache=None, directory=None):
+    """Como generate_sql_from_csv, a partir de exportações (mmap); period = (de, até) ISO"""
+    from bpi_import.mmap_reader import iter_rows_mapped, iter_rows_period
+
+    rows = iter_rows_period(paths, *period) if period else iter_rows_mapped(paths)
+    return generate_sql_from_rows(rows, metrics, cache, directory)
+
+def generate_sql_from_rows(reader, metrics=None, cache=None, directory=None):
+    """Classifica as linhas (dict) do extracto em receitas e despesas.
+
+    Com directory (member_directory) os membros vêm do directório e cada
+    receita identificada leva também o member_id. As transações ficam num
+    TransactionStore (colunas compactas, strings internadas); devolve as vistas
+    (receitas, despesas), que se percorrem como listas de dicts.
+    """
+    if cache is None:
+        cache = open_classification_cache(directory=directory)
+
+    if metrics:
+        metrics.start()
+        reader = metrics.track('read', reader)
+
+    store = TransactionStore()
+    member_ids = directory.member_ids() if directory else {}
+
+    for row in reader:
+        date = parse_date(row['Fecha'])
+        if not date:
+            if metrics:
+                metrics.skip('invalid_date')
+            continue
+
+        amount = parse_amount(row['Importe'])
+        if amount == 0:
+            if metrics:
+                metrics.skip('zero_or_invalid_amount')
+            continue
+
+        description = row['Descripción']
+        beneficiary = row['Beneficiario']
+        transferencia = row['Transferencias']
+        categoria = row['Categoría']
+        memoria = row['Memoria']
+
+        # Determinar tipo (income ou expense)
+        is_income = amount > 0
+
+        # Membro e quota (income) ou categoria (expense), pela cache de classificação
+        fields = ('income' if is_income else 'expense', description, beneficiary, categoria, transferencia)
+        key = cache.key(*fields)
+        result = cache.get(key)
+        if result is None:
+            result = cache.put(key, classify(is_income, *fields[1:], directory))
+        member_key, is_fee, expense_category = result
+
+        # Montar descrição completa
+        full_description = description
+        if memoria and memoria.strip() and memoria != description:
+            full_description += f" - {memoria}"
+
+        row = store.append(
+            date, 'income' if is_income else 'expense', abs(amount), is_fee,
+            description=full_description,
+            member_key=member_key,
+            member_id=member_ids.get(member_key) if member_key else None,
+            category=expense_category,
+            beneficiary=beneficiary,
+            original_categoria=categoria,
+        )
+
+        if metrics:
+            metrics.observe(Transaction(store, row), category_field='category', unclassified='Outros')
+
+    if metrics:
+        metrics.finish('parse_classify', len(store))
+        metrics.cache = cache.stats()
+
+    return store.view('income'), store.view('expense')
+
+def propose_categories(expenses, model, batch_size=4096, min_confidence=None):
+    """Proposta do classificador de tokens para as despesas em 'Outros'.
+
+    O modelo (token_classifier.TokenClassifier) aprende com as restantes
+    despesas, lote a lote; as de 'Outros' são agrupadas por descrição (sem nºs
+    de operação) e previstas de uma vez no fim. Abaixo de min_confidence (por
+    omissão MIN_CONFIDENCE) a proposta fica sem categoria. Devolve
+    {descrição: proposta}.
+    """
+    from bpi_import.token_classifier import MIN_CONFIDENCE, group_key
+
+    if min_confidence is None:
+        min_confidence = MIN_CONFIDENCE
+
+    proposals = {}
+    rows = []
+    labels = []
+    for t in expenses:
+        if t['category'] != 'Outros':
+            rows.append(model.features(t['description'], t['beneficiary'], t['original_categoria']))
+            labels.append(t['category'])
+            if len(rows) >= batch_size:
+                model.learn(rows, labels)
+                rows, labels = [], []
+            continue
+        key = group_key(t['description'])
+        proposal = proposals.get(key)
+        if proposal is None:
+            proposal = proposals[key] = {
+                'category': None, 'confidence': 0.0, 'rows': 0, 'amount': Decimal('0'),
+                'features': model.features(t['description'], t['beneficiary'], t['original_categoria']),
+            }
+        proposal['rows'] += 1
+        proposal['amount'] += t['amount']
+    model.learn(rows, labels)
+
+    predicted = model.predict([p.pop('features') for p in proposals.values()])
+    if predicted:
+        for proposal, category, confidence in zip(proposals.values(), *predicted):
+            proposal.update(category=category if confidence >= min_confidence else None, confidence=confidence)
+    return proposals
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description='Resumo da importação de exportações BPI')
+    parser.add_argument('files', nargs='*', help="exportações (CSV ou CSV.gz); sem argumentos usa o extracto de exemplo")
+    parser.add_argument('--period', metavar='DE..ATÉ', help="só este período, ex.: 2024-01..2024-12 ou 2024")
+    parser.add_argument('--members', metavar='FICHEIRO', action='append',
+                        help="membros/aliases (CSV) ou backup pg_dump; substitui MEMBER_MAPPING (repetível)")
+    parser.add_argument('--building', metavar='ID', help="com --members, só os membros deste edifício")
+    parser.add_argument('--category-model', metavar='FICHEIRO',
+                        help="modelo de tokens (.npz, requer numpy): propõe categorias para as despesas em "
+                             "'Outros' e grava o que aprendeu com as restantes")
+    args = parser.parse_args(argv)
+
+    metrics = ImportMetrics()
+    try:
+        from bpi_import.mmap_reader import parse_period
+        period = parse_period(args.period) if args.period else None
+        directory = member_directory(args.members, args.building) if args.members else None
+    except ValueError as e:
+        parser.error(str(e))
+    if args.files:
+        income, expenses = generate_sql_from_files(args.files, period, metrics, directory=directory)
+    else:
+        income, expenses = generate_sql_from_csv(sample_text(), metrics, directory=directory)
+    report = metrics.to_dict()
+
+    print("Transações processadas:")
+    print(f"  Receitas (Income): {len(income)}")
+    print(f"  Despesas (Expense): {len(expenses)}")
+    print(f"  Descartadas: {sum(report['skipped'].values())}")
+    print(f"  Receitas sem membro: {report['unmatched_payers']['rows']}")
+    print(f"  Despesas em 'Outros': {report['unclassified_expenses']['rows']}")
+
+    # Estatísticas por membro
+    member_stats = {}
+    for t in income:
+        if t['member_key']:
+            if t['member_key'] not in member_stats:
+                member_stats[t['member_key']] = {'count': 0, 'total': Decimal('0')}
+            member_stats[t['member_key']]['count'] += 1
+            member_stats[t['member_key']]['total'] += t['amount']
+
+    print("\nPagamentos por membro:")
+    for member, stats in sorted(member_stats.items()):
+        name = f" ({directory.members[directory.member_ids()[member]]['name']})" if directory else ''
+        print(f"  {member}{name}: {stats['count']} pagamentos, Total: €{stats['total']:.2f}")
+
+    # Com o directório, propõe o membro mais parecido para cada pagador desconhecido
+    if directory:
+        from bpi_import.members import payer_name
+        unmatched = {}
+        for t in income:
+            if not t['member_key']:
+                payer = payer_name(t['description']) or t['beneficiary']
+                unmatched[payer] = unmatched.get(payer, 0) + 1
+        if unmatched:
+            print("\nPagadores sem membro (proposta por semelhança):")
+            for payer, count in sorted(unmatched.items(), key=lambda kv: (-kv[1], kv[0])):
+                found = directory.suggest(payer)
+                proposal = f"{directory.members[found[0]]['name']} ({found[1]:.2f})" if found else "sem proposta"
+                print(f"  {payer}: {count} linhas -> {proposal}")
+
+    # Com o modelo de tokens, propõe uma categoria para as despesas em 'Outros'
+    if args.category_model:
+        from bpi_import.token_classifier import TokenClassifier
+        if os.path.exists(args.category_model):
+            model = TokenClassifier.load(args.category_model)
+        else:
+            model = TokenClassifier()
+        proposals = propose_categories(expenses, model)
+        model.save(args.category_model)
+        if proposals:
+            print("\nDespesas em 'Outros' (proposta do classificador):")
+            for description, p in sorted(proposals.items(), key=lambda kv: (-kv[1]['rows'], kv[0])):
+                proposal = f"{p['category']} ({p['confidence']:.2f})" if p['category'] else "sem proposta"
+                print(f"  {description}: {p['rows']} linhas, €{p['amount']:.2f} -> {proposal}")
+
+
+if __name__ == '__main__':
+    main(prog='python -m bpi_import summary')
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Classificador de despesas por tokens (naive Bayes multinomial, NumPy)
+
+Para as despesas que nenhuma regra reconhece propõe a categoria mais provável,
+aprendida das despesas já classificadas (pelas regras ou no histórico).
+
+Cada linha vira uma lista de tokens (palavras da descrição e do beneficiário,
+pares de palavras seguidas e as palavras da Categoría do homebanking com o
+prefixo 'C:'), normalizados sem acentos e sem números (os nºs de operação
+mudam em todas as linhas). Os tokens são reduzidos por hashing (CRC-32) a
+`buckets` colunas, por isso o modelo tem tamanho fixo: uma matriz de
+contagens categorias x buckets. Treinar é somar contagens (np.bincount por
+lote), o que permite treinar em streaming e juntar modelos.
+
+A previsão é feita por lotes: as log-probabilidades dos tokens de todas as
+linhas são recolhidas de uma vez da matriz (categorias x nº de tokens do
+lote), somadas por linha com somas cumulativas e normalizadas (softmax). A
+confiança é a probabilidade da categoria escolhida.
+"""
+
+import re
+import zlib
+from functools import lru_cache
+from itertools import chain
+
+import numpy as np
+
+from bpi_import.matcher import normalize
+
+DEFAULT_BUCKETS = 1 << 16
+
+# Confiança mínima de uma proposta no resumo (summary); abaixo fica "sem proposta"
+MIN_CONFIDENCE = 0.9
+
+_WORD = re.compile(r'[A-Z]{2,}')
+_DIGIT_RUNS = re.compile(r'\d+')
+
+
+def group_key(text):
+    """Descrição sem os nºs de operação, para agrupar as propostas"""
+    return ' '.join(_DIGIT_RUNS.sub('0', text or '').split())
+
+
+@lru_cache(maxsize=65536)
+def _hashed(text, prefix, buckets, pairs):
+    words = _WORD.findall(normalize(text))
+    tokens = [prefix + w for w in words]
+    if pairs:
+        tokens += [f"{prefix}{a}_{b}" for a, b in zip(words, words[1:])]
+    return tuple(zlib.crc32(token.encode('utf-8')) & (buckets - 1) for token in tokens)
+
+
+def features(description, beneficiary='', categoria='', buckets=DEFAULT_BUCKETS):
+    """Colunas (buckets) dos tokens de uma linha"""
+    return (_hashed(description or '', '', buckets, True)
+            + _hashed(beneficiary or '', '', buckets, False)
+            + _hashed(categoria or '', 'C:', buckets, False))
+
+
+class TokenClassifier:
+    def __init__(self, buckets=DEFAULT_BUCKETS, alpha=0.1):
+        if buckets & (buckets - 1):
+            raise ValueError("buckets tem de ser uma potência de 2")
+        self.buckets = buckets
+        self.alpha = alpha
+        self.labels = []
+        self._label_ids = {}
+        self.counts = np.zeros((0, buckets), dtype=np.int64)   # categoria x bucket
+        self.docs = np.zeros(0, dtype=np.int64)                # linhas por categoria
+        self._log_probs = None
+
+    def __len__(self):
+        return int(self.docs.sum())
+
+    def features(self, description, beneficiary='', categoria=''):
+        return features(description, beneficiary, categoria, self.buckets)
+
+    def _label_id(self, label):
+        label_id = self._label_ids.get(label)
+        if label_id is None:
+            label_id = self._label_ids[label] = len(self.labels)
+            self.labels.append(label)
+            self.counts = np.vstack([self.counts, np.zeros((1, self.buckets), dtype=np.int64)])
+            self.docs = np.append(self.docs, 0)
+        return label_id
+
+    def learn(self, rows, labels):
+        """Soma um lote: rows = [features(...)], labels = [categoria]"""
+        if not rows:
+            return
+        label_ids = np.array([self._label_id(label) for label in labels], dtype=np.int64)
+        lengths = np.fromiter(map(len, rows), dtype=np.int64, count=len(rows))
+        columns = np.fromiter(chain.from_iterable(rows), dtype=np.int64, count=int(lengths.sum()))
+        cells = np.repeat(label_ids, lengths) * self.buckets + columns
+        self.counts += np.bincount(cells, minlength=self.counts.size).reshape(self.counts.shape)
+        self.docs += np.bincount(label_ids, minlength=len(self.labels))
+        self._log_probs = None
+
+    def _model(self):
+        if self._log_probs is None:
+            smoothed = self.counts + self.alpha
+            likelihood = np.log(smoothed) - np.log(smoothed.sum(axis=1, keepdims=True))
+            prior = np.log(self.docs + 1.0) - np.log(self.docs.sum() + len(self.labels))
+            self._log_probs = (likelihood, prior)
+        return self._log_probs
+
+    def predict(self, rows):
+        """(categorias, confianças) de um lote de features; sem modelo treinado, None"""
+        if not self.labels or not rows:
+            return None
+        likelihood, prior = self._model()
+        lengths = np.fromiter(map(len, rows), dtype=np.int64, count=len(rows))
+        columns = np.fromiter(chain.from_iterable(rows), dtype=np.int64, count=int(lengths.sum()))
+
+        # Soma por linha das log-verosimilhanças dos seus tokens (categorias x linhas)
+        gathered = np.zeros((len(self.labels), len(columns) + 1))
+        np.cumsum(likelihood[:, columns], axis=1, out=gathered[:, 1:])
+        ends = np.cumsum(lengths)
+        scores = (gathered[:, ends] - gathered[:, ends - lengths]).T + prior
+
+        scores -= scores.max(axis=1, keepdims=True)
+        probabilities = np.exp(scores)
+        probabilities /= probabilities.sum(axis=1, keepdims=True)
+        best = probabilities.argmax(axis=1)
+        confidence = probabilities[np.arange(len(rows)), best]
+        return [self.labels[i] for i in best], confidence.tolist()
+
+    # -------------------------------------------------------------
+    # Persistência
+    # -------------------------------------------------------------
+
+    def save(self, path):
+        with open(path, 'wb') as handle:
+            np.savez_compressed(handle, counts=self.counts, docs=self.docs,
+                                labels=np.array(self.labels, dtype=np.str_), buckets=self.buckets)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            model = cls(int(data['buckets']))
+            model.labels = [str(label) for label in data['labels']]
+            model._label_ids = {label: i for i, label in enumerate(model.labels)}
+            model.counts = data['counts'].astype(np.int64)
+            model.docs = data['docs'].astype(np.int64)
+        return model
@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Serviço de importação: pasta de entrada vigiada, com concorrência limitada
+
+Um ciclo asyncio vigia a pasta de entrada (inbox) e importa cada exportação
+BPI (.csv / .csv.gz) que lá é deixada, com o pipeline de
+bpi_import/process.py:
+
+  1. a exportação só é aceite com o tamanho estável entre duas passagens (já
+     acabou de ser copiada). No máximo --max-pending exportações estão em
+     curso; com esse limite atingido a vigilância espera (backpressure) e as
+     restantes ficam na inbox até haver lugar;
+  2. num processo de trabalho o cabeçalho é comparado com as colunas BPI e a
+     exportação é repartida por conta (spool_by_account); sem o cabeçalho BPI
+     ou sem linhas vai directamente para quarentena;
+  3. cada conta entra na fila do seu edifício. Cada edifício tem uma fila e
+     uma tarefa próprias e trata as contas por ordem de chegada (saldos e
+     watermark dependem da ordem); edifícios diferentes correm em paralelo,
+     com no máximo --workers classificações no pool de processos e
+     --max-apply aplicações na base de dados ao mesmo tempo. Os semáforos do
+     asyncio servem por ordem de chegada e cada edifício só pede um lugar de
+     cada vez, por isso um edifício com muitas exportações não atrasa os
+     outros;
+  4. o SQL de cada conta é aplicado pelo sink: psql (--dsn) ou, para testes,
+     uma pasta onde o SQL "aplicado" é guardado por ordem (--sink-dir);
+  5. aplicadas todas as contas, a exportação passa para processed/; se
+     alguma etapa falhar vai para quarantine/ com o erro em <nome>.error.txt.
+
+Os saldos e a execução dos orçamentos são refeitos a partir das transações
+gravadas, por isso exportações mensais sucessivas somam-se em vez de cada
+uma substituir os totais da anterior.
+
+Com --state a importação é incremental (watermark por conta, gravado depois
+de cada conta aplicada): voltar a pôr na inbox uma exportação em quarentena
+só importa as linhas que ainda não entraram.
+
+Uso:
+  python import_service.py inbox/ --dsn "$DATABASE_URL" --state watermark.json
+  python import_service.py inbox/ --sink-dir /tmp/applied --once
+"""
+
+import argparse
+import asyncio
+import os
+import re
+import shutil
+import signal
+import sys
+import tempfile
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from bpi_import.fingerprint import WatermarkStore
+from bpi_import.members import load_directory
+from bpi_import.parallel import load_account_buildings, spool_by_account
+from bpi_import.process import ShardJob, run_shard
+from bpi_import.reader import BPI_COLUMNS, dict_reader, open_extract
+from bpi_import.rules import ACCOUNT_BUILDINGS
+
+EXPORT_SUFFIXES = ('.csv', '.csv.gz')
+
+_LABEL_CHARS = re.compile(r'[^0-9A-Za-z]+')
+
+
+def log(message):
+    print(f"{datetime.now():%Y-%m-%d %H:%M:%S} {message}", file=sys.stderr, flush=True)
+
+
+class ExportError(ValueError):
+    """Ficheiro da inbox que não é uma exportação BPI importável"""
+
+
+def prepare_export(path, workdir, account_buildings):
+    """Processo de trabalho: valida e reparte a exportação por conta -> [(conta, edifício, shard)]"""
+    with open_extract(path) as handle:
+        reader = dict_reader(handle)
+        if not reader.fieldnames:
+            raise ExportError("ficheiro vazio, sem o cabeçalho de uma exportação BPI")
+        missing = [column for column in BPI_COLUMNS if column not in reader.fieldnames]
+        if missing:
+            raise ExportError(f"o cabeçalho não é o de uma exportação BPI; faltam as colunas {', '.join(missing)}")
+        shards = spool_by_account(reader, workdir, account_buildings)
+    if not shards:
+        raise ExportError("exportação sem linhas")
+    return [(account, account_buildings[account], shards[account]) for account in sorted(shards)]
+
+
+# -------------------------------------------------------------
+# Sinks
+# -------------------------------------------------------------
+
+class SinkError(RuntimeError):
+    """O sink não aplicou o SQL"""
+
+
+class PsqlSink:
+    """Aplica cada SQL com psql; com ON_ERROR_STOP um erro aborta o ficheiro"""
+
+    def __init__(self, dsn, psql='psql'):
+        self.dsn = dsn
+        self.psql = psql
+
+    async def apply(self, sql_path, label):
+        process = await asyncio.create_subprocess_exec(
+            self.psql, '-X', '-q', '-v', 'ON_ERROR_STOP=1', '-d', self.dsn, '-f', sql_path,
+            stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.PIPE,
+        )
+        _, stderr = await process.communicate()
+        if process.returncode:
+            raise SinkError(f"psql terminou com código {process.returncode}: "
+                            f"{stderr.decode('utf-8', 'replace').strip()}")
+
+
+class DirectorySink:
+    """Base de dados de teste: guarda o SQL aplicado numa pasta, numerado pela ordem.
+
+    `delay` (segundos) simula a latência da base de dados.
+    """
+
+    def __init__(self, directory, delay=0.0):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.delay = delay
+        self.applied = []
+
+    async def apply(self, sql_path, label):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        target = os.path.join(self.directory, f"{len(self.applied) + 1:05d}_{label}.sql")
+        self.applied.append(target)
+        await asyncio.to_thread(shutil.copyfile, sql_path, target)
+
+
+# -------------------------------------------------------------
+# Serviço
+# -------------------------------------------------------------
+
+class ImportService:
+    def __init__(self, inbox, sink, account_buildings, processed=None, quarantine=None, watermarks=None,
+                 directory=None, cache_path=None, batch_size=None, workers=2, max_apply=2, max_pending=8,
+                 interval=2.0):
+        self.inbox = inbox
+        self.processed = processed or os.path.join(inbox, 'processed')
+        self.quarantine = quarantine or os.path.join(inbox, 'quarantine')
+        self.sink = sink
+        self.account_buildings = account_buildings
+        self.watermarks = watermarks
+        self.directory = directory
+        self.cache_path = cache_path
+        self.batch_size = batch_size
+        self.workers = workers
+        self.max_apply = max_apply
+        self.max_pending = max_pending
+        self.interval = interval
+        self.counts = {'processed': 0, 'quarantined': 0}
+
+    # -------------------------------------------------------------
+    # Ciclo principal
+    # -------------------------------------------------------------
+
+    async def run(self, once=False):
+        """Vigia a inbox até receber SIGINT/SIGTERM (com once, só as exportações já lá)"""
+        os.makedirs(self.processed, exist_ok=True)
+        os.makedirs(self.quarantine, exist_ok=True)
+        loop = asyncio.get_running_loop()
+        self._stop = asyncio.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, self._stop.set)
+
+        self._cpu = asyncio.Semaphore(self.workers)
+        self._db = asyncio.Semaphore(self.max_apply)
+        self._slots = asyncio.Semaphore(self.max_pending)
+        self._lanes = {}      # building_id -> (fila, tarefa)
+        self._active = {}     # caminho -> tarefa da exportação
+        self._sizes = {}      # caminho -> (tamanho, mtime) da passagem anterior
+        self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        self._workdir = tempfile.mkdtemp(prefix='bpi_service_')
+        log(f"A vigiar {self.inbox} ({self.workers} processos, {self.max_apply} aplicações, "
+            f"{self.max_pending} exportações em curso)")
+        try:
+            await self._watch(once)
+            # Termina o que já foi aceite; o resto fica na inbox
+            if self._active:
+                await asyncio.gather(*self._active.values())
+        finally:
+            for _, task in self._lanes.values():
+                task.cancel()
+            await asyncio.gather(*(task for _, task in self._lanes.values()), return_exceptions=True)
+            self._pool.shutdown()
+            shutil.rmtree(self._workdir, ignore_errors=True)
+            for signum in (signal.SIGINT, signal.SIGTERM):
+                loop.remove_signal_handler(signum)
+        log(f"Fim: {self.counts['processed']} importadas, {self.counts['quarantined']} em quarentena")
+        return self.counts
+
+    async def _watch(self, once):
+        while not self._stop.is_set():
+            for path in self._ready(once):
+                # Backpressure: sem lugar livre, espera que uma exportação termine
+                await self._slots.acquire()
+                if self._stop.is_set():
+                    self._slots.release()
+                    return
+                self._active[path] = asyncio.create_task(self._import(path))
+            if once:
+                return
+            try:
+                await asyncio.wait_for(self._stop.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def _ready(self, once):
+        """Exportações da inbox ainda não aceites e que já acabaram de ser copiadas"""
+        ready = []
+        sizes = {}
+        for name in sorted(os.listdir(self.inbox)):
+            path = os.path.join(self.inbox, name)
+            if name.startswith('.') or not name.endswith(EXPORT_SUFFIXES) or not os.path.isfile(path):
+                continue
+            if path in self._active:
+                continue
+            info = os.stat(path)
+            sizes[path] = (info.st_size, info.st_mtime)
+            if once or self._sizes.get(path) == sizes[path]:
+                ready.append(path)
+        self._sizes = sizes
+        return ready
+
+    # -------------------------------------------------------------
+    # Uma exportação
+    # -------------------------------------------------------------
+
+    async def _import(self, path):
+        name = os.path.basename(path)
+        workdir = tempfile.mkdtemp(prefix='export_', dir=self._workdir)
+        loop = asyncio.get_running_loop()
+        try:
+            log(f"{name}: recebida")
+            async with self._cpu:
+                shards = await loop.run_in_executor(
+                    self._pool, prepare_export, path, workdir, self.account_buildings
+                )
+            pending = []
+            for account, building_id, shard_path in shards:
+                done = loop.create_future()
+                queue = self._lane(building_id)
+                await queue.put((name, account, building_id, shard_path, done))
+                pending.append(done)
+            # Espera por todas as contas, mesmo que uma falhe (usam o workdir)
+            results = await asyncio.gather(*pending, return_exceptions=True)
+            errors = [r for r in results if isinstance(r, BaseException)]
+            if errors:
+                raise errors[0]
+            total = sum(stats['total'] for stats in results)
+            self._move(path, self.processed)
+            self.counts['processed'] += 1
+            log(f"{name}: importada ({len(shards)} contas, {total} transações novas)")
+        except Exception as e:
+            self._quarantine(path, e)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+            del self._active[path]
+            self._slots.release()
+
+    def _lane(self, building_id):
+        """Fila do edifício, criada (com a sua tarefa) na 1ª exportação que o traz"""
+        lane = self._lanes.get(building_id)
+        if lane is None:
+            queue = asyncio.Queue()
+            lane = self._lanes[building_id] = (queue, asyncio.create_task(self._drain(queue)))
+        return lane[0]
+
+    async def _drain(self, queue):
+        """Tarefa de um edifício: classifica e aplica as contas uma de cada vez, por ordem"""
+        loop = asyncio.get_running_loop()
+        while True:
+            name, account, building_id, shard_path, done = await queue.get()
+            try:
+                sql_path = f'{shard_path[:-len(".csv")]}.sql'
+                mark = False
+                if self.watermarks:
+                    mark = self.watermarks.accounts.get(account)
+                job = ShardJob(account, building_id, shard_path, sql_path, mark=mark, cache_path=self.cache_path,
+                               batch_size=self.batch_size, directory=self.directory)
+                async with self._cpu:
+                    stats, watermark, _ = await loop.run_in_executor(self._pool, run_shard, job)
+                if stats['total']:
+                    label = _LABEL_CHARS.sub('_', f"{building_id[:8]}_{account}_{name}").strip('_')
+                    async with self._db:
+                        await self.sink.apply(sql_path, label)
+                # Só avança o watermark depois de o SQL ter sido aplicado
+                if self.watermarks:
+                    self.watermarks.absorb(watermark)
+                    self.watermarks.save()
+                done.set_result(stats)
+            except Exception as e:
+                done.set_exception(e)
+            finally:
+                queue.task_done()
+
+    def _move(self, path, directory):
+        """Move para directory sem apagar uma exportação com o mesmo nome já lá"""
+        target = os.path.join(directory, os.path.basename(path))
+        if os.path.exists(target):
+            target = os.path.join(directory, f"{datetime.now():%Y%m%d%H%M%S}_{os.path.basename(path)}")
+        shutil.move(path, target)
+        return target
+
+    def _quarantine(self, path, error):
+        target = self._move(path, self.quarantine)
+        with open(f'{target}.error.txt', 'w', encoding='utf-8') as handle:
+            handle.write(f"{type(error).__name__}: {error}\n\n")
+            handle.write(''.join(traceback.format_exception(error)))
+        self.counts['quarantined'] += 1
+        log(f"{os.path.basename(path)}: em quarentena ({error})")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Serviço que importa as exportações BPI deixadas numa pasta de entrada'
+    )
+    parser.add_argument('inbox', help="pasta vigiada (exportações .csv / .csv.gz)")
+    sinks = parser.add_mutually_exclusive_group(required=True)
+    sinks.add_argument('--dsn', help="base de dados onde o SQL é aplicado com psql")
+    sinks.add_argument(
+        '--sink-dir', metavar='DIR',
+        help="em vez da base de dados, guarda o SQL aplicado em DIR, numerado pela ordem (testes)"
+    )
+    parser.add_argument(
+        '--sink-delay', type=float, default=0.0, metavar='S',
+        help="com --sink-dir, simula S segundos de latência por aplicação"
+    )
+    parser.add_argument('--processed', metavar='DIR', help="destino das importadas (por omissão inbox/processed)")
+    parser.add_argument('--quarantine', metavar='DIR', help="destino das que falharam (por omissão inbox/quarantine)")
+    parser.add_argument(
+        '--accounts', metavar='FICHEIRO',
+        help="JSON {conta: building_id} (por omissão só a conta BURACA)"
+    )
+    parser.add_argument(
+        '--state', metavar='FICHEIRO',
+        help="watermark por conta (JSON); só são importadas as linhas ainda não importadas"
+    )
+    parser.add_argument(
+        '--members', metavar='FICHEIRO', action='append',
+        help="membros e aliases (CSV ou backup pg_dump), como em python -m bpi_import process (repetível)"
+    )
+    parser.add_argument(
+        '--classify-cache', metavar='FICHEIRO',
+        help="cache persistente (SQLite) da classificação"
+    )
+    parser.add_argument(
+        '--batch-size', type=int, metavar='N',
+        help="SQL em lotes de N linhas, cada lote numa transação"
+    )
+    parser.add_argument(
+        '--workers', type=int, default=os.cpu_count(), metavar='N',
+        help="processos para repartir e classificar (por omissão o nº de CPUs)"
+    )
+    parser.add_argument(
+        '--max-apply', type=int, default=2, metavar='N',
+        help="aplicações simultâneas na base de dados (por omissão 2)"
+    )
+    parser.add_argument(
+        '--max-pending', type=int, default=8, metavar='N',
+        help="exportações em curso; as seguintes esperam na inbox (por omissão 8)"
+    )
+    parser.add_argument(
+        '--interval', type=float, default=2.0, metavar='S',
+        help="segundos entre passagens pela inbox (por omissão 2)"
+    )
+    parser.add_argument(
+        '--once', action='store_true',
+        help="importa as exportações que já estão na inbox e termina"
+    )
+    args = parser.parse_args(argv)
+    if min(args.workers, args.max_apply, args.max_pending) < 1:
+        parser.error("--workers, --max-apply e --max-pending têm de ser positivos")
+    if args.batch_size is not None and args.batch_size < 1:
+        parser.error("--batch-size tem de ser positivo")
+    if not os.path.isdir(args.inbox):
+        parser.error(f"a pasta {args.inbox} não existe")
+
+    directory = None
+    if args.members:
+        try:
+            directory = load_directory(args.members)
+        except ValueError as e:
+            parser.error(str(e))
+    sink = PsqlSink(args.dsn) if args.dsn else DirectorySink(args.sink_dir, args.sink_delay)
+    service = ImportService(
+        args.inbox, sink,
+        load_account_buildings(args.accounts) if args.accounts else ACCOUNT_BUILDINGS,
+        processed=args.processed, quarantine=args.quarantine,
+        watermarks=WatermarkStore(args.state) if args.state else None,
+        directory=directory, cache_path=args.classify_cache, batch_size=args.batch_size,
+        workers=args.workers, max_apply=args.max_apply, max_pending=args.max_pending, interval=args.interval,
+    )
+    counts = asyncio.run(service.run(once=args.once))
+    # Com --once o código de saída indica se alguma exportação ficou em quarentena
+    return 1 if args.once and counts['quarantined'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+Fixtures partilhadas pelos testes de bpi_import
+
+Correm a partir de migrations/ (python -m pytest tests); os extractos são
+gerados por benchmarks/synthetic.py ou escritos linha a linha com write_csv.
+"""
+
+import csv
+import json
+import os
+import sys
+
+import pytest
+
+MIGRATIONS = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, MIGRATIONS)
+sys.path.insert(0, os.path.join(MIGRATIONS, 'benchmarks'))
+
+from bpi_import.reader import BPI_COLUMNS  # noqa: E402
+from bpi_import.rules import BUILDING_ID  # noqa: E402
+from synthetic import account_names, write_extract  # noqa: E402
+
+
+def bpi_row(fecha, importe, descripcion='COMPRA', beneficiario='', categoria='', cuenta='BPI COND. BURACA'):
+    """Linha da exportação BPI com os campos que importam para os testes"""
+    return {
+        'Cuentas': cuenta, 'Transferencias': '', 'Descripción': descripcion, 'Beneficiario': beneficiario,
+        'Categoría': categoria, 'Fecha': fecha, 'Hora': '12:00', 'Memoria': '', 'Importe': importe,
+        'Moneda': 'EUR', 'Número de cheque': '', 'Etiquetas': '',
+    }
+
+
+@pytest.fixture
+def write_csv(tmp_path):
+    """write_csv(linhas, nome) -> caminho do CSV com o cabeçalho BPI"""
+    def write(rows, name='extracto.csv'):
+        path = tmp_path / name
+        with open(path, 'w', encoding='utf-8', newline='') as handle:
+            writer = csv.DictWriter(handle, fieldnames=BPI_COLUMNS, quoting=csv.QUOTE_ALL)
+            writer.writeheader()
+            writer.writerows(rows)
+        return str(path)
+    return write
+
+
+@pytest.fixture
+def synthetic(tmp_path):
+    """synthetic(linhas, contas=1) -> (caminho do extracto, caminho do JSON conta -> edifício)"""
+    def make(count, accounts=1, years=5, seed=0):
+        path = write_extract(str(tmp_path / f'synthetic_{count}_{accounts}.csv'), count, accounts, years, seed)
+        buildings = {name: BUILDING_ID if i == 0 else f'00000000-0000-0000-0000-{i:012d}'
+                     for i, name in enumerate(account_names(accounts))}
+        accounts_path = tmp_path / 'accounts.json'
+        accounts_path.write_text(json.dumps(buildings), encoding='utf-8')
+        return path, str(accounts_path)
+    return make
+
+
+@pytest.fixture
+def run_process(tmp_path):
+    """run_process(*argv) -> SQL escrito por process.main"""
+    from bpi_import.process import main
+
+    def run(*argv):
+        out = tmp_path / 'out.sql'
+        main(list(argv) + ['--output', str(out)])
+        return out.read_text(encoding='utf-8')
+    return run
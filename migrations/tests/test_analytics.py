@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""Índices da análise: saldos por mês/ano e leitura por snapshot"""
+
+from decimal import Decimal
+
+from bpi_import.analytics import StatementAnalytics, to_cents
+from bpi_import.analyze import main
+from bpi_import.process import classify_transactions, parse_rows
+from bpi_import.reader import iter_rows
+from bpi_import.snapshot import open_snapshot, write_snapshot
+
+
+def test_to_cents_rounds_instead_of_truncating():
+    assert to_cents(Decimal('26.13')) == 2613
+    assert to_cents(Decimal('0.005')) == 1
+    assert to_cents(Decimal('1.2349')) == 123
+    assert to_cents(Decimal('-7.995')) == -800
+
+
+def test_yearly_balances_chain_monthly(synthetic):
+    path, _ = synthetic(1500)
+    analytics = StatementAnalytics({'BPI COND. BURACA': 12345})
+    analytics.consume(classify_transactions(parse_rows(iter_rows([path]))))
+
+    monthly = analytics.monthly_balances()
+    yearly = analytics.yearly_balances()
+    assert yearly[0][1] == 12345
+    for (year, opening, income, expense, closing), following in zip(yearly, yearly[1:] + [None]):
+        assert closing == opening + income - expense
+        assert closing == [m for m in monthly if m[0] == year][-1][4]
+        if following:
+            assert following[1] == closing
+
+
+def test_snapshot_matches_full_read(synthetic, capsys):
+    path, _ = synthetic(1500)
+    main([path])
+    expected = capsys.readouterr().out
+    for _ in range(2):
+        # 1ª vez escreve o snapshot, 2ª lê só o snapshot
+        main([path, '--snapshot'])
+        assert capsys.readouterr().out == expected
+
+
+def test_snapshot_rounds_cents(tmp_path):
+    source = tmp_path / 'extracto.csv'
+    source.write_text('', encoding='utf-8')
+    transactions = [{'date': '2025-11-13', 'amount': Decimal(amount), 'type': 'expense', 'is_fee': False,
+                     'account': 'BPI COND. BURACA', 'member_key': None, 'category_id': None,
+                     'description': 'COMPRA'} for amount in ('0.005', '7.995')]
+    write_snapshot(str(source), transactions, 'regras')
+    with open_snapshot(str(source), 'regras') as snapshot:
+        assert list(snapshot.column('cents')) == [1, 800]
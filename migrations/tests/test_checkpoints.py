@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""Checkpoints de saldo por conta e mês"""
+
+import json
+import re
+
+from bpi_import.checkpoints import BalanceCheckpoints, month_start_after
+
+ACCOUNT = 'BPI COND. BURACA'
+
+
+def closings(checkpoints):
+    return [closing for _, _, _, _, closing in checkpoints.monthly(ACCOUNT)]
+
+
+def test_month_start_after():
+    assert month_start_after('2024-03') == '2024-04-01'
+    assert month_start_after('2024-12') == '2025-01-01'
+
+
+def test_corrected_month_recomputes_following_closings():
+    checkpoints = BalanceCheckpoints()
+    checkpoints.record({(ACCOUNT, '2024-01'): [1000, 200, 2, 1], (ACCOUNT, '2024-02'): [500, 0, 1, 2],
+                        (ACCOUNT, '2024-03'): [0, 300, 1, 3]})
+    assert closings(checkpoints) == [800, 1300, 1000]
+
+    # Mesmo digest: nada muda; outro digest (correcção): refaz do mês em diante
+    assert checkpoints.record({(ACCOUNT, '2024-01'): [1000, 200, 2, 1]}) == {}
+    assert checkpoints.record({(ACCOUNT, '2024-02'): [600, 0, 1, 9]}) == {ACCOUNT: '2024-02'}
+    assert closings(checkpoints) == [800, 1400, 1100]
+
+    checkpoints.set_opening(ACCOUNT, 100)
+    assert closings(checkpoints) == [900, 1500, 1200]
+
+
+def test_incremental_record_adds_to_month():
+    checkpoints = BalanceCheckpoints()
+    checkpoints.record({(ACCOUNT, '2024-01'): [1000, 0, 1, 1]})
+    checkpoints.record({(ACCOUNT, '2024-01'): [500, 100, 2, 2]}, incremental=True)
+    assert checkpoints.monthly(ACCOUNT) == [(2024, 1, 1500, 100, 1400)]
+    assert checkpoints.accounts[ACCOUNT]['months']['2024-01']['rows'] == 3
+
+
+def test_period_import_keeps_only_whole_months(synthetic, run_process, tmp_path):
+    path, _ = synthetic(2000)
+    state = tmp_path / 'checkpoints.json'
+    run_process(path, '--checkpoints', str(state))
+    full = json.loads(state.read_text(encoding='utf-8'))[ACCOUNT]['months']
+
+    run_process(path, '--period', '2023-03-10..2023-05', '--checkpoints', str(state))
+    months = json.loads(state.read_text(encoding='utf-8'))[ACCOUNT]['months']
+    # Março foi lido só a partir do dia 10: fica o checkpoint completo
+    assert months == full
+
+    partial = tmp_path / 'partial.json'
+    run_process(path, '--period', '2023-03-10..2023-05', '--checkpoints', str(partial))
+    assert sorted(json.loads(partial.read_text(encoding='utf-8'))[ACCOUNT]['months']) == ['2023-04', '2023-05']
+
+
+def test_process_resumes_from_last_checkpoint(synthetic, run_process, tmp_path):
+    path, _ = synthetic(2000)
+    state = tmp_path / 'checkpoints.json'
+    full_sql = run_process(path, '--checkpoints', str(state))
+    full = json.loads(state.read_text(encoding='utf-8'))
+    resume = f"{max(full[ACCOUNT]['months'])}-01"
+
+    # 2ª importação: só o último mês com checkpoint é relido; o resto já foi importado
+    sql = run_process(path, '--checkpoints', str(state))
+    assert f'-- Lidas só as linhas desde {resume} (último mês com checkpoint)' in sql
+    dates = re.findall(r"'(\d{4}-\d{2}-\d{2})', '(?:income|expense)'", sql)
+    assert dates and min(dates) >= resume
+    assert len(dates) < len(re.findall(r"'(\d{4}-\d{2}-\d{2})', '(?:income|expense)'", full_sql))
+    assert json.loads(state.read_text(encoding='utf-8')) == full
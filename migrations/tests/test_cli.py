@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""Linha de comandos: combinações de opções recusadas e código de saída"""
+
+import subprocess
+import sys
+
+import pytest
+
+from bpi_import.process import INCOMPATIBLE_OPTIONS, REQUIRED_OPTIONS, main
+from conftest import MIGRATIONS
+
+# Um valor aceite pelo argparse para cada opção das tabelas
+VALUES = {
+    '--batch-size': ['10'], '--copy-dir': ['dir'], '--reconcile': [], '--state': ['state.json'],
+    '--skip-in-backup': ['backup.sql'], '--period': ['2025'], '--category-model': ['model.json'],
+    '--jobs': ['0'], '--accept-similar': ['0.9'], '--learn-aliases': ['aliases.csv'],
+    '--members': ['members.csv'], '--quotas': ['quotas.json'], '--accept-predicted': ['0.9'],
+}
+
+
+def argv_for(*options):
+    return [value for option in options for value in [option] + VALUES[option]]
+
+
+@pytest.mark.parametrize('option, other, reason', INCOMPATIBLE_OPTIONS)
+def test_incompatible_options(option, other, reason, capsys):
+    with pytest.raises(SystemExit) as exc:
+        main(argv_for(option, other))
+    assert exc.value.code == 2
+    assert f"{option} não se combina com {other}: {reason}" in capsys.readouterr().err
+
+
+@pytest.mark.parametrize('option, required, reason', REQUIRED_OPTIONS)
+def test_required_options(option, required, reason, capsys):
+    with pytest.raises(SystemExit) as exc:
+        main(argv_for(option))
+    assert exc.value.code == 2
+    assert f"{option} precisa de {required}: {reason}" in capsys.readouterr().err
+
+
+def test_module_exit_code():
+    def run(*argv):
+        return subprocess.run([sys.executable, '-m', 'bpi_import', *argv], cwd=MIGRATIONS,
+                              capture_output=True, text=True)
+
+    assert run('process', '--quotas', 'quotas.json').returncode == 2
+    assert run('nada').returncode == 2
+    done = run('summary')
+    assert done.returncode == 0 and done.stdout
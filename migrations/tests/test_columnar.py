@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""Parse colunar (NumPy) vs. parse linha a linha"""
+
+from decimal import Decimal
+
+import pytest
+
+from bpi_import.process import parse_rows, parse_rows_columnar
+from bpi_import.rules import parse_amount, parse_date
+
+np = pytest.importorskip('numpy')
+columnar = pytest.importorskip('bpi_import.columnar')
+
+AMOUNTS = [
+    '1629,24', '-0,32', '26.13', '+5', '5', '5,', ',5', '.05', '0,00', '-0', '007,10',
+    ' 26,13', '26,13 ', '- 26,13', '1 629,24', '26,13\xa0', '\xa026,13', '1\xa0629,24', '-\xa00,32',
+    '1.629,24', '1,629.24', '26,130', '26,1,3', '26-', '--5', '+-5', ',-5', '-', ',', '', ' ', '\xa0',
+    '1e3', 'NaN', 'Infinity', '26,13€', 'EUR 5', '١٢', '12345678901234,56', '1234567890123456',
+]
+DATES = ['13/11/2025', '29/02/2024', '29/02/2025', '31/04/2025', '1/2/2025', '2025-01-01', '00/01/2025', '']
+
+
+def test_amounts_accepted_by_both_agree():
+    cents, ok = columnar.parse_amounts(AMOUNTS)
+    for value, c, valid in zip(AMOUNTS, cents.tolist(), ok.tolist()):
+        if valid:
+            assert Decimal(c).scaleb(-2) == parse_amount(value), value
+
+
+def test_dates_accepted_by_both_agree():
+    days, ok = columnar.parse_dates(DATES)
+    year, month, day = columnar.split_days(days)
+    for i, value in enumerate(DATES):
+        if ok[i]:
+            assert f"{year[i]:04d}-{month[i]:02d}-{day[i]:02d}" == parse_date(value), value
+
+
+def test_row_parsers_agree_on_malformed_input(write_csv):
+    from bpi_import.reader import iter_rows
+    from conftest import bpi_row
+
+    rows = [bpi_row('13/11/2025', amount) for amount in AMOUNTS]
+    rows += [bpi_row(fecha, '10,00') for fecha in DATES]
+    path = write_csv(rows)
+    expected = list(parse_rows(iter_rows([path])))
+    assert len(expected) > 20
+    assert list(parse_rows_columnar(iter_rows([path]), batch_size=7)) == expected
+
+
+def test_synthetic_extract(synthetic):
+    from bpi_import.reader import iter_rows
+
+    path, _ = synthetic(2000)
+    assert list(parse_rows_columnar(iter_rows([path]), batch_size=300)) == list(parse_rows(iter_rows([path])))
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""Serviço de importação: exportações válidas e as que vão para quarentena"""
+
+import asyncio
+import os
+import re
+import shutil
+from decimal import Decimal
+
+from bpi_import.rules import ACCOUNT_BUILDINGS
+from conftest import bpi_row
+from import_service import DirectorySink, ImportService
+
+
+def run_once(inbox, tmp_path, applied='applied'):
+    sink = DirectorySink(str(tmp_path / applied))
+    service = ImportService(str(inbox), sink, ACCOUNT_BUILDINGS, workers=1, max_apply=1)
+    counts = asyncio.run(service.run(once=True))
+    return counts, sink
+
+
+def paid_totals(sql_paths):
+    """Soma das linhas de import_member_periods de todo o SQL aplicado"""
+    totals = {}
+    for sql_path in sql_paths:
+        with open(sql_path, encoding='utf-8') as handle:
+            for member, year, paid, count in re.findall(r"^    \('(\w+)', (\d+), ([\d.]+), (\d+),", handle.read(), re.M):
+                total = totals.setdefault((member, int(year)), [Decimal('0'), 0])
+                total[0] += Decimal(paid)
+                total[1] += int(count)
+    return totals
+
+
+def error_of(inbox, name):
+    with open(os.path.join(inbox, 'quarantine', f'{name}.error.txt'), encoding='utf-8') as handle:
+        return handle.readline().strip()
+
+
+def test_valid_export_is_applied(write_csv, tmp_path):
+    inbox = tmp_path / 'inbox'
+    inbox.mkdir()
+    path = write_csv([bpi_row('13/11/2025', '26,13', 'TRF CR INTRAB 492 DE VITOR MANUEL SEBASTIAN RODRIGUES'),
+                      bpi_row('07/11/2025', '-0,32', 'IMPOSTO DE SELO OUT 2025')])
+    shutil.move(path, inbox / 'extracto.csv')
+
+    counts, sink = run_once(inbox, tmp_path)
+    assert counts == {'processed': 1, 'quarantined': 0}
+    assert len(sink.applied) == 1
+    assert os.listdir(inbox / 'processed') == ['extracto.csv']
+
+
+def test_bad_header_and_empty_exports_are_quarantined(write_csv, tmp_path):
+    inbox = tmp_path / 'inbox'
+    inbox.mkdir()
+    shutil.move(write_csv([]), inbox / 'sem_linhas.csv')
+    (inbox / 'outro_banco.csv').write_text('Date,Amount,Description\n2025-11-13,26.13,TRF\n', encoding='utf-8')
+    (inbox / 'vazio.csv').write_text('', encoding='utf-8')
+
+    counts, sink = run_once(inbox, tmp_path)
+    assert counts == {'processed': 0, 'quarantined': 3}
+    assert sink.applied == []
+    assert os.listdir(inbox / 'processed') == []
+    assert error_of(inbox, 'sem_linhas.csv') == 'ExportError: exportação sem linhas'
+    assert error_of(inbox, 'outro_banco.csv').startswith(
+        'ExportError: o cabeçalho não é o de uma exportação BPI; faltam as colunas Cuentas, ')
+    assert error_of(inbox, 'vazio.csv') == 'ExportError: ficheiro vazio, sem o cabeçalho de uma exportação BPI'
+
+
+def test_monthly_drops_add_up(write_csv, tmp_path):
+    payer = 'TRF CR INTRAB 492 DE VITOR MANUEL SEBASTIAN RODRIGUES'
+    october = [bpi_row('13/10/2025', '26,13', payer, categoria='Quota'), bpi_row('07/10/2025', '-0,32', 'IMPOSTO DE SELO SET 2025')]
+    november = [bpi_row('13/11/2025', '26,13', payer, categoria='Quota'), bpi_row('07/11/2025', '-0,32', 'IMPOSTO DE SELO OUT 2025')]
+    inbox = tmp_path / 'inbox'
+    inbox.mkdir()
+
+    # Uma exportação por mês, processadas uma depois da outra
+    applied = []
+    for month, rows in (('outubro', october), ('novembro', november)):
+        shutil.move(write_csv(rows), inbox / f'{month}.csv')
+        counts, sink = run_once(inbox, tmp_path)
+        assert counts == {'processed': 1, 'quarantined': 0}
+        applied += sink.applied
+    assert len(applied) == 2
+    for sql_path in applied:
+        with open(sql_path, encoding='utf-8') as handle:
+            sql = handle.read()
+        # O saldo é o SUM das transações gravadas, não o total desta exportação
+        assert 'FROM transactions t' in sql
+        assert 'a.quota_paid' not in sql
+
+    combined = tmp_path / 'combined'
+    combined.mkdir()
+    shutil.move(write_csv(october + november), combined / 'extracto.csv')
+    _, sink = run_once(combined, tmp_path, 'applied_combined')
+    assert paid_totals(applied) == paid_totals(sink.applied) == {('vitor', 2025): [Decimal('52.26'), 2]}
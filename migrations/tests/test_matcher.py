@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""PatternMatcher (trie-regex) vs. o antigo ciclo `for pattern in TABELA`"""
+
+import random
+
+import pytest
+
+from bpi_import.matcher import PatternMatcher, normalize
+from bpi_import.process import identify_category, identify_member
+from bpi_import.reader import iter_rows
+from bpi_import.rules import CATEGORY_KEYWORDS, CATEGORY_MAP, MEMBER_MAP
+
+
+def naive(rules, text, default=None):
+    text = normalize(text)
+    for pattern, value in rules:
+        if normalize(pattern) and normalize(pattern) in text:
+            return value
+    return default
+
+
+def test_table_order_wins_over_text_order():
+    rules = [('ELETRICIDADE', 'luz'), ('SU', 'su'), ('SU ELETRICIDADE S', 'longo')]
+    matcher = PatternMatcher(rules, default='outro')
+    assert matcher.match('DD SU ELETRICIDADE S.A.') == 'luz'
+    assert matcher.match('Manutenção') == 'outro'
+    assert matcher.match('ação su') == 'su'
+    assert PatternMatcher([]).match('qualquer') is None
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_random_tables_match_naive_loop(seed):
+    rng = random.Random(seed)
+    alphabet = 'ABCÃÉ '
+    rules = [(''.join(rng.choice(alphabet) for _ in range(rng.randint(1, 4))), n) for n in range(rng.randint(1, 30))]
+    matcher = PatternMatcher(rules, default=-1)
+    for _ in range(200):
+        text = ''.join(rng.choice(alphabet + 'xyz') for _ in range(rng.randint(0, 25)))
+        assert matcher.match(text) == naive(rules, text, -1), (rules, text)
+
+
+def test_repo_tables_match_naive_loop(synthetic):
+    path, _ = synthetic(2000)
+    categories = [(keyword, CATEGORY_MAP[key]) for keyword, key in CATEGORY_KEYWORDS]
+    for row in iter_rows([path]):
+        text = f"{row['Descripción']} {row['Beneficiario']} {row['Categoría']}"
+        assert identify_member(text) == naive(MEMBER_MAP.items(), text)
+        assert identify_category(text) == naive(categories, text)
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+"""Modo --jobs: saída determinística e ShardJob"""
+
+import json
+import re
+
+from bpi_import.process import ShardJob, process_stream, run_shard
+from bpi_import.reader import iter_rows
+from bpi_import.rules import BUILDING_ID
+
+
+def test_jobs_output_does_not_depend_on_process_count(synthetic, run_process):
+    path, accounts = synthetic(3000, accounts=3)
+    outputs = {jobs: run_process(path, '--jobs', str(jobs), '--accounts', accounts) for jobs in (1, 2, 3)}
+    assert outputs[1] == outputs[2] == outputs[3]
+    assert outputs[1].count('-- >>> Conta') == 3
+
+
+def test_lookups_are_scoped_to_the_shard_building(synthetic, run_process):
+    path, accounts = synthetic(1000, accounts=2)
+    with open(accounts, encoding='utf-8') as handle:
+        buildings = json.load(handle)
+    sql = run_process(path, '--jobs', '2', '--accounts', accounts)
+    shards = re.split(r'^-- >>> Conta .* -> edifício ', sql, flags=re.M)[1:]
+    assert sorted(shard.split('\n', 1)[0] for shard in shards) == sorted(buildings.values())
+    for shard in shards:
+        building_id = shard.split('\n', 1)[0]
+        assert f"v_building_id UUID := '{building_id}';" in shard
+        lines = shard.splitlines()
+        lookups = [i for i, line in enumerate(lines)
+                   if re.match(r' +SELECT id INTO v_\w+ FROM (members|financial_periods)$', line)]
+        assert lookups
+        for i in lookups:
+            assert lines[i + 1].lstrip().startswith('WHERE building_id = v_building_id AND ')
+
+
+def test_shard_job_defaults_leave_options_off(synthetic, tmp_path):
+    path, _ = synthetic(500)
+    sql_path = tmp_path / 'shard.sql'
+    job = ShardJob('BPI COND. BURACA', BUILDING_ID, path, str(sql_path))
+    assert job.mark is False and job.copy_dir is None and not job.budgets
+
+    stats, pending, metrics = run_shard(job)
+    assert pending == {} and metrics is None
+
+    direct = tmp_path / 'direct.sql'
+    with open(direct, 'w', encoding='utf-8') as out:
+        expected = process_stream(iter_rows([path]), BUILDING_ID, out)
+    assert sql_path.read_text(encoding='utf-8') == direct.read_text(encoding='utf-8')
+    assert stats['total'] == expected['total'] == 500
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""SQL dos saldos e orçamentos: refeitos sempre a partir das transações gravadas"""
+
+import io
+from datetime import date
+from decimal import Decimal
+
+from bpi_import.balances import write_balance_upsert
+from bpi_import.budgets import write_budget_rollup
+from bpi_import.rules import BUILDING_ID
+
+AGGREGATES = {('vitor', 2025): {'paid': Decimal('52.26'), 'count': 2,
+                                'first': date(2025, 1, 10), 'last': date(2025, 2, 10)}}
+BUDGETS = {(2025, 'a1c5c5c5-5e5e-4e4e-8e8e-8e8e8e8e8e04'): {'spent': Decimal('13.41'), 'count': 2}}
+
+
+def test_balances_recomputed_from_transactions():
+    out = io.StringIO()
+    write_balance_upsert(out, BUILDING_ID, AGGREGATES)
+    sql = out.getvalue()
+    # Como o trigger: todos os pagamentos gravados, não só os do extracto
+    assert 'FROM transactions t' in sql
+    assert 't.is_fee_payment = true' in sql
+    assert '    s.quota_paid, s.num_payments, q.monthly * 12 - s.quota_paid,' in sql
+    assert 'a.quota_paid' not in sql
+    # Repetir a carga não pode somar duas vezes ao valor gravado
+    assert 'member_period_balance.quota_paid_total +' not in sql
+    assert 'quota_paid_total = EXCLUDED.quota_paid_total,' in sql
+
+
+def test_budgets_recomputed_from_transactions():
+    out = io.StringIO()
+    write_budget_rollup(out, BUILDING_ID, BUDGETS)
+    sql = out.getvalue()
+    # Como update_budget_item_spent: todas as despesas gravadas, não só as do extracto
+    assert "t.transaction_type = 'expense'" in sql
+    assert 'amount_spent = s.spent' in sql
+    assert 'a.spent' not in sql.split('-- Orçamento vs. executado')[0]
+    assert 'bi.amount_spent +' not in sql
+
+
+def test_every_import_emits_recompute(synthetic, run_process, tmp_path):
+    path, _ = synthetic(300)
+    full = run_process(path)
+    incremental = run_process(path, '--state', str(tmp_path / 'state.json'))
+    for sql in (full, incremental):
+        assert 'FROM transactions t' in sql
+        assert 'a.quota_paid' not in sql
+
+
+def test_batched_load_toggles_triggers_once(synthetic, run_process):
+    path, _ = synthetic(300)
+    sql = run_process(path, '--batch-size', '50', '--budgets')
+    lines = sql.splitlines()
+    disable = [i for i, line in enumerate(lines) if 'DISABLE TRIGGER' in line]
+    enable = [i for i, line in enumerate(lines) if 'ENABLE TRIGGER' in line and 'DISABLE' not in line]
+    assert len(disable) == 2 and len(enable) == 2
+    first_batch = lines.index('-- Lote 1: 50 transações')
+    balances = lines.index('-- SALDOS DOS MEMBROS (agregados no importador)')
+    assert max(disable) < first_batch
+    assert min(enable) > balances
+    assert lines[max(enable) + 1] == 'COMMIT;'
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""--period: leitura por mmap e índice de datas, importação parcial"""
+
+import gzip
+import shutil
+
+import pytest
+
+from bpi_import.mmap_reader import MappedExtract, filter_period, iter_rows_period, parse_period
+from bpi_import.reader import iter_rows
+
+
+def test_parse_period():
+    assert parse_period('2024') == ('2024-01-01', '2024-12-31')
+    assert parse_period('2024-02') == ('2024-02-01', '2024-02-29')
+    assert parse_period('2023-11..2024-03') == ('2023-11-01', '2024-03-31')
+    with pytest.raises(ValueError):
+        parse_period('24-01')
+
+
+@pytest.mark.parametrize('spec', ['2022', '2023-06', '2021-02-10..2021-03-05', '1999', '2023-12..2024-01'])
+def test_range_matches_linear_filter(synthetic, spec):
+    path, _ = synthetic(3000)
+    date_from, date_to = parse_period(spec)
+    expected = list(filter_period(iter_rows([path]), date_from, date_to))
+    # Stride pequeno: o índice tem muitos pontos e a bisecção é exercitada
+    with MappedExtract(path, stride=512) as extract:
+        assert extract.order == 'desc'
+        assert len(extract.index) > 100
+        assert list(extract.iter_range(date_from, date_to)) == expected
+
+
+def test_gzip_falls_back_to_linear_filter(synthetic, tmp_path):
+    path, _ = synthetic(500)
+    gz = str(tmp_path / 'extracto.csv.gz')
+    with open(path, 'rb') as src, gzip.open(gz, 'wb') as dst:
+        shutil.copyfileobj(src, dst)
+    date_from, date_to = parse_period('2023')
+    assert list(iter_rows_period([gz], date_from, date_to)) == list(iter_rows_period([path], date_from, date_to))
+
+
+def test_period_import_recomputes_balances(synthetic, run_process):
+    path, _ = synthetic(500)
+    sql = run_process(path, '--period', '2023-03', '--budgets')
+    # Um mês não é o ano: o total pago e o gasto vêm das transações gravadas
+    assert 'FROM transactions t' in sql
+    assert 'amount_spent = s.spent' in sql
+    assert '    a.quota_paid, a.num_payments' not in sql
+
+
+def test_period_import_recomputes_balances_in_shards(synthetic, run_process):
+    path, accounts = synthetic(500, accounts=2)
+    sql = run_process(path, '--period', '2023', '--jobs', '2', '--accounts', accounts)
+    assert sql.count('FROM transactions t') == 2
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""Leitura em streaming de backups pg_dump"""
+
+import gzip
+from decimal import Decimal
+
+import pytest
+
+from bpi_import.pgdump import dump_fingerprints, dump_year_totals, iter_dump, iter_table, unescape_copy
+
+BUILDING = 'fb0d83d3-fe04-47cb-ba48-f95538a2a7fc'
+OTHER = '00000000-0000-0000-0000-000000000001'
+
+DUMP = f"""--
+-- PostgreSQL database dump
+--
+
+CREATE TABLE public.members (
+    id uuid NOT NULL,
+    "name" character varying(255) NOT NULL,
+    permilage numeric(10,4),
+    votes integer,
+    is_active boolean DEFAULT true,
+    aliases text[],
+    CONSTRAINT members_pkey PRIMARY KEY (id)
+);
+
+CREATE TABLE public.transactions (
+    id uuid NOT NULL,
+    building_id uuid,
+    transaction_date date,
+    transaction_type character varying(20),
+    amount numeric(10,2),
+    year integer,
+    import_fingerprint character varying(64),
+    deleted_at timestamp with time zone
+);
+
+COPY public.members (id, "name", permilage, votes, is_active, aliases) FROM stdin;
+m1\tJosé Ricardo\t166.7000\t1\tt\t{{"JOSE M RICARDO",JOSE}}
+m2\tTab\\there\\\\slash\t\\N\t\\N\tf\t{{}}
+m3\tArray\t200\t2\tt\t{{NULL,"NULL","a,b"}}
+\\.
+
+COPY public.transactions (id, building_id, transaction_date, transaction_type, amount, year, import_fingerprint, deleted_at) FROM stdin;
+t1\t{BUILDING}\t2024-03-01\tincome\t26.13\t2024\tfp1\t\\N
+t2\t{BUILDING}\t2024-03-05\texpense\t-7.99\t2024\tfp2\t\\N
+t3\t{BUILDING}\t2025-01-02\texpense\t0.32\t2025\tfp3\t2025-02-01 10:00:00+00
+t4\t{OTHER}\t2025-01-02\tincome\t100.00\t2025\tfp4\t\\N
+t5\t{BUILDING}\t2025-01-03\tincome\t43.54\t2025\t\\N\t\\N
+\\.
+
+COPY public.financial_periods (id) FROM stdin;
+p1
+\\.
+"""
+
+
+@pytest.fixture(params=['.sql', '.sql.gz'])
+def dump_path(request, tmp_path):
+    path = tmp_path / f'backup{request.param}'
+    opener = gzip.open if request.param.endswith('.gz') else open
+    with opener(path, 'wt', encoding='utf-8') as handle:
+        handle.write(DUMP)
+    return str(path)
+
+
+def test_unescape_copy():
+    assert unescape_copy('\\N') is None
+    assert unescape_copy('a\\tb\\nc\\\\d') == 'a\tb\nc\\d'
+    assert unescape_copy('plain') == 'plain'
+
+
+def test_columns_are_typed_from_create_table(dump_path):
+    members = list(iter_table(dump_path, 'members'))
+    assert members[0] == {'id': 'm1', 'name': 'José Ricardo', 'permilage': Decimal('166.7000'), 'votes': 1,
+                          'is_active': True, 'aliases': ['JOSE M RICARDO', 'JOSE']}
+    assert members[1] == {'id': 'm2', 'name': 'Tab\there\\slash', 'permilage': None, 'votes': None,
+                          'is_active': False, 'aliases': []}
+    assert members[2]['aliases'] == [None, 'NULL', 'a,b']
+
+
+def test_only_requested_tables(dump_path):
+    tables = [table for table, _ in iter_dump(dump_path, ('transactions',))]
+    assert tables == ['transactions'] * 5
+    assert [t for t, _ in iter_dump(dump_path, ('financial_periods',))] == ['financial_periods']
+
+
+def test_fingerprints_skip_deleted_and_other_buildings(dump_path):
+    assert dump_fingerprints(dump_path) == {'fp1', 'fp2', 'fp4'}
+    assert dump_fingerprints(dump_path, {BUILDING}) == {'fp1', 'fp2'}
+
+
+def test_year_totals(dump_path):
+    assert dump_year_totals(dump_path, {BUILDING}) == {
+        2024: {'income': Decimal('26.13'), 'expense': Decimal('7.99')},
+        2025: {'income': Decimal('43.54'), 'expense': Decimal('0')},
+    }
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""--reconcile: opções aceites e quota esperada pela permilagem de cada membro"""
+
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from bpi_import.reconcile import DEFAULT_MONTHLY_QUOTAS, reconcile
+from bpi_import.rules import BUILDING_ID
+
+MEMBERS = [
+    ('00000000-0000-0000-0001-000000000001', 'Vítor Rodrigues', '150'),
+    ('00000000-0000-0000-0001-000000000002', 'João Longo', '200'),
+    ('00000000-0000-0000-0001-000000000003', 'José Ricardo', '150'),
+]
+
+
+@pytest.fixture
+def members_csv(tmp_path):
+    def write(members=MEMBERS):
+        path = tmp_path / 'members.csv'
+        lines = ['id,name,building_id,fraction,permilage,aliases']
+        lines += [f'{member_id},{name},{BUILDING_ID},,{permilage},' for member_id, name, permilage in members]
+        path.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+        return str(path)
+    return write
+
+
+@pytest.mark.parametrize('extra', [['--period', '2025'], ['--state', 'state.json'], []])
+def test_rejected_without_full_history_or_members(run_process, extra, capsys):
+    with pytest.raises(SystemExit):
+        run_process('--reconcile', *extra)
+    assert '--reconcile' in capsys.readouterr().err
+
+
+def test_rejected_when_member_has_no_permilage(run_process, members_csv, capsys):
+    path = members_csv(MEMBERS[:2] + [(MEMBERS[2][0], MEMBERS[2][1], '')])
+    with pytest.raises(SystemExit):
+        run_process('--reconcile', '--members', path)
+    assert 'José Ricardo' in capsys.readouterr().err
+
+
+def test_expected_quota_follows_permilage(run_process, members_csv):
+    sql = run_process('--reconcile', '--members', members_csv())
+    q150, q200 = DEFAULT_MONTHLY_QUOTAS[2025]
+    assert '-- RECONCILIAÇÃO DE QUOTAS (member_monthly_tracking)' in sql
+    rows = [line for line in sql.splitlines() if line.startswith("    ('joao', 2025, 1,")]
+    assert rows and rows[0].startswith(f"    ('joao', 2025, 1, {q200},")
+    rows = [line for line in sql.splitlines() if line.startswith("    ('vitor', 2025, 1,")]
+    assert rows and rows[0].startswith(f"    ('vitor', 2025, 1, {q150},")
+
+
+def test_fifo_allocation_by_permilage():
+    quotas = {2025: (Decimal('30.00'), Decimal('40.00'))}
+    payments = [('a', date(2025, 1, 5), Decimal('60.00')), ('b', date(2025, 1, 5), Decimal('60.00'))]
+    rows, summary = reconcile(payments, {'a': Decimal('150'), 'b': Decimal('200')}, quotas, (2025, 1), (2025, 3))
+    assert summary['a']['months_unpaid'] == 1 and summary['a']['arrears'] == Decimal('30.00')
+    assert summary['b']['months_unpaid'] == 2 and summary['b']['arrears'] == Decimal('60.00')
+    assert [r['paid'] for r in rows if r['member_key'] == 'b'] == [Decimal('40.00'), Decimal('20.00'), 0]
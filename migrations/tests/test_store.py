@@ -0,0 +1,14 @@
+# -*- coding: utf-8 -*-
+"""Armazém de transações: valores em cêntimos"""
+
+from decimal import Decimal
+
+from bpi_import.store import TransactionStore
+
+
+def test_amounts_are_rounded_to_the_cent():
+    store = TransactionStore()
+    for amount in ('26.13', '0.005', '10.0049', '7.995'):
+        store.append('2025-11-13', 'expense', Decimal(amount), description='COMPRA')
+    assert [t['amount'] for t in store.view('expense', 2025)] == [
+        Decimal('26.13'), Decimal('0.01'), Decimal('10.00'), Decimal('8.00')]
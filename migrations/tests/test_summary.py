@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+"""Resumo: propostas do classificador de tokens para as despesas em 'Outros'"""
+
+from decimal import Decimal
+
+import pytest
+
+from bpi_import.summary import propose_categories
+
+token_classifier = pytest.importorskip('bpi_import.token_classifier')
+
+
+def expense(description, category, beneficiary=''):
+    return {'description': description, 'beneficiary': beneficiary, 'original_categoria': '',
+            'category': category, 'amount': Decimal('10.00')}
+
+
+EXPENSES = (
+    [expense(f'DD SU ELETRICIDADE, S.A. {n}', 'LUZ', 'SU Eletricidade') for n in range(40)]
+    + [expense(f'COBR SEPA FIDELIDADE SEGUROS {n}', 'SEGUROS', 'FIDELIDADE') for n in range(40)]
+    + [expense('DD SU ELETRICIDADE, S.A. 999', 'Outros', 'SU Eletricidade'),
+       expense('DD SU ELETRICIDADE, S.A. 998', 'Outros', 'SU Eletricidade'),
+       expense('COMPRA LOJA DESCONHECIDA', 'Outros')]
+)
+
+
+def test_proposals_grouped_and_thresholded():
+    everything = propose_categories(EXPENSES, token_classifier.TokenClassifier(), min_confidence=0.0)
+    assert len(everything) == 2
+    light = everything[token_classifier.group_key('DD SU ELETRICIDADE, S.A. 999')]
+    assert light['rows'] == 2 and light['amount'] == Decimal('20.00')
+    assert light['category'] == 'LUZ'
+    assert all(p['category'] for p in everything.values())
+
+    # Acima de qualquer confiança possível: todas ficam sem proposta, com a confiança para o resumo
+    nothing = propose_categories(EXPENSES, token_classifier.TokenClassifier(), min_confidence=1.01)
+    assert all(p['category'] is None and p['confidence'] > 0 for p in nothing.values())
+
+
+def test_default_threshold_is_min_confidence():
+    proposals = propose_categories(EXPENSES, token_classifier.TokenClassifier())
+    for p in proposals.values():
+        assert (p['category'] is not None) == (p['confidence'] >= token_classifier.MIN_CONFIDENCE)